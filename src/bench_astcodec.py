@@ -0,0 +1,51 @@
+"""
+Compares `astcodec` with pickle on a large page.
+
+The page is a long page of the site copied `repeat` times, with every
+word numbered by its copy so no two copies share text; repeating it
+verbatim would build identical nodes and flatter pickle's memo.
+
+Run with `python3 src/bench_astcodec.py [repeat]`.
+"""
+import os
+import pickle
+import re
+import sys
+import time
+
+import astcodec
+from helpers import markdown_to_html_node
+
+
+# a long page of the site, found relative to this script
+PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    os.pardir, "content", "blog", "tom", "index.md")
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(repeat: int = 200) -> None:
+    with open(PAGE, "r", encoding="utf-8") as f:
+        page = f.read()
+    markdown = "".join(re.sub(r"\w+", lambda match: f"{match.group()}{i}", page)
+                       for i in range(repeat))
+    node = markdown_to_html_node(markdown)
+
+    print(f"page: {len(markdown)} bytes of markdown")
+    print(f"parse:  {best_of(3, markdown_to_html_node, markdown) * 1000:8.1f} ms")
+    for name, dumps, loads in (("pickle", pickle.dumps, pickle.loads), ("astcodec", astcodec.dumps, astcodec.loads)):
+        data = dumps(node)
+        print(f"{name}: {len(data):9d} bytes, dumps {best_of(5, dumps, node) * 1000:6.1f} ms,"
+              f" loads {best_of(5, loads, data) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
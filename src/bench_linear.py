@@ -0,0 +1,73 @@
+"""
+Times every parsing stage on adversarial inputs at two sizes and reports
+how the runtime grows. Linear code grows about as much as its input;
+exits with status 1 if a stage grows more than MAX_RATIO.
+
+`test_perf.py` checks the same inputs by counting work instead, so it
+can run on any machine; wall-clock ratios are only meaningful on a quiet
+one.
+
+Run from `src/` with `python3 bench_linear.py`.
+"""
+import gc
+import sys
+import time
+
+from blocks import block_registry
+from helpers import batch_text_to_text_nodes, block_to_block_type, markdown_to_blocks, markdown_to_html_node, text_to_text_nodes
+
+GROWTH = 8
+MAX_RATIO = 24
+
+CASES = [
+    (markdown_to_blocks, "whitespace run", lambda n: "a\n" + " " * n + "b", 100_000),
+    (markdown_to_blocks, "blank line run", lambda n: "a\n" + " \r\n\t" * n + "b", 20_000),
+    (markdown_to_blocks, "indented lines", lambda n: ("\n" + " " * 50 + "x") * n, 2_000),
+    (block_to_block_type, "unclosed fence", lambda n: "```" + "`x\n" * n, 50_000),
+    (block_to_block_type, "one-line fence", lambda n: "```" + "x" * n + "``", 100_000),
+    (block_to_block_type, "almost a list", lambda n: "- item\n" * n + "not an item", 5_000),
+    (block_to_block_type, "almost ordered", lambda n: "1. item\n" * n + "2 missing dot", 5_000),
+    (block_registry.find, "leading spaces", lambda n: " " * n + "#", 100_000),
+    (text_to_text_nodes, "open brackets", lambda n: "[" * n, 20_000),
+    (text_to_text_nodes, "open images", lambda n: "![" * n, 10_000),
+    (text_to_text_nodes, "close brackets", lambda n: "](" * n, 10_000),
+    (text_to_text_nodes, "unclosed images", lambda n: "![a](" * n, 5_000),
+    (text_to_text_nodes, "unclosed link", lambda n: "[" + "a" * n + "](" + "b" * n, 20_000),
+    (text_to_text_nodes, "many links", lambda n: "![a](b) [c](d) " * n, 500),
+    (text_to_text_nodes, "many delimiters", lambda n: "_a_ **b** " * n, 500),
+    (batch_text_to_text_nodes, "many spans", lambda n: ["plain", "[x](y)", "_i_"] * n, 500),
+    (batch_text_to_text_nodes, "bracket spans", lambda n: ["[" * 100] * n, 200),
+    (markdown_to_html_node, "long line", lambda n: "word " * n, 20_000),
+    (markdown_to_html_node, "bracket heading", lambda n: "# " + "[" * n, 20_000),
+    (markdown_to_html_node, "list items", lambda n: "- item [x](/y)\n" * n, 500),
+    (markdown_to_html_node, "quote lines", lambda n: "> quote\n" * n, 500),
+    (markdown_to_html_node, "paragraphs", lambda n: "para _i_\n\n" * n, 500),
+]
+
+
+def best_time(func, arg, repeat: int = 5) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> int:
+    failed = 0
+    gc.disable()
+    for func, name, make_input, size in CASES:
+        small = best_time(func, make_input(size))
+        large = best_time(func, make_input(size * GROWTH))
+        ratio = large / small
+        failed += ratio >= MAX_RATIO
+        print(f"{func.__name__:26s} {name:16s} {large * 1000:8.2f} ms  {ratio:5.1f}x"
+              f"{'  SUPERLINEAR' if ratio >= MAX_RATIO else ''}")
+    gc.enable()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+module contains the registry of markdown block types
+
+Every block type is a `BlockHandler` that declares the characters a block
+of its type can start with, a `detect` function and a `render` function.
+A block is dispatched with one dictionary lookup on its first non-space
+character, so only the handlers registered for that character are tried;
+blocks no handler claims are paragraphs.
+
+New block types (tables, footnotes, admonitions, ...) are added with
+`register_block_handler` without touching the built-in ones.
+
+The built-in handlers detect and render a block in O(n) of its length:
+their patterns are anchored at the start of a line and each has a single
+repeat followed by a literal, and code fences are found with
+`startswith`/`endswith` rather than a pattern spanning the block.
+"""
+import re
+from enum import Enum
+from typing import Any, Callable, NamedTuple
+
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+# renders the inline markdown of a span into its child nodes
+InlineRenderer = Callable[[str], list[HTMLNode]]
+
+
+class BlockType(Enum):
+    """
+    Enum class for valid markdown types.
+    """
+    PARAGRAPH = "paragraph"
+    HEADING = "heading"
+    CODE = "code"
+    QUOTE = "quote"
+    UNORDERED_LIST = "unordered_list"
+    ORDERED_LIST = "ordered_list"
+
+
+class BlockHandler(NamedTuple):
+    """
+    A markdown block type.
+
+    `triggers` are the characters a block of this type can start with,
+    ignoring leading whitespace; an empty string means any character, and
+    such handlers are tried for every block. `detect(block)` decides if the
+    block is of this type and `render(block, inline)` returns its HTML
+    node, or `None` for no output. `block_type` is what
+    `block_to_block_type` returns for the block.
+
+    `inline(text)` returns the list of child nodes of an inline span. When
+    a whole document is parsed the spans are parsed in one batch after
+    all blocks are rendered, so the list may still be empty while
+    `render` runs and must be used as is rather than inspected or copied.
+    """
+    name: str
+    triggers: str
+    detect: Callable[[str], bool]
+    render: Callable[[str, InlineRenderer], HTMLNode | None]
+    block_type: Any = None
+
+
+_HEADING_PATTERN = re.compile(r"^(#{1,6}) (.*)")
+_QUOTE_PATTERN = re.compile(r"^>( .*)?$")
+_UNORDERED_LIST_PATTERN = re.compile(r"^\s*-\s.*")
+_ORDERED_LIST_PATTERN = re.compile(r"^\s*(\d+)\.\s.*")
+_FIRST_CHARACTER_PATTERN = re.compile(r"\s*(\S)")
+
+
+def _is_heading(block: str) -> bool:
+    # Ensure heading starts with # but is between 1 and 6 #s
+    return _HEADING_PATTERN.match(block) is not None
+
+
+def _render_heading(block: str, inline: InlineRenderer) -> HTMLNode:
+    # group the markdown #s and the text separately
+    match_heading = _HEADING_PATTERN.match(block)
+    # count the number of #s at the start of the block
+    level = len(match_heading.group(1))
+    return ParentNode(f"h{level}", inline(match_heading.group(2)))
+
+
+def _is_code(block: str) -> bool:
+    # Ensure codeblocks start with ``` and end with ``` (optionally followed
+    # by one newline), without the fences overlapping
+    end = len(block) - 1 if block.endswith("\n") else len(block)
+    return end >= 6 and block.startswith("```") and block.endswith("```", 0, end)
+
+
+def _render_code(block: str, inline: InlineRenderer) -> HTMLNode:
+    # remove the starting and ending ``` from the block
+    code_content = block.strip().removeprefix(
+        "```").removesuffix("```").strip() + "\n"
+    return ParentNode("pre", [LeafNode("code", code_content)])
+
+
+def _is_quote(block: str) -> bool:
+    # Ensure quotes start with > and are followed by a space
+    return all(_QUOTE_PATTERN.match(line) for line in block.splitlines())
+
+
+def _render_quote(block: str, inline: InlineRenderer) -> HTMLNode:
+    # remove the starting > AND space from the block
+    quote_lines = [re.sub(r"^>\s?", "", line) for line in block.splitlines()]
+    return ParentNode("blockquote", inline("\n".join(quote_lines)))
+
+
+def _is_unordered_list(block: str) -> bool:
+    # Ensure unordered lists start with - followed by a space (* is NOT supported)
+    return all(_UNORDERED_LIST_PATTERN.match(line) for line in block.splitlines())
+
+
+def _render_unordered_list(block: str, inline: InlineRenderer) -> HTMLNode:
+    items = []
+    for line in block.splitlines():
+        # remove the starting - AND space from the line
+        item_text = line[2:] if line.startswith("- ") else line
+        items.append(ParentNode("li", inline(item_text)))
+    return ParentNode("ul", items)
+
+
+def _is_ordered_list(block: str) -> bool:
+    # Ensure ordered lists start with a number followed by a dot and a space
+    return all(_ORDERED_LIST_PATTERN.match(line) for line in block.splitlines())
+
+
+def _render_ordered_list(block: str, inline: InlineRenderer) -> HTMLNode:
+    items = []
+    for line in block.splitlines():
+        # remove the starting number AND dot AND space from the line
+        item_text = re.sub(r"^\s*\d+\.\s+", "", line)
+        items.append(ParentNode("li", inline(item_text)))
+    return ParentNode("ol", items)
+
+
+def _render_paragraph(block: str, inline: InlineRenderer) -> HTMLNode:
+    return ParentNode("p", inline(block.replace("\n", " ")))
+
+
+PARAGRAPH_HANDLER = BlockHandler(
+    "paragraph", "", lambda block: True, _render_paragraph, BlockType.PARAGRAPH)
+
+BUILTIN_BLOCK_HANDLERS = [
+    BlockHandler("heading", "#", _is_heading,
+                 _render_heading, BlockType.HEADING),
+    BlockHandler("code", "`", _is_code, _render_code, BlockType.CODE),
+    BlockHandler("quote", ">", _is_quote, _render_quote, BlockType.QUOTE),
+    BlockHandler("unordered_list", "-", _is_unordered_list,
+                 _render_unordered_list, BlockType.UNORDERED_LIST),
+    BlockHandler("ordered_list", "0123456789", _is_ordered_list,
+                 _render_ordered_list, BlockType.ORDERED_LIST),
+]
+
+
+class BlockRegistry:
+    """
+    The block handlers in use, indexed by trigger character. Handlers
+    sharing a trigger are tried in registration order.
+    """
+
+    def __init__(self, handlers: list[BlockHandler] = None) -> None:
+        self.handlers = []
+        self._by_character = {}
+        self._any = []
+        for handler in handlers or []:
+            self.register(handler)
+
+    def register(self, handler: BlockHandler) -> None:
+        """
+        Adds a handler. A handler with the name of an existing one replaces
+        it in place, which is how built-in block types are overridden.
+        """
+        if handler.block_type is None:
+            handler = handler._replace(block_type=handler.name)
+        for i, existing in enumerate(self.handlers):
+            if existing.name == handler.name:
+                self.handlers[i] = handler
+                break
+        else:
+            self.handlers.append(handler)
+        self._build_index()
+
+    def unregister(self, name: str) -> None:
+        """
+        Removes the handler called `name`, if any.
+        """
+        self.handlers = [
+            handler for handler in self.handlers if handler.name != name]
+        self._build_index()
+
+    def _build_index(self) -> None:
+        self._by_character = {}
+        self._any = [handler for handler in self.handlers if not handler.triggers]
+        for handler in self.handlers:
+            for character in handler.triggers:
+                self._by_character.setdefault(character, []).append(handler)
+        # handlers without triggers are tried after the specific ones
+        for character, handlers in self._by_character.items():
+            handlers.extend(self._any)
+
+    def find(self, block: str) -> BlockHandler:
+        """
+        Returns the handler of `block`, the paragraph handler if no
+        registered handler detects it.
+        """
+        if not block:
+            return PARAGRAPH_HANDLER
+        first = block[0]
+        if first.isspace():
+            match = _FIRST_CHARACTER_PATTERN.match(block)
+            if match is None:
+                return PARAGRAPH_HANDLER
+            first = match.group(1)
+        for handler in self._by_character.get(first, self._any):
+            if handler.detect(block):
+                return handler
+        return PARAGRAPH_HANDLER
+
+
+# the registry used by `block_to_block_type` and `block_to_html_node`
+block_registry = BlockRegistry(BUILTIN_BLOCK_HANDLERS)
+
+
+def register_block_handler(handler: BlockHandler) -> None:
+    """
+    Adds a block type to the default registry.
+
+    Args:
+        handler (BlockHandler): The block type to add or replace.
+    """
+    block_registry.register(handler)
@@ -0,0 +1,188 @@
+"""
+module contains the build manifest and the changeset of a build
+
+The manifest lists every file of an output directory with the SHA-256 of
+its content and its size. Pages and other generated files are hashed as
+they are written (see `helpers.write_output`); the rest are hashed only
+when their mtime or size differs from the previous manifest, so keeping
+it up to date costs a `stat` per unchanged file.
+
+Comparing the manifest with the previous one gives the changeset of the
+build, the added, modified and deleted paths, which deploys use to only
+transfer what changed (see `deploy`).
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: str) -> str:
+    """
+    Returns the hex SHA-256 of the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(out: str, cache_dir: str = ".cache/manifests") -> str:
+    """
+    Returns where the manifest of the output directory `out` is kept.
+    """
+    digest = hashlib.sha1(os.path.abspath(out).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def changeset_path(out: str, cache_dir: str = ".cache/manifests") -> str:
+    """
+    Returns where the changeset of the last build of `out` is written.
+    """
+    return manifest_path(out, cache_dir)[:-len(".json")] + "-changeset.json"
+
+
+def load_manifest(path: str) -> dict[str, list]:
+    """
+    Loads a manifest, `{path: [sha256, size, mtime_ns]}`, returning an
+    empty one if the file is missing, unreadable or from another version.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if saved.get("version") != MANIFEST_VERSION:
+        return {}
+    return saved.get("files", {})
+
+
+def _save_json(path: str, data: dict) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def save_manifest(path: str, files: dict[str, list]) -> None:
+    """
+    Writes a manifest to `path`, creating directories as needed.
+    """
+    _save_json(path, {"version": MANIFEST_VERSION, "files": files})
+
+
+def diff_manifests(old: dict[str, list], new: dict[str, list]) -> dict:
+    """
+    Compares two manifests by content hash.
+
+    Args:
+        old (dict): The manifest files are compared against.
+        new (dict): The current manifest.
+    Returns:
+        dict: The `added`, `modified` and `deleted` files, each a list of
+            `{"path", "sha256", "size"}` sorted by path (deleted ones
+            with their old hash and size), and the `unchanged` count.
+    """
+    def entry(path: str, values: list) -> dict:
+        return {"path": path, "sha256": values[0], "size": values[1]}
+
+    added = [entry(path, new[path]) for path in sorted(new.keys() - old.keys())]
+    deleted = [entry(path, old[path]) for path in sorted(old.keys() - new.keys())]
+    modified = [entry(path, new[path]) for path in sorted(new.keys() & old.keys())
+                if new[path][0] != old[path][0]]
+    unchanged = len(new.keys() & old.keys()) - len(modified)
+    return {"added": added, "modified": modified, "deleted": deleted, "unchanged": unchanged}
+
+
+class BuildManifest:
+    """
+    Keeps the manifests of the output directories of a build.
+
+    `track` every output directory, write the files through
+    `helpers.write_output` with this manifest installed (see
+    `helpers.set_build_manifest`), `scan` the directories while they hold
+    the build, then `finish` to save the manifests and changesets once the
+    build is published.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/manifests") -> None:
+        self.cache_dir = cache_dir
+        # directory written to -> output directory it is published as
+        self._tracked = {}
+        # absolute path -> sha256 of the files hashed while writing
+        self._hashes = {}
+        # output directory -> (files, changeset, number of files hashed)
+        self._scanned = None
+
+    def track(self, dest: str, out: str = None) -> None:
+        """
+        Starts a manifest for the files written to `dest`, which is
+        published as `out`, e.g. its staging directory (default: `dest`).
+        """
+        self._tracked[os.path.abspath(dest)] = out if out is not None else dest
+
+    def record(self, path: str, sha256: str) -> None:
+        """
+        Remembers the hash of a file just written. Files outside the
+        tracked directories are ignored.
+        """
+        path = os.path.abspath(path)
+        if any(path.startswith(dest + os.sep) for dest in self._tracked):
+            self._hashes[path] = sha256
+
+    def scan(self) -> None:
+        """
+        Lists every tracked directory and diffs it against its previous
+        manifest. Nothing is saved until `finish`, so a build that fails
+        to publish leaves the previous manifests in place.
+        """
+        self._scanned = {}
+        for dest, out in self._tracked.items():
+            previous = load_manifest(manifest_path(out, self.cache_dir))
+            files = {}
+            hashed = 0
+            for root, _, names in os.walk(dest):
+                for name in names:
+                    path = os.path.join(root, name)
+                    rel_path = os.path.relpath(path, dest).replace(os.sep, "/")
+                    stat = os.stat(path)
+                    sha256 = self._hashes.get(path)
+                    if sha256 is None:
+                        entry = previous.get(rel_path)
+                        if entry is not None and entry[1:] == [stat.st_size, stat.st_mtime_ns]:
+                            sha256 = entry[0]
+                        else:
+                            sha256 = file_sha256(path)
+                            hashed += 1
+                    files[rel_path] = [sha256, stat.st_size, stat.st_mtime_ns]
+            self._scanned[out] = (files, diff_manifests(previous, files), hashed)
+        self._hashes = {}
+
+    def finish(self) -> dict[str, dict]:
+        """
+        Saves the manifest of every tracked directory and the changeset
+        against the previous one, and prints a summary. The directories
+        are scanned first if `scan` wasn't called.
+
+        Returns:
+            dict[str, dict]: The changeset of each output directory, see
+                `diff_manifests`.
+        """
+        if self._scanned is None:
+            self.scan()
+        changesets = {}
+        for out, (files, changeset, hashed) in self._scanned.items():
+            save_manifest(manifest_path(out, self.cache_dir), files)
+            _save_json(changeset_path(out, self.cache_dir),
+                       {"version": MANIFEST_VERSION, "out": out, **changeset})
+            print(f"Changeset for {out}: {len(changeset['added'])} added, "
+                  f"{len(changeset['modified'])} modified, {len(changeset['deleted'])} deleted, "
+                  f"{changeset['unchanged']} unchanged ({hashed} files hashed)")
+            changesets[out] = changeset
+        self._scanned = None
+        return changesets
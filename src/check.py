@@ -0,0 +1,111 @@
+"""
+module contains the parse-only validation used by the `check` command
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from frontmatter import split_front_matter
+from helpers import discover_pages, extract_title, iter_markdown_blocks, markdown_to_html_node
+from pagemeta import PageMeta
+
+# Below this many pages starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 32
+
+
+class PageError(NamedTuple):
+    """
+    A problem found in a markdown page. `line` is the 1-based line of the
+    block that failed to parse, or `None` for page-level problems.
+    """
+    path: str
+    line: int | None
+    message: str
+
+    def __str__(self) -> str:
+        if self.line is None:
+            return f"{self.path}: {self.message}"
+        return f"{self.path}:{self.line}: {self.message}"
+
+
+def markdown_to_blocks_with_lines(text: str) -> list[tuple[int, str]]:
+    """
+    Splits a markdown `string` into the same blocks as `markdown_to_blocks`,
+    paired with the 1-based line number each block starts on.
+
+    Args:
+        text (str): The input markdown string to be split into blocks.
+    Returns:
+        list[tuple[int, str]]: The start line and text of each block.
+    """
+    return list(iter_markdown_blocks(text.splitlines()))
+
+
+def check_page(path: str) -> list[PageError]:
+    """
+    Parses a single markdown page without rendering a template or writing
+    any output, and collects every error instead of stopping at the first.
+
+    Each block is parsed on its own so that errors can be reported with
+    the line the block starts on.
+
+    Args:
+        path (str): The path to the markdown file to check.
+    Returns:
+        list[PageError]: The errors found, empty if the page is valid.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            markdown = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return [PageError(path, None, str(e))]
+
+    try:
+        front_matter, body = split_front_matter(markdown)
+    except ValueError as e:
+        return [PageError(path, 1, str(e))]
+    # keep reporting lines of the whole file, front matter included
+    offset = markdown[:len(markdown) - len(body)].count("\n")
+
+    errors = []
+    meta = PageMeta()
+    for line, block in markdown_to_blocks_with_lines(body):
+        try:
+            markdown_to_html_node(block, meta)
+        except Exception as e:
+            errors.append(PageError(path, line + offset, str(e)))
+
+    if "title" not in front_matter:
+        try:
+            extract_title(body, meta)
+        except Exception as e:
+            errors.append(PageError(path, None, str(e)))
+
+    return errors
+
+
+def check_site(dir_path: str, include: list[str] = None, exclude: list[str] = None, jobs: int = None) -> list[PageError]:
+    """
+    Checks every page discovered under `dir_path`, in parallel worker
+    processes when there are enough pages to make it worthwhile.
+
+    Args:
+        dir_path (str): The path to the directory containing markdown files.
+        include (list[str]): Optional globs a page must match to be checked.
+        exclude (list[str]): Optional globs of pages to skip.
+        jobs (int): Number of worker processes, defaults to the CPU count.
+    Returns:
+        list[PageError]: All errors found, ordered by page path.
+    """
+    paths = [os.path.join(dir_path, page)
+             for page in discover_pages(dir_path, include, exclude)]
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < PARALLEL_MIN_PAGES:
+        results = map(check_page, paths)
+        return [error for errors in results for error in errors]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        chunksize = max(1, len(paths) // (jobs * 4))
+        results = executor.map(check_page, paths, chunksize=chunksize)
+        return [error for errors in results for error in errors]
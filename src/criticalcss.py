@@ -0,0 +1,234 @@
+"""
+module contains the inlining of the site stylesheet into page templates
+
+A page whose template links the stylesheet can't render until that extra
+request completes. `CriticalCSS` replaces the `<link>` with a `<style>`
+holding the stylesheet, optionally pruned to the rules whose selectors
+can match the tags of the page, with the full stylesheet then loaded
+asynchronously.
+
+The stylesheet is read and parsed once per build, and the inlined CSS is
+memoized per set of tags, since most pages share the same few.
+"""
+import hashlib
+import re
+from typing import NamedTuple
+
+from htmlnode import HTMLNode
+from sources import open_input
+from minify import Minifier
+
+# tags every page has, whatever the template
+_DOCUMENT_TAGS = frozenset({"html", "head", "body"})
+_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+# parts of a selector that never name a tag: attribute selectors and the
+# arguments of pseudo-classes
+_SELECTOR_NOISE = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+_TYPE_SELECTOR = re.compile(r"(?:^|[\s>+~])([A-Za-z][A-Za-z0-9-]*)")
+_LINK_TAG = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+# a tag attribute, its value double, single or not quoted
+_ATTRIBUTE = re.compile(
+    r"""([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+
+
+class CSSRule(NamedTuple):
+    """
+    A top level statement of a stylesheet. `body` is the declarations of
+    a style rule, the nested rules of a conditional group rule (`@media`,
+    `@supports`), or `None` for statements ending in a semicolon.
+    """
+    prelude: str
+    body: "str | list[CSSRule] | None"
+
+
+def _skip_string(css: str, pos: int) -> int:
+    quote = css[pos]
+    pos += 1
+    while pos < len(css) and css[pos] != quote:
+        pos += 2 if css[pos] == "\\" else 1
+    return pos + 1
+
+
+def _parse_rules(css: str, pos: int, end: int) -> tuple[list[CSSRule], int]:
+    rules = []
+    start = pos
+    while pos < end:
+        character = css[pos]
+        if character in "\"'":
+            pos = _skip_string(css, pos)
+        elif character == ";":
+            prelude = css[start:pos].strip()
+            if prelude:
+                rules.append(CSSRule(prelude, None))
+            pos += 1
+            start = pos
+        elif character == "{":
+            prelude = css[start:pos].strip()
+            if prelude.startswith(("@media", "@supports")):
+                children, pos = _parse_rules(css, pos + 1, end)
+                rules.append(CSSRule(prelude, children))
+            else:
+                body_start = pos + 1
+                depth = 1
+                pos += 1
+                while pos < end and depth:
+                    if css[pos] in "\"'":
+                        pos = _skip_string(css, pos)
+                        continue
+                    if css[pos] == "{":
+                        depth += 1
+                    elif css[pos] == "}":
+                        depth -= 1
+                    pos += 1
+                rules.append(CSSRule(prelude, css[body_start:pos - 1].strip()))
+            start = pos
+        elif character == "}":
+            return rules, pos + 1
+        else:
+            pos += 1
+    return rules, pos
+
+
+def parse_css(css: str) -> list[CSSRule]:
+    """
+    Splits a stylesheet into its rules. Comments are dropped.
+
+    Args:
+        css (str): The stylesheet.
+    Returns:
+        list[CSSRule]: The top level rules in order.
+    """
+    css = _COMMENT.sub("", css)
+    return _parse_rules(css, 0, len(css))[0]
+
+
+def serialize_css(rules: list[CSSRule]) -> str:
+    """
+    Writes rules back out as a stylesheet, one rule per line.
+    """
+    lines = []
+    for rule in rules:
+        if rule.body is None:
+            lines.append(f"{rule.prelude};")
+        elif isinstance(rule.body, list):
+            lines.append(f"{rule.prelude} {{\n{serialize_css(rule.body)}}}")
+        else:
+            lines.append(f"{rule.prelude} {{ {rule.body} }}")
+    return "".join(line + "\n" for line in lines)
+
+
+def selector_may_match(selector: str, tags: frozenset[str]) -> bool:
+    """
+    Returns whether `selector` can match a page made of `tags`: every tag
+    it names must be on the page. Classes, ids, attributes and
+    pseudo-classes are assumed to match.
+    """
+    selector = _SELECTOR_NOISE.sub("", selector)
+    return all(name.lower() in tags for name in _TYPE_SELECTOR.findall(selector))
+
+
+def prune_css(rules: list[CSSRule], tags: frozenset[str]) -> list[CSSRule]:
+    """
+    Returns the rules that can apply to a page made of `tags`. At-rules
+    other than `@media`/`@supports` are always kept; those two are kept
+    when any of their rules is.
+    """
+    kept = []
+    for rule in rules:
+        if rule.body is None or rule.prelude.startswith("@"):
+            if isinstance(rule.body, list):
+                children = prune_css(rule.body, tags)
+                if children:
+                    kept.append(CSSRule(rule.prelude, children))
+            else:
+                kept.append(rule)
+        elif any(selector_may_match(selector, tags) for selector in rule.prelude.split(",")):
+            kept.append(rule)
+    return kept
+
+
+def node_tags(node: HTMLNode) -> set[str]:
+    """
+    Returns the tags used in a node tree.
+    """
+    tags = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag is not None:
+            tags.add(current.tag)
+        if current.children:
+            stack.extend(current.children)
+    return tags
+
+
+class CriticalCSS:
+    """
+    Inlines the stylesheet linked as `href` into pages.
+
+    With `prune`, only the rules that can match the tags of a page, those
+    of its template and its node tree, are inlined and the full
+    stylesheet is loaded asynchronously; pages rendered without a node
+    tree (streamed ones) get the whole stylesheet. With a `minifier`, the
+    inlined CSS is minified.
+    """
+
+    def __init__(self, css_path: str, href: str = "/index.css", prune: bool = False, minifier: Minifier = None) -> None:
+        with open_input(css_path) as f:
+            self.css = f.read()
+        self.href = href
+        self.prune = prune
+        self.minifier = minifier
+        self.rules = parse_css(self.css) if prune else None
+        # identifies the inlined output, for caches of rendered pages
+        self.fingerprint = hashlib.sha256(
+            f"{self.css}\0{href}\0{prune}\0{minifier is not None}".encode("utf-8")).hexdigest()
+        self._css_by_tags = {}
+
+    def _links_stylesheet(self, link: str) -> bool:
+        # whether a <link> tag loads the stylesheet, however its
+        # attributes are quoted
+        attributes = {}
+        for match in _ATTRIBUTE.finditer(link, len("<link")):
+            name, *values = match.groups()
+            value = next((value for value in values if value is not None), "")
+            attributes.setdefault(name.lower(), value)
+        rel = attributes.get("rel", "").lower().split()
+        # alternate stylesheets don't apply until the reader picks them
+        return (attributes.get("href") == self.href
+                and "stylesheet" in rel and "alternate" not in rel)
+
+    def _inline_css(self, tags: frozenset[str] | None) -> str:
+        css = self._css_by_tags.get(tags)
+        if css is None:
+            if tags is None:
+                css = self.css
+            else:
+                css = serialize_css(prune_css(self.rules, tags))
+            if self.minifier is not None:
+                css = self.minifier.css(css)
+            self._css_by_tags[tags] = css
+        return css
+
+    def apply(self, html: str, tags: frozenset[str] = None) -> str:
+        """
+        Returns `html` with the stylesheet link replaced by the CSS a page
+        made of `tags` needs, the whole stylesheet when the tags are not
+        known. HTML not linking the stylesheet is returned unchanged.
+        """
+        if not self.prune:
+            tags = None
+        elif tags is not None:
+            tags = frozenset(tags) | _DOCUMENT_TAGS
+
+        def replace(match: re.Match) -> str:
+            if not self._links_stylesheet(match.group()):
+                return match.group()
+            style = f"<style>{self._inline_css(tags)}</style>"
+            if tags is None:
+                return style
+            return (f'{style}<link rel="preload" href="{self.href}" as="style" '
+                    "onload=\"this.onload=null;this.rel='stylesheet'\">"
+                    f'<noscript><link rel="stylesheet" href="{self.href}"></noscript>')
+
+        return _LINK_TAG.sub(replace, html)
@@ -0,0 +1,184 @@
+"""
+module contains the incremental upload of a built site
+
+A deploy compares the manifest of the last build (see `changeset`) with
+the manifest of what was last uploaded to the destination, and only
+transfers the difference, several files at a time. New and modified
+assets go first, then pages, then deleted files are removed, so pages
+never link to files that aren't there yet.
+
+Destinations are a local directory (`DirectoryTarget`) or a bucket on an
+S3-compatible endpoint (`S3Target`).
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from changeset import diff_manifests, load_manifest, manifest_path, save_manifest
+
+DEFAULT_JOBS = 8
+
+
+class DirectoryTarget:
+    """
+    Deploys to a local directory, e.g. the document root of a web server.
+    Every file is replaced atomically.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = os.path.abspath(path)
+
+    def put(self, rel_path: str, src_path: str) -> None:
+        dest_path = os.path.join(self.path, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+
+    def delete(self, rel_path: str) -> None:
+        dest_path = os.path.join(self.path, rel_path)
+        try:
+            os.remove(dest_path)
+        except FileNotFoundError:
+            pass
+        # drop the directories the file leaves empty
+        directory = os.path.dirname(dest_path)
+        while os.path.abspath(directory) != self.name:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+class S3Target:
+    """
+    Deploys to `s3://bucket/prefix` on an S3-compatible endpoint with
+    plain path-style `PUT` and `DELETE` requests.
+
+    Requests are not signed, so this only works against endpoints that
+    accept anonymous writes, like local S3 emulators.
+    """
+
+    def __init__(self, endpoint: str, bucket: str, prefix: str = "", timeout: float = 60) -> None:
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.timeout = timeout
+        self.name = f"{self.endpoint}/{bucket}/{self.prefix}"
+
+    def _url(self, rel_path: str) -> str:
+        key = urllib.parse.quote(self.prefix + rel_path)
+        return f"{self.endpoint}/{self.bucket}/{key}"
+
+    def put(self, rel_path: str, src_path: str) -> None:
+        with open(src_path, "rb") as f:
+            data = f.read()
+        content_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        request = urllib.request.Request(self._url(rel_path), data=data, method="PUT", headers={
+            "Content-Type": content_type,
+            "x-amz-content-sha256": hashlib.sha256(data).hexdigest(),
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def delete(self, rel_path: str) -> None:
+        request = urllib.request.Request(self._url(rel_path), method="DELETE")
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def parse_destination(spec: str, endpoint: str = None) -> DirectoryTarget | S3Target:
+    """
+    Returns the target of a destination given as `s3://bucket/prefix`, which
+    needs an `endpoint`, or as a local directory.
+
+    Raises:
+        ValueError: If an S3 destination has no bucket or endpoint.
+    """
+    if not spec.startswith("s3://"):
+        return DirectoryTarget(spec)
+    bucket, _, prefix = spec[len("s3://"):].partition("/")
+    if not bucket:
+        raise ValueError(f"Missing bucket in {spec!r}")
+    if not endpoint:
+        raise ValueError(f"Deploying to {spec} needs an endpoint")
+    return S3Target(endpoint, bucket, prefix)
+
+
+def deploy(out: str, target: DirectoryTarget | S3Target, jobs: int = DEFAULT_JOBS, manifest_dir: str = ".cache/manifests", state_dir: str = ".cache/deploys") -> dict:
+    """
+    Uploads the last build of `out` to `target`, transferring only the
+    files that changed since the last deploy to it.
+
+    What was deployed is remembered per target, including the files that
+    made it before a failure, so a failed deploy is resumed by running it
+    again.
+
+    Args:
+        out (str): The output directory of the build.
+        target (DirectoryTarget | S3Target): Where the site is deployed.
+        jobs (int): The number of concurrent transfers.
+        manifest_dir (str): Where builds keep their manifests.
+        state_dir (str): Where the deployed manifests are kept.
+    Returns:
+        dict: The changeset that was deployed, see
+            `changeset.diff_manifests`.
+    Raises:
+        ValueError: If `out` has no build manifest.
+        OSError: If a transfer failed, after the other transfers finished.
+    """
+    built = load_manifest(manifest_path(out, manifest_dir))
+    if not built:
+        raise ValueError(f"No build manifest for {out}, build the site first")
+    state_path = manifest_path(target.name, state_dir)
+    deployed = load_manifest(state_path)
+    changeset = diff_manifests(deployed, built)
+
+    uploads = [entry["path"] for entry in changeset["added"] + changeset["modified"]]
+    # assets before the pages that use them, and removals last
+    phases = [
+        [(target.put, path) for path in uploads if not path.endswith(".html")],
+        [(target.put, path) for path in uploads if path.endswith(".html")],
+        [(target.delete, entry["path"]) for entry in changeset["deleted"]],
+    ]
+
+    def transfer(operation) -> str:
+        action, rel_path = operation
+        if action == target.delete:
+            action(rel_path)
+        else:
+            action(rel_path, os.path.join(out, rel_path))
+        return rel_path
+
+    errors = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for operations in phases:
+                futures = [(operation, executor.submit(transfer, operation)) for operation in operations]
+                for (action, rel_path), future in futures:
+                    try:
+                        future.result()
+                    except OSError as e:
+                        errors.append((rel_path, e))
+                        continue
+                    if action == target.delete:
+                        deployed.pop(rel_path, None)
+                    else:
+                        deployed[rel_path] = built[rel_path]
+                if errors:
+                    break
+    finally:
+        save_manifest(state_path, deployed)
+
+    if errors:
+        rel_path, error = errors[0]
+        raise OSError(f"{len(errors)} transfer(s) to {target.name} failed, first {rel_path}: {error}")
+    print(f"Deployed {out} to {target.name}: {len(uploads)} uploaded, "
+          f"{len(changeset['deleted'])} deleted, {changeset['unchanged']} unchanged")
+    return changeset
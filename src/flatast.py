@@ -0,0 +1,277 @@
+"""
+module contains a compact, array-backed alternative to the `ParentNode`/
+`LeafNode` object graph
+
+A `FlatTree` stores every node as one slot in a set of parallel arrays:
+kind, tag id, parent, first child, next sibling, and the offset/length of
+its value in a single string table. Retaining the trees of a whole site
+costs a few machine ints per node instead of a Python object with a
+`__dict__`, and pickling only copies the raw array buffers.
+"""
+from array import array
+
+from helpers import block_to_html_node, markdown_to_blocks
+from htmlnode import HTMLNode
+from leafnode import LeafNode, VOID_ELEMENTS
+from parentnode import ParentNode
+
+LEAF = 0
+PARENT = 1
+NONE = -1
+
+
+class FlatTree:
+    """
+    An HTML node tree stored as struct-of-arrays. Node 0 is the root once
+    the tree is not empty.
+    """
+
+    def __init__(self) -> None:
+        self.tag_names = [None]
+        self._tag_ids = {None: 0}
+        self.kinds = array("b")
+        self.tags = array("i")
+        self.parents = array("i")
+        self.first_children = array("i")
+        self.next_siblings = array("i")
+        self.value_offsets = array("i")
+        self.value_lengths = array("i")
+        self.props = array("i")
+        self.props_table = []
+        self._props_ids = {}
+        # last child of every node, only needed while appending
+        self._last_children = array("i")
+        self._text_parts = []
+        self._text_length = 0
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_node(self, parent: int, kind: int, tag: str | None, value: str | None = None, props: dict | None = None) -> int:
+        """
+        Appends a node as the last child of `parent` (`NONE` for the root)
+        and returns its index.
+        """
+        index = len(self.kinds)
+
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+
+        if props:
+            key = tuple(props.items())
+            props_id = self._props_ids.get(key)
+            if props_id is None:
+                props_id = self._props_ids[key] = len(self.props_table)
+                self.props_table.append(dict(props))
+        else:
+            props_id = NONE
+
+        if value is None:
+            offset, length = 0, NONE
+        else:
+            offset, length = self._text_length, len(value)
+            self._text_parts.append(value)
+            self._text_length += length
+
+        self.kinds.append(kind)
+        self.tags.append(tag_id)
+        self.parents.append(parent)
+        self.first_children.append(NONE)
+        self.next_siblings.append(NONE)
+        self.value_offsets.append(offset)
+        self.value_lengths.append(length)
+        self.props.append(props_id)
+        self._last_children.append(NONE)
+
+        if parent != NONE:
+            last = self._last_children[parent]
+            if last == NONE:
+                self.first_children[parent] = index
+            else:
+                self.next_siblings[last] = index
+            self._last_children[parent] = index
+        return index
+
+    def add_subtree(self, parent: int, node: HTMLNode) -> int:
+        """
+        Copies an `HTMLNode` tree below `parent` (`NONE` for the root),
+        iteratively so deep trees don't hit the recursion limit. Returns
+        the index of the copied `node`.
+        """
+        root = NONE
+        stack = [(parent, node)]
+        while stack:
+            current_parent, current = stack.pop()
+            if isinstance(current, ParentNode):
+                index = self.add_node(
+                    current_parent, PARENT, current.tag, None, current.props)
+                # push in reverse so children are appended in order
+                for child in reversed(current.children or []):
+                    stack.append((index, child))
+            else:
+                index = self.add_node(
+                    current_parent, LEAF, current.tag, current.value, current.props)
+            if root == NONE:
+                root = index
+        return root
+
+    @property
+    def text(self) -> str:
+        """
+        The string table holding the values of all leaf nodes.
+        """
+        if len(self._text_parts) > 1:
+            self._text_parts = ["".join(self._text_parts)]
+        return self._text_parts[0] if self._text_parts else ""
+
+    def value(self, index: int) -> str | None:
+        """
+        Returns the value of node `index`, `None` if it has none.
+        """
+        length = self.value_lengths[index]
+        if length == NONE:
+            return None
+        offset = self.value_offsets[index]
+        return self.text[offset:offset + length]
+
+    def tag(self, index: int) -> str | None:
+        return self.tag_names[self.tags[index]]
+
+    def children(self, index: int) -> list[int]:
+        """
+        Returns the indexes of the children of node `index`, in order.
+        """
+        children = []
+        child = self.first_children[index]
+        while child != NONE:
+            children.append(child)
+            child = self.next_siblings[child]
+        return children
+
+    def _props_html(self, index: int) -> str:
+        props_id = self.props[index]
+        if props_id == NONE:
+            return ""
+        return " ".join(f'{key}="{value}"' for key, value in self.props_table[props_id].items())
+
+    def _open_tag(self, index: int) -> str:
+        props = self._props_html(index)
+        if props:
+            return f"<{self.tag(index)} {props}>"
+        return f"<{self.tag(index)}>"
+
+    def to_html(self, index: int = 0) -> str:
+        """
+        Serializes the subtree rooted at `index` to HTML without recursion.
+        The output is identical to `to_html` of the equivalent node objects.
+
+        Raises:
+            ValueError: For the same invalid nodes as `LeafNode`/`ParentNode`.
+        """
+        parts = []
+        # a string on the stack is a closing tag waiting to be written
+        stack = [index]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            tag = self.tag(item)
+            if self.kinds[item] == LEAF:
+                value = self.value(item)
+                if value is None:
+                    if tag not in VOID_ELEMENTS:
+                        raise ValueError("leaf node must have a value")
+                    parts.append(self._open_tag(item))
+                    continue
+                if tag is None:
+                    parts.append(value)
+                else:
+                    parts.append(f"{self._open_tag(item)}{value}</{tag}>")
+                continue
+            if tag is None:
+                raise ValueError("parent node must have a tag")
+            parts.append(self._open_tag(item))
+            stack.append(f"</{tag}>")
+            stack.extend(reversed(self.children(item)))
+        return "".join(parts)
+
+    def to_nodes(self, index: int = 0) -> HTMLNode:
+        """
+        Converts the subtree rooted at `index` back into `ParentNode`/
+        `LeafNode` objects for code that needs the object tree.
+        """
+        nodes = {}
+        order = [index]
+        # parents come before their children, so build in reverse
+        for item in order:
+            order.extend(self.children(item))
+        for item in reversed(order):
+            props = self.props[item]
+            props = None if props == NONE else dict(self.props_table[props])
+            if self.kinds[item] == LEAF:
+                nodes[item] = LeafNode(self.tag(item), self.value(item), props)
+            else:
+                nodes[item] = ParentNode(self.tag(item), [nodes.pop(child)
+                                                          for child in self.children(item)], props)
+        return nodes[index]
+
+    @classmethod
+    def from_node(cls, node: HTMLNode) -> "FlatTree":
+        """
+        Builds a `FlatTree` from an existing node tree.
+        """
+        tree = cls()
+        tree.add_subtree(NONE, node)
+        return tree
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_text_parts"] = [self.text] if self._text_parts else []
+        # rebuilt on load, not needed to read the tree
+        del state["_props_ids"]
+        del state["_tag_ids"]
+        del state["_last_children"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._tag_ids = {tag: i for i, tag in enumerate(self.tag_names)}
+        self._props_ids = {tuple(props.items()): i for i,
+                           props in enumerate(self.props_table)}
+        self._last_children = array("i", [NONE]) * len(self.kinds)
+        for index, parent in enumerate(self.parents):
+            if parent != NONE:
+                self._last_children[parent] = index
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FlatTree):
+            return False
+        return len(self) == len(other) and (not len(self) or self.to_nodes() == other.to_nodes())
+
+    def __repr__(self) -> str:
+        return f"FlatTree(nodes={len(self)}, tags={self.tag_names[1:]})"
+
+
+def markdown_to_flat_tree(markdown: str) -> FlatTree:
+    """
+    Converts a markdown document into a `FlatTree` equivalent to
+    `markdown_to_html_node`.
+
+    Each block is copied into the arrays as soon as it is rendered, so the
+    object tree of the whole document never exists at once.
+
+    Args:
+        markdown (str): The input markdown string to be converted.
+    Returns:
+        FlatTree: The compact tree, rooted at a `<div>` node.
+    """
+    tree = FlatTree()
+    root = tree.add_node(NONE, PARENT, "div")
+    for block in markdown_to_blocks(markdown):
+        node = block_to_html_node(block)
+        if node is not None:
+            tree.add_subtree(root, node)
+    return tree
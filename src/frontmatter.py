@@ -0,0 +1,194 @@
+"""
+module contains front matter parsing for markdown pages
+
+Front matter is an optional header at the very top of a page, fenced by
+`---` lines (YAML-lite, `key: value`) or `+++` lines (TOML-style,
+`key = value`):
+
+    ---
+    date: 2024-05-01
+    tags: [tolkien, elves]
+    draft: false
+    ---
+"""
+import itertools
+import re
+from typing import Iterable, Iterator
+
+from blocks import BlockType, block_registry
+from sources import open_input
+
+# opening/closing fence -> key/value separator
+FRONT_MATTER_FENCES = {"---": ":", "+++": "="}
+
+# number of lines past the front matter read when looking for a title
+HEAD_MAX_LINES = 64
+
+
+def parse_front_matter_value(value: str):
+    """
+    Converts a raw front matter value into a Python value.
+
+    Supports quoted strings, `[a, b]` lists, `true`/`false` and integers;
+    anything else is returned as a stripped string (dates stay ISO strings,
+    which sort correctly).
+
+    Args:
+        value (str): The raw value text after the separator.
+    Returns:
+        The parsed value.
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.startswith("[") and value.endswith("]"):
+        inner = value[1:-1].strip()
+        if not inner:
+            return []
+        return [parse_front_matter_value(item) for item in inner.split(",")]
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    return value
+
+
+def parse_front_matter(lines: list[str], separator: str) -> dict:
+    """
+    Parses the lines between the front matter fences into a `dict`.
+
+    Besides `key<separator>value` lines, YAML-style block lists are
+    supported: a key with no value followed by `- item` lines.
+
+    Args:
+        lines (list[str]): The lines between the fences.
+        separator (str): `:` for YAML-lite, `=` for TOML-style.
+    Returns:
+        dict: The parsed front matter.
+    Raises:
+        ValueError: If a line is neither a key/value pair nor a list item.
+    """
+    data = {}
+    list_key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if list_key and stripped.startswith("- "):
+            data[list_key].append(parse_front_matter_value(stripped[2:]))
+            continue
+        key, sep, value = stripped.partition(separator)
+        if not sep or not key.strip():
+            raise ValueError(f"Invalid front matter line: {line}")
+        key = key.strip()
+        if value.strip():
+            data[key] = parse_front_matter_value(value)
+            list_key = None
+        else:
+            data[key] = []
+            list_key = key
+    return data
+
+
+def split_front_matter(markdown: str) -> tuple[dict, str]:
+    """
+    Splits a markdown string into its front matter and its body.
+
+    The body is always a suffix of `markdown`, so the number of lines taken
+    by the front matter is `markdown[:len(markdown) - len(body)].count("\\n")`.
+
+    Args:
+        markdown (str): The full contents of a page.
+    Returns:
+        tuple[dict, str]: The front matter (empty if there is none) and
+            the remaining markdown.
+    Raises:
+        ValueError: If the front matter is opened but never closed.
+    """
+    first_line, newline, rest = markdown.partition("\n")
+    fence = first_line.strip()
+    if fence not in FRONT_MATTER_FENCES or not newline:
+        return {}, markdown
+
+    lines = []
+    offset = len(first_line) + 1
+    for line in rest.splitlines(keepends=True):
+        offset += len(line)
+        if line.strip() == fence:
+            return parse_front_matter(lines, FRONT_MATTER_FENCES[fence]), markdown[offset:]
+        lines.append(line)
+    raise ValueError(f"Unclosed front matter, expected a closing {fence}")
+
+
+def read_front_matter(lines: Iterable[str]) -> tuple[dict, Iterator[str]]:
+    """
+    Reads the front matter at the start of `lines`, consuming only its
+    lines, so a page can be read line by line.
+
+    Args:
+        lines (Iterable[str]): The lines of the markdown page.
+    Returns:
+        tuple[dict, Iterator[str]]: The front matter, empty if the page has
+            none, and the remaining lines.
+    Raises:
+        ValueError: If the front matter is not closed.
+    """
+    lines = iter(lines)
+    first_line = next(lines, "")
+    fence = first_line.strip()
+    if fence not in FRONT_MATTER_FENCES:
+        return {}, itertools.chain([first_line], lines)
+    header = []
+    for line in lines:
+        if line.strip() == fence:
+            break
+        header.append(line)
+    else:
+        raise ValueError(
+            f"Unclosed front matter, expected a closing {fence}")
+    return parse_front_matter(header, FRONT_MATTER_FENCES[fence]), lines
+
+
+def _heading_title(block: list[str]) -> str | None:
+    # the text of a level 1 heading block, as the block parser finds it
+    if not block or not block[0].startswith("# "):
+        return None
+    if block_registry.find("\n".join(block)).block_type != BlockType.HEADING:
+        return None
+    return block[0][2:].strip()
+
+
+def read_page_header(path: str) -> tuple[dict, str | None]:
+    """
+    Reads only the head of a markdown file: its front matter and, unless
+    the front matter sets a `title`, its first level 1 heading.
+
+    The head is split into blocks the way the block parser splits the
+    page, so a `# ` line inside a paragraph or a code block is not taken
+    for the title. Only the first `HEAD_MAX_LINES` lines past the front
+    matter are read; a title further down is not found.
+
+    Args:
+        path (str): The path to the markdown file.
+    Returns:
+        tuple[dict, str | None]: The front matter and the page title, or
+            `None` if no title was found in the head.
+    Raises:
+        ValueError: If the front matter is malformed.
+    """
+    with open_input(path) as f:
+        front_matter, lines = read_front_matter(f)
+        if "title" in front_matter:
+            return front_matter, str(front_matter["title"])
+
+        block = []
+        for line in itertools.islice(lines, HEAD_MAX_LINES):
+            stripped = line.strip()
+            if stripped:
+                block.append(stripped)
+                continue
+            title = _heading_title(block)
+            if title is not None:
+                return front_matter, title
+            block = []
+    return front_matter, _heading_title(block)
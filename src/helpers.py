@@ -1,27 +1,64 @@
 """
 module contains helper functions for the project
 """
+import bisect
+import fnmatch
+import hashlib
 import re
 import os
-import shutil
-from enum import Enum
+from html import escape as escape_html
+from typing import Iterable, Iterator, TextIO
 
-from textnode import TextNode, TextType
+import sources
+from textnode import TextNode, TextType, text_node_to_html_node, text_nodes_to_html
 from parentnode import ParentNode
 from htmlnode import HTMLNode
 from leafnode import LeafNode
-
-
-class BlockType(Enum):
-    """
-    Enum class for valid markdown types.
-    """
-    PARAGRAPH = "paragraph"
-    HEADING = "heading"
-    CODE = "code"
-    QUOTE = "quote"
-    UNORDERED_LIST = "unordered_list"
-    ORDERED_LIST = "ordered_list"
+from pagemeta import PageMeta, count_terms
+from inlinecache import InlineCache
+from minify import Minifier
+from criticalcss import CriticalCSS, node_tags
+from templates import Template, TemplateLoader, compile_template
+from staging import OutputStager
+from changeset import BuildManifest
+from output import ArchiveOutput, FilesystemOutput
+from blocks import BlockType, block_registry
+from frontmatter import read_front_matter, read_page_header, split_front_matter
+
+# markdown files at least this large are rendered with `render_stream`
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+# a streamed page takes its fallback title once this much of its content
+# has been buffered without an h1
+STREAM_TITLE_BUFFER_BYTES = 1024 * 1024
+
+_IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_DELIMITER_PATTERN = re.compile(r"`|\*\*|_")
+# joins inline spans for the batched scans: an image or link match would
+# need "[(" inside its text or url and no delimiter contains "\x00", so
+# no match can cross from one span into the next
+_SPAN_SEPARATOR = "\x00[(\x00"
+
+# optional memo of parsed inline spans, see `set_inline_cache`
+_inline_cache = None
+# optional minifier of the rendered pages, see `set_minifier`
+_minifier = None
+# optional stylesheet inlining, see `set_critical_css`
+_critical_css = None
+# compiles and caches the page templates, see `set_template_loader`
+_template_loader = TemplateLoader()
+# optional staging of the output directories, see `set_output_stager`
+_output_stager = None
+# optional manifest of the written files, see `set_build_manifest`
+_build_manifest = None
+# where the site is written, see `set_output_backend`
+_output_backend = FilesystemOutput()
+# optional search terms of the parsed pages, see `set_search_terms`
+_search_terms = None
+
+# layouts picked by front matter or by the directory of a page live here,
+# relative to the directory of the default template
+LAYOUTS_DIR = "layouts"
 
 
 def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type: TextType) -> list[TextNode]:
@@ -32,6 +69,8 @@ def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type:
 
     Will raise `Exception` if the number of segments is even, meaning that the delimiter is not matched.
 
+    Runs in O(n) in the total text length: each text is split once with `str.split`.
+
     Args:
         old_nodes (list[TextNode]): List of `TextNode` objects to be split.
         delimiter (str): The delimiter string used to split the text.
@@ -67,13 +106,15 @@ def extract_markdown_images(text: str) -> list[tuple[str, str]]:
 
     It returns a `list` of `tuples` containing the image link and the alt text.
 
+    Runs in O(n): the alt text and url scans stop at the next bracket or
+    parenthesis, so no two match attempts scan the same characters.
+
     Args:
         text (str): The input text string containing markdown image links.
     Returns:
         list[tuple[str, str]]: A list of tuples containing the image link and the alt text.
     """
-    image_pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(image_pattern, text)
+    matches = _IMAGE_PATTERN.findall(text)
     return [(match[0], match[1]) for match in matches]
 
 
@@ -83,13 +124,15 @@ def extract_markdown_links(text: str) -> list[tuple[str, str]]:
 
     It returns a `list` of `tuples` containing the link and the anchor text.
 
+    Runs in O(n), for the same reason as `extract_markdown_images`; the
+    lookbehind only checks a single character.
+
     Args:
         text (str): The input text string containing markdown links.
     Returns:
         list[tuple[str, str]]: A list of tuples containing the link and the anchor text.
     """
-    link_pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(link_pattern, text)
+    matches = _LINK_PATTERN.findall(text)
     return [(match[0], match[1]) for match in matches]
 
 
@@ -99,6 +142,8 @@ def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
 
     It extracts the image links and alt text from the original nodes and creates new `TextNode` objects for each image. The original text is also preserved in the new nodes.
 
+    Runs in O(n): the nodes are sliced at the positions of a single scan.
+
     Args:
         old_nodes (list[TextNode]): List of `TextNode` objects to be split.
     Returns:
@@ -111,26 +156,22 @@ def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
         match node.text_type:
             case TextType.TEXT:
                 text = node.text
-                images = extract_markdown_images(text)
-                if not images:
-                    new_nodes.append(node)
-                    continue
                 curr_idx = 0
-                for alt, url in images:
-                    # Build the markdown string for this image
-                    image_md = f"![{alt}]({url})"
-                    # Find where this image markdown appears in the text
-                    idx = text.find(image_md, curr_idx)
-                    if idx == -1:
-                        continue  # Shouldn't happen, but safety
+                # positions come from the scan itself, so the text is
+                # walked once however many images it contains
+                for match in _IMAGE_PATTERN.finditer(text):
                     # Text before the image
-                    before = text[curr_idx:idx]
+                    before = text[curr_idx:match.start()]
                     if before:
                         new_nodes.append(TextNode(before, TextType.TEXT))
                     # The image node
-                    new_nodes.append(TextNode(alt, TextType.IMAGE, url))
+                    new_nodes.append(TextNode(
+                        match.group(1), TextType.IMAGE, match.group(2)))
                     # Move past this image
-                    curr_idx = idx + len(image_md)
+                    curr_idx = match.end()
+                if curr_idx == 0:
+                    new_nodes.append(node)
+                    continue
                 # Any text after the last image
                 after = text[curr_idx:]
                 if after:
@@ -146,6 +187,8 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
 
     It extracts the link and anchor text from the original nodes and creates new `TextNode` objects for each link. The original text is also preserved in the new nodes.
 
+    Runs in O(n): the nodes are sliced at the positions of a single scan.
+
     Args:
         old_nodes (list[TextNode]): List of `TextNode` objects to be split.
     Returns:
@@ -159,22 +202,18 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
         match node.text_type:
             case TextType.TEXT:
                 text = node.text
-                links = extract_markdown_links(text)
-                if not links:
-                    new_nodes.append(node)
-                    continue
                 current_idx = 0
-                for anchor, url in links:
-                    link_md = f"[{anchor}]({url})"
-                    index = text.find(link_md, current_idx)
-                    if index == -1:
-                        continue  # Shouldn't happen, but just in case
+                for match in _LINK_PATTERN.finditer(text):
                     # slice the text before the link
-                    before = text[current_idx:index]
+                    before = text[current_idx:match.start()]
                     if before:
                         new_nodes.append(TextNode(before, TextType.TEXT))
-                    new_nodes.append(TextNode(anchor, TextType.LINK, url))
-                    current_idx = index + len(link_md)  # move past this link
+                    new_nodes.append(TextNode(
+                        match.group(1), TextType.LINK, match.group(2)))
+                    current_idx = match.end()  # move past this link
+                if current_idx == 0:
+                    new_nodes.append(node)
+                    continue
                 after = text[current_idx:]
                 if after:
                     new_nodes.append(TextNode(after, TextType.TEXT))
@@ -190,6 +229,8 @@ def text_to_text_nodes(text: str) -> list[TextNode]:
 
     It splits the text into segments based on the delimiters and creates new `TextNode` objects for each segment.
 
+    Every stage is linear, so the whole conversion is O(n) in the text length.
+
     Args:
         text (str): The input text string to be converted.
     Returns:
@@ -208,19 +249,89 @@ def text_to_text_nodes(text: str) -> list[TextNode]:
     return nodes
 
 
+def _spans_matching(pattern: re.Pattern, buffer: str, starts: list[int]) -> set[int]:
+    # indexes of the spans with at least one match, one search per span found
+    spans = set()
+    position = 0
+    match = pattern.search(buffer, position)
+    while match is not None:
+        span = bisect.bisect_right(starts, match.start()) - 1
+        spans.add(span)
+        if span + 1 == len(starts):
+            break
+        match = pattern.search(buffer, starts[span + 1])
+    return spans
+
+
+def batch_text_to_text_nodes(texts: list[str]) -> list[list[TextNode]]:
+    """
+    Converts many inline spans into `TextNode` lists at once, with the same
+    result as calling `text_to_text_nodes` on each of them.
+
+    The spans are joined into a single buffer that is scanned once for
+    delimiters, images and links; only spans with a match go through the
+    corresponding split, so plain spans cost a single `TextNode`.
+
+    Runs in O(n + m log k) for n characters, m spans with a match and k
+    spans: every search resumes at the span after the previous match.
+
+    Args:
+        texts (list[str]): The inline spans to be converted.
+    Returns:
+        list[list[TextNode]]: The `TextNode` list of every span, in order.
+    """
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + len(_SPAN_SEPARATOR)
+    buffer = _SPAN_SEPARATOR.join(texts)
+    delimited = _spans_matching(_DELIMITER_PATTERN, buffer, starts)
+    with_images = _spans_matching(_IMAGE_PATTERN, buffer, starts)
+    with_links = _spans_matching(_LINK_PATTERN, buffer, starts)
+
+    results = []
+    for i, text in enumerate(texts):
+        nodes = [TextNode(text, TextType.TEXT)]
+        if i in delimited:
+            nodes = split_nodes_delimiter(nodes, "`",  TextType.CODE)
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+        if i in with_images:
+            nodes = split_nodes_image(nodes)
+        if i in with_links:
+            nodes = split_nodes_link(nodes)
+        results.append(nodes)
+    return results
+
+
 def markdown_to_blocks(text: str) -> list[str]:
     """
     Function takes a markdown `string` and splits it into blocks based on the markdown syntax.
 
     It returns a `list` of blocks, where each block is a string containing the text inside it.
 
+    Runs in O(n): the text is split into lines and every line is looked at
+    a constant number of times.
+
     Args:
         text (str): The input markdown string to be split into blocks.
     Returns:
         list[str]: A list of blocks, where each block is a string containing the text inside it.
     """
-    # Split on any line that is empty or contains only whitespace
-    blocks = re.split(r'(?:\r?\n\s*\n)+', text)
+    # Split on any line that is empty or contains only whitespace. Lines
+    # are visited once, unlike a regex whose whitespace runs may span
+    # several lines
+    blocks = []
+    current = []
+    for line in text.split("\n"):
+        if not line.isspace() and line:
+            current.append(line)
+        elif current:
+            blocks.append("\n".join(current))
+            current = []
+    if current:
+        blocks.append("\n".join(current))
     cleaned_blocks = []
     for block in blocks:
         # Strip each line in the block, then join back with \n
@@ -233,206 +344,576 @@ def markdown_to_blocks(text: str) -> list[str]:
     return cleaned_blocks
 
 
-def block_to_block_type(block: str) -> BlockType:
+def iter_markdown_blocks(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
     """
-    Function takes a markdown `block` and determines its type based on the markdown syntax.
+    Lazily splits markdown `lines` into the same blocks as `markdown_to_blocks`,
+    paired with the 1-based line number each block starts on.
 
-    It returns a `BlockType` enum value representing the type of the block.
+    Only the block being built is held in memory, so `lines` can be an open
+    file of any size.
+
+    Runs in O(n) in the document size; each line is stripped once.
 
     Args:
-        block (str): The input markdown block to be classified.
+        lines (Iterable[str]): The lines of the markdown document.
     Returns:
-        BlockType: The `BlockType` enum value representing the type of the block.
+        Iterator[tuple[int, str]]: The start line and text of each block.
     """
-    heading_pattern = r"^#{1,6} .*"
-    code_pattern = r"^```.*```$"
-    quote_pattern = r"^>( .*)?$"
-    unordered_list_pattern = r"^\s*-\s.*"
-    ordered_list_patter = r"^\s*(\d+)\.\s.*"
-
-    # to be used with multiline markdown blocks such as quotes, lists, etc.
-    lines = block.splitlines()
-
-    # Ensure heading starts with # but is between 1 and 6 #s
-    if re.match(heading_pattern, block):
-        return BlockType.HEADING
-    # Ensure codeblocks start with ``` and end with ```
-    elif re.match(code_pattern, block, re.DOTALL):
-        return BlockType.CODE
-    # Ensure quotes start with > and are followed by a space
-    elif all(re.match(quote_pattern, line) for line in lines):
-        return BlockType.QUOTE
-    # Ensure unordered lists start with - followed by a space (* is NOT supported)
-    elif all(re.match(unordered_list_pattern, line) for line in lines):
-        return BlockType.UNORDERED_LIST
-    # Ensure ordered lists start with 1. followed by a space (the dot is VERY important). Each item increments by 1.
-    elif all(re.match(ordered_list_patter, line) for line in lines):
-        expected_number = 1
-        for line in lines:
-            match = re.match(ordered_list_patter, line)
-            if not match or int(match.group(1)) != expected_number:
-                break
-            expected_number += 1
-        return BlockType.ORDERED_LIST
-    # Ensure paragraphs for all other cases
-    else:
-        return BlockType.PARAGRAPH
+    current = []
+    start = 0
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped:
+            if not current:
+                start = number
+            current.append(stripped)
+        elif current:
+            yield start, "\n".join(current)
+            current = []
+    if current:
+        yield start, "\n".join(current)
 
 
-def text_node_to_html_node(node: TextNode) -> LeafNode:
+def block_to_block_type(block: str) -> BlockType:
     """
-    Function converts a `TextNode` object representing inline markdown
-    into the corresponding HTML node.
+    Function takes a markdown `block` and determines its type based on the markdown syntax.
+
+    It returns a `BlockType` enum value representing the type of the block.
+    Blocks of a type added with `register_block_handler` return the
+    `block_type` of their handler instead.
 
     Args:
-        node (TextNode): The `TextNode` object to be converted.
+        block (str): The input markdown block to be classified.
     Returns:
-        LeafNode: The corresponding `LeafNode` object.
+        BlockType: The `BlockType` enum value representing the type of the block.
+    """
+    return block_registry.find(block).block_type
 
-    Raises:
-        Exception: If the text type of the node is unknown.
-    """
-    match node.text_type:
-        case TextType.TEXT:
-            return LeafNode(None, node.text)
-        case TextType.CODE:
-            return LeafNode("code", node.text)
-        case TextType.BOLD:
-            return LeafNode("b", node.text)
-        case TextType.ITALIC:
-            return LeafNode("i", node.text)
-        case TextType.IMAGE:
-            return LeafNode("img", node.text, {"src": node.url})
-        case TextType.LINK:
-            return LeafNode("a", node.text, {"href": node.url})
-        case _:
-            raise Exception(f"Unknown text type: {node.text_type}")
-
-
-def text_to_children(text: str) -> list[HTMLNode]:
+
+def text_to_children(text: str, meta: PageMeta = None) -> list[HTMLNode]:
     """
     Function converts a string of markdown text into a list of `HTMLNode` objects.
     representing inline elements such as links, images, and text.
 
+    If `meta` is given, the links, images and words of the text are recorded in it.
+
     Args:
         text (str): The input markdown text to be converted.
+        meta (PageMeta): Optional page metadata to record the inline elements in.
     Returns:
         list[HTMLNode]: A list of `HTMLNode` objects representing inline elements.
     """
-    text_nodes = text_to_text_nodes(text)
-    html_nodes = [
+    text_nodes, children = _parse_spans([text])[0]
+    if meta is not None:
+        meta.add_text_nodes(text_nodes)
+    return list(children)
+
+
+def _text_nodes_to_children(text_nodes: list[TextNode]) -> tuple[HTMLNode, ...]:
+    return tuple(
         text_node_to_html_node(node)
         for node in text_nodes
         if not (node.text_type == TextType.TEXT and node.text == "")
-    ]
-    return html_nodes
+    )
+
+
+def set_inline_cache(cache: InlineCache | None) -> None:
+    """
+    Installs `cache` in front of inline parsing, or removes the cache
+    when given `None`. Spans found in the cache are not parsed again.
+
+    Args:
+        cache (InlineCache | None): The cache to use from now on.
+    """
+    global _inline_cache
+    _inline_cache = cache
+
+
+def get_inline_cache() -> InlineCache | None:
+    """
+    Returns the installed inline cache, `None` if there is none.
+    """
+    return _inline_cache
+
+
+def set_minifier(minifier: Minifier | None) -> None:
+    """
+    Installs `minifier` for the pages rendered by `fill_template` and
+    `render_stream`, or turns minification off when given `None`.
+
+    Args:
+        minifier (Minifier | None): The minifier to use from now on.
+    """
+    global _minifier
+    _minifier = minifier
+
+
+def get_minifier() -> Minifier | None:
+    """
+    Returns the installed minifier, `None` if there is none.
+    """
+    return _minifier
+
+
+def set_critical_css(critical_css: CriticalCSS | None) -> None:
+    """
+    Installs `critical_css` to inline the stylesheet into the templates of
+    rendered pages, or stops inlining when given `None`.
+
+    Args:
+        critical_css (CriticalCSS | None): The inliner to use from now on.
+    """
+    global _critical_css
+    _critical_css = critical_css
+
+
+def get_critical_css() -> CriticalCSS | None:
+    """
+    Returns the installed stylesheet inliner, `None` if there is none.
+    """
+    return _critical_css
+
+
+def inline_page_css(html: str, tags: frozenset[str] = None) -> str:
+    """
+    Returns `html` with its stylesheet inlined when a `CriticalCSS` is
+    installed, `html` unchanged otherwise.
+
+    Args:
+        html (str): A page or page template.
+        tags (frozenset[str]): The tags of the page, to prune the CSS to,
+            or `None` if they are not known.
+    Returns:
+        str: The HTML with the stylesheet inlined.
+    """
+    if _critical_css is None:
+        return html
+    return _critical_css.apply(html, tags)
+
+
+def set_template_loader(loader: TemplateLoader) -> None:
+    """
+    Installs the loader page templates are compiled with, e.g. one with
+    a disk cache.
+
+    Args:
+        loader (TemplateLoader): The loader to use from now on.
+    """
+    global _template_loader
+    _template_loader = loader
+
+
+def get_template_loader() -> TemplateLoader:
+    """
+    Returns the installed template loader.
+    """
+    return _template_loader
+
+
+def set_output_stager(stager: OutputStager | None) -> None:
+    """
+    Installs `stager`, whose staging directories files are written to with
+    `write_output` and `copy_output`, or writes files in place when given
+    `None`.
+
+    Args:
+        stager (OutputStager | None): The stager to use from now on.
+    """
+    global _output_stager
+    _output_stager = stager
+
+
+def get_output_stager() -> OutputStager | None:
+    """
+    Returns the installed output stager, `None` if there is none.
+    """
+    return _output_stager
+
 
+def set_build_manifest(manifest: BuildManifest | None) -> None:
+    """
+    Installs `manifest` to record the hashes of the files written with
+    `write_output`, or stops recording when given `None`.
+
+    Args:
+        manifest (BuildManifest | None): The manifest to use from now on.
+    """
+    global _build_manifest
+    _build_manifest = manifest
+
+
+def get_build_manifest() -> BuildManifest | None:
+    """
+    Returns the installed build manifest, `None` if there is none.
+    """
+    return _build_manifest
+
+
+def set_output_backend(backend: FilesystemOutput | ArchiveOutput) -> None:
+    """
+    Installs the backend the site is written to, e.g. an archive instead
+    of the output directory.
+
+    Args:
+        backend (FilesystemOutput | ArchiveOutput): The backend to use from
+            now on.
+    """
+    global _output_backend
+    _output_backend = backend
+
+
+def get_output_backend() -> FilesystemOutput | ArchiveOutput:
+    """
+    Returns the installed output backend.
+    """
+    return _output_backend
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
+
+def set_search_terms(terms: dict[str, dict[str, int]] | None) -> None:
+    """
+    Installs `terms`, which `generate_page` fills with the search terms of
+    every page it parses, keyed by the path of its markdown file, so the
+    search index doesn't parse the pages again. Streamed pages count
+    theirs while they are rendered. Stops collecting when given `None`.
+
+    Args:
+        terms (dict[str, dict[str, int]] | None): The terms to fill from now on.
+    """
+    global _search_terms
+    _search_terms = terms
+
+
+def get_search_terms() -> dict[str, dict[str, int]] | None:
+    """
+    Returns the installed search terms, `None` if they aren't collected.
+    """
+    return _search_terms
+
+
+def _reuse_live_file(dest_path: str, matches) -> bool:
+    # links the live counterpart of a staged file when `matches` says it
+    # holds the right content. Staged files may share their inode with a
+    # live one, so anything else replaces the file instead of writing it
+    # in place
+    live_path = _output_stager.live_path(dest_path)
+    if live_path is None:
+        return False
+    if os.path.lexists(dest_path):
+        if os.path.exists(live_path) and os.path.samefile(dest_path, live_path) and matches(live_path):
+            return True
+        os.remove(dest_path)
+    if not os.path.exists(live_path) or not matches(live_path):
+        return False
+    try:
+        os.link(live_path, dest_path)
+    except OSError:
+        return False
+    return True
+
+
+def write_output(dest_path: str, data: str) -> bool:
+    """
+    Writes the text `data` to `dest_path` with the installed output
+    backend. In a staging directory of the installed `OutputStager`, a
+    live file with the same content is hardlinked instead. The hash of the
+    content goes to the installed `BuildManifest`.
+
+    Args:
+        dest_path (str): The file to write.
+        data (str): Its content.
+    Returns:
+        bool: `True` if the file was written, `False` if it was linked.
+    """
+    encoded = None
+    if _build_manifest is not None:
+        encoded = data.encode("utf-8")
+        _build_manifest.record(dest_path, hashlib.sha256(encoded).hexdigest())
+    if _output_stager is not None:
+        if encoded is None:
+            encoded = data.encode("utf-8")
+
+        def matches(live_path: str) -> bool:
+            if os.path.getsize(live_path) != len(encoded):
+                return False
+            with open(live_path, "rb") as f:
+                return f.read() == encoded
+
+        if _reuse_live_file(dest_path, matches):
+            return False
+    _output_backend.write_text(dest_path, data)
+    return True
+
+
+def copy_output(src_path: str, dest_path: str) -> bool:
+    """
+    Copies `src_path` to `dest_path` with the installed output backend,
+    along with its modification time. In a staging directory of the
+    installed `OutputStager`, a live file with the same size and
+    modification time is hardlinked instead. `src_path` can be in a
+    mounted archive (see `sources`).
+
+    Args:
+        src_path (str): The file to copy.
+        dest_path (str): Where to copy it.
+    Returns:
+        bool: `True` if the file was copied, `False` if it was linked.
+    """
+    src_stat = sources.stat(src_path)
+    if _output_stager is not None:
+
+        def matches(live_path: str) -> bool:
+            stat = os.stat(live_path)
+            return stat.st_size == src_stat.st_size and stat.st_mtime_ns == src_stat.st_mtime_ns
+
+        if _reuse_live_file(dest_path, matches):
+            return False
+    if sources.on_filesystem(src_path):
+        _output_backend.copy_file(src_path, dest_path)
+    else:
+        # files of a mounted archive are streamed straight to the output
+        with sources.open_input(src_path, "rb") as f:
+            _output_backend.copy_fileobj(f, dest_path, src_stat.st_mtime_ns)
+    return True
+
+
+def select_template(template_path: str, front_matter: dict, page: str = None) -> str:
+    """
+    Picks the template of a page. In order of precedence:
+
+    - front matter `template`: a path relative to the directory of
+      `template_path`
+    - front matter `layout`: `layouts/<layout>.html` in that directory
+    - the layout of the page's directory, or of the nearest parent
+      directory that has one: `layouts/blog.html` for `blog/post.md`
+    - `template_path`
+
+    Args:
+        template_path (str): The default template.
+        front_matter (dict): The front matter of the page.
+        page (str): The page path relative to the content directory, if
+            known, for directory layouts.
+    Returns:
+        str: The path of the template to render the page with.
+    """
+    template_dir = os.path.dirname(template_path)
+    if "template" in front_matter:
+        return os.path.join(template_dir, front_matter["template"])
+    layouts_dir = os.path.join(template_dir, LAYOUTS_DIR)
+    if "layout" in front_matter:
+        return os.path.join(layouts_dir, f"{front_matter['layout']}.html")
+    if page is not None and os.path.isdir(layouts_dir):
+        directory = os.path.dirname(page.replace(os.sep, "/"))
+        while directory:
+            layout = os.path.join(layouts_dir, f"{directory}.html")
+            if os.path.isfile(layout):
+                return layout
+            directory = os.path.dirname(directory)
+    return template_path
+
+
+def _parse_spans(texts: list[str]) -> list[tuple[tuple[TextNode, ...], tuple[HTMLNode, ...]]]:
+    # the text nodes and child nodes of every span, looked up in the inline
+    # cache first; the remaining spans are parsed in one batch. The results
+    # are shared and must not be modified
+    cache = _inline_cache
+    if len(texts) == 1 and cache is None:
+        text_nodes = text_to_text_nodes(texts[0])
+        return [(text_nodes, _text_nodes_to_children(text_nodes))]
+
+    # repeated spans of the same document are parsed once
+    parsed = {}
+    for text in texts:
+        if text not in parsed:
+            parsed[text] = None if cache is None else cache.get(text)
+    missing = [text for text, result in parsed.items() if result is None]
+    for text, text_nodes in zip(missing, batch_text_to_text_nodes(missing)):
+        parsed[text] = (tuple(text_nodes), _text_nodes_to_children(text_nodes))
+        if cache is not None:
+            cache.put(text, parsed[text])
+    return [parsed[text] for text in texts]
+
+
+def text_to_html(text: str) -> str:
+    """
+    Converts a string of inline markdown straight into an HTML fragment,
+    for callers that don't need the node objects.
+
+    Args:
+        text (str): The input markdown text to be converted.
+    Returns:
+        str: The same HTML as the `to_html` of `text_to_children(text)`.
+    """
+    return text_nodes_to_html(text_to_text_nodes(text))
+
+
+def _inline_html(text: str, terms: dict[str, int] = None) -> list[HTMLNode]:
+    # the inline span as one node holding its rendered HTML, its search
+    # terms counted into `terms`
+    text_nodes = text_to_text_nodes(text)
+    if terms is not None:
+        count_terms(text_nodes, terms)
+    return [LeafNode(None, text_nodes_to_html(text_nodes))]
+
+
+def _plain_text(nodes: list[HTMLNode]) -> str:
+    # the visible text of a list of inline nodes, images excluded
+    return "".join(node.value for node in nodes if node.tag != "img")
+
+
+_HEADING_TAGS = {f"h{level}" for level in range(1, 7)}
+
+
+def _record_block(node: HTMLNode, meta: PageMeta) -> None:
+    # headings and code words are taken from the rendered node, so block
+    # types added to the registry are recorded the same way
+    if node.tag in _HEADING_TAGS:
+        meta.add_heading(int(node.tag[1]), _plain_text(node.children).strip())
+    elif node.tag == "pre":
+        meta.word_count += sum(len(child.value.split())
+                               for child in node.children if child.value)
+
+
+def block_to_html_node(block: str, meta: PageMeta = None) -> HTMLNode | None:
+    """
+    Converts a single markdown block into its HTML node, using the block
+    handler the registry finds for it.
+
+    If `meta` is given, the headings, links, images and words of the block
+    are recorded in it.
+
+    Args:
+        block (str): The markdown block to be converted.
+        meta (PageMeta): Optional page metadata to fill while parsing.
+    Returns:
+        HTMLNode | None: The HTML node of the block, or `None` if the block
+            produces no output.
+    """
+    handler = block_registry.find(block)
+    if meta is None:
+        return handler.render(block, text_to_children)
+
+    node = handler.render(block, lambda text: text_to_children(text, meta))
+    if node is not None:
+        _record_block(node, meta)
+    return node
+
+
+def markdown_to_html_node(markdown: str, meta: PageMeta = None) -> ParentNode:
     """
     Converts a markdown document into a single `ParentNode` object 
     representing the HTML structure.
 
     Splits the markdown into blocks, determines the type of each block,
-    and creates the corresponding HTML nodes.
+    and creates the corresponding HTML nodes. The inline markdown of all
+    blocks is parsed together with `batch_text_to_text_nodes`.
 
     All block nodes are nested under a single `<div>` `ParentNode`.
 
+    Runs in O(n) in the document size, as every block and inline stage does.
+
+    If `meta` is given, the headings, links, images and word count of the
+    document are recorded in it during the same pass.
+
     Args:
         markdown (str): The input markdown string to be converted.
+        meta (PageMeta): Optional page metadata to fill while parsing.
     Returns:
         ParentNode: A `ParentNode` object representing the HTML structure of the markdown.
     """
-    markdown_blocks = markdown_to_blocks(markdown)
+    # the inline spans of all blocks are parsed in one batch at the end;
+    # `inline` hands out the lists their children are filled into
+    spans = []
+    pending_children = []
+
+    def inline(text: str) -> list[HTMLNode]:
+        span_children = []
+        spans.append(text)
+        pending_children.append(span_children)
+        return span_children
 
     children = []
 
-    for block in markdown_blocks:
-        block_type = block_to_block_type(block)
-
-        match block_type:
-            case BlockType.PARAGRAPH:
-                children.append(ParentNode(
-                    "p", text_to_children(block.replace("\n", " "))))
-            case BlockType.CODE:
-                # remove the starting and ending ``` from the block
-                code_content = block.strip().removeprefix(
-                    "```").removesuffix("```").strip() + "\n"
-                code_node = TextNode(code_content, TextType.CODE)
-                code_html = text_node_to_html_node(code_node)
-                children.append(ParentNode("pre", [code_html]))
-            case BlockType.HEADING:
-                # group the markdown #s and the text separately
-                match_heading = re.match(r"^(#{1,6}) (.*)", block)
-                if match_heading:
-                    # count the number of #s at the start of the block
-                    tag = f"h{len(match_heading.group(1))}"
-                    heading_text = match_heading.group(2)
-                    children.append(ParentNode(
-                        tag, text_to_children(heading_text)))
-            case BlockType.QUOTE:
-                # remove the starting > AND space from the block
-                quote_lines = [re.sub(r"^>\s?", "", line)
-                               for line in block.splitlines()]
-                quote_text = "\n".join(quote_lines)
-                quote_children = text_to_children(quote_text)
-                children.append(ParentNode("blockquote", quote_children))
-            case BlockType.UNORDERED_LIST:
-                items = []
-                for line in block.splitlines():
-                    # remove the starting - AND space from the line
-                    item_text = line[2:] if line.startswith("- ") else line
-                    items.append(ParentNode("li", text_to_children(item_text)))
-                children.append(ParentNode("ul", items))
-            case BlockType.ORDERED_LIST:
-                items = []
-                for line in block.splitlines():
-                    # remove the starting number AND dot AND space from the line
-                    item_text = re.sub(r"^\s*\d+\.\s+", "", line)
-                    items.append(ParentNode("li", text_to_children(item_text)))
-                children.append(ParentNode("ol", items))
+    for block in markdown_to_blocks(markdown):
+        node = block_registry.find(block).render(block, inline)
+        if node is not None:
+            children.append(node)
+
+    for span_children, (text_nodes, span_nodes) in zip(pending_children, _parse_spans(spans)):
+        if meta is not None:
+            meta.add_text_nodes(text_nodes)
+        span_children.extend(span_nodes)
+
+    if meta is not None:
+        for node in children:
+            _record_block(node, meta)
 
     return ParentNode("div", children)
 
 
-def copy_static(src: str, dest: str) -> None:
+def parse_markdown(markdown: str) -> tuple[ParentNode, PageMeta]:
+    """
+    Converts a markdown document into its HTML node tree and the `PageMeta`
+    collected while parsing it, in a single pass over the blocks.
+
+    Args:
+        markdown (str): The input markdown string to be converted.
+    Returns:
+        tuple[ParentNode, PageMeta]: The HTML structure and the page metadata.
+    """
+    meta = PageMeta()
+    html_node = markdown_to_html_node(markdown, meta)
+    return html_node, meta
+
+
+def copy_static(src: str, dest: str, minifier: Minifier = None) -> None:
     """
     Recursively copies the contents of the source directory to the destination directory.
 
     Deletes all contents of the destination directory before copying.
+    Files are copied with `copy_output`, so an unchanged asset in a staging
+    directory is linked from the live tree.
 
     Logs each file copied.
 
     Args:
         src (str): The source directory to copy from.
         dest (str): The destination directory to copy to.
+        minifier (Minifier): Optional minifier stylesheets are copied
+            through.
     Returns:
         None
     """
 
     # check if the destination directory exists and delete if so
-    if os.path.exists(dest):
-        shutil.rmtree(dest)
+    if _output_backend.remove_tree(dest):
         print(f"Deleted existing directory: {dest}")
 
     # Recursively copy src to dest
     def _copy_recursive(current_src: str, current_dest: str) -> None:
-        if not os.path.exists(current_dest):
-            os.mkdir(current_dest)
+        if not _output_backend.exists(current_dest):
+            _output_backend.makedirs(current_dest)
             print(f"Created directory: {current_dest}")
-        for entry in os.listdir(current_src):
+        for entry in sources.listdir(current_src):
             src_path = os.path.join(current_src, entry)
             dest_path = os.path.join(current_dest, entry)
-            if os.path.isdir(src_path):
+            if sources.isdir(src_path):
                 _copy_recursive(src_path, dest_path)
-            else:
-                shutil.copy(src_path, dest_path)
+            elif minifier is not None and entry.endswith(".css"):
+                with sources.open_input(src_path) as f:
+                    css = f.read()
+                if write_output(dest_path, minifier.css(css)):
+                    print(f"Minified file: {src_path} to {dest_path}")
+                else:
+                    print(f"Reused file: {dest_path}")
+            elif copy_output(src_path, dest_path):
                 print(f"Copied file: {src_path} to {dest_path}")
+            else:
+                print(f"Reused file: {dest_path}")
 
     _copy_recursive(src, dest)
 
 
-def extract_title(markdown: str) -> str:
+def extract_title(markdown: str, meta: PageMeta = None) -> str:
     """
     Extracts the first h1 header from the markdown string (line starting
     with '# ').
@@ -441,103 +922,466 @@ def extract_title(markdown: str) -> str:
     whitespace.
     Raises an exception if no header is found.
 
+    When the page has already been parsed, pass its `meta` and the title
+    is looked up instead of parsing the markdown again.
+
     Args:
         markdown (str): The input markdown string to extract the title from.
+        meta (PageMeta): Optional metadata collected while parsing the markdown.
     Returns:
         str: The extracted title text without the leading '# '.
     Raises:
         Exception: If no header is found in the markdown string.
     """
+    if meta is None:
+        _, meta = parse_markdown(markdown)
 
-    # Split the markdown into lines
-    lines = markdown.splitlines()
+    if meta.title is None:
+        raise Exception("No header found in the markdown file.")
+    return meta.title
 
-    # Find the first line that starts with the main heading
-    for line in lines:
-        if line.strip().startswith("# "):
-            # Remove the leading "# " and strip whitespace
-            return line.strip()[2:].strip()
-    raise Exception("No header found in the markdown file.")
 
+_SRCSET_PATTERN = re.compile(r'srcset="([^"]*)"')
 
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str) -> None:
+
+def _rebase_srcset(match: re.Match, basepath: str) -> str:
+    candidates = [
+        basepath + candidate[1:] if candidate.startswith("/") else candidate
+        for candidate in (part.strip() for part in match.group(1).split(","))]
+    return f'srcset="{", ".join(candidates)}"'
+
+
+def rebase_html(html: str, basepath: str) -> str:
+    """
+    Rewrites root-relative href/src attributes and every URL of `srcset`
+    attributes to `basepath`.
+
+    Args:
+        html (str): The HTML to rewrite.
+        basepath (str): The basepath the site is served from.
+    Returns:
+        str: The rewritten HTML.
+    """
+    html = html.replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
+    if 'srcset="' in html:
+        html = _SRCSET_PATTERN.sub(lambda match: _rebase_srcset(match, basepath), html)
+    return html
+
+
+def render_template(template: str | Template, title: str, content: str, context: dict = None, node: HTMLNode = None) -> str:
+    """
+    Renders the template with `{{ Title }}`, `{{ Content }}` and the
+    variables in `context`, inlining the stylesheet when a `CriticalCSS`
+    is installed. Links are left root-relative, so the result is the same
+    for every basepath; `finish_html` completes it for one.
+
+    Args:
+        template (str | Template): The HTML template, as source or compiled.
+        title (str): The page title.
+        content (str): The rendered HTML content of the page.
+        context (dict): Further template variables, e.g. the front matter.
+        node (HTMLNode): The node tree of `content`, if available.
+    Returns:
+        str: The page before rebasing.
+    """
+    if isinstance(template, str):
+        template = compile_template(template)
+    # Fill the template with the HTML string and title
+    variables = dict(context) if context else {}
+    variables["Title"] = title
+    variables["Content"] = content
+    html = template(variables)
+    if _critical_css is not None:
+        tags = None if node is None else template.tags | node_tags(node)
+        html = _critical_css.apply(html, tags)
+    return html
+
+
+def finish_html(html: str, basepath: str) -> str:
+    """
+    Rewrites root-relative URLs of a page rendered by `render_template`
+    to `basepath`, and minifies it when a minifier is installed.
+
+    Args:
+        html (str): The page before rebasing.
+        basepath (str): The basepath to replace in href/src attributes.
+    Returns:
+        str: The final HTML of the page.
+    """
+    html = rebase_html(html, basepath)
+    if _minifier is not None:
+        html = _minifier.html(html)
+    return html
+
+
+def fill_template(template: str | Template, title: str, content: str, basepath: str, context: dict = None, node: HTMLNode = None) -> str:
+    """
+    Renders the template with `{{ Title }}`, `{{ Content }}` and the
+    variables in `context`, and rewrites root-relative href/src attributes
+    to `basepath`. The stylesheet is inlined and the result minified when
+    those are installed.
+
+    Args:
+        template (str | Template): The HTML template, as source or compiled.
+        title (str): The page title.
+        content (str): The rendered HTML content of the page.
+        basepath (str): The basepath to replace in href/src attributes.
+        context (dict): Further template variables, e.g. the front matter.
+        node (HTMLNode): The node tree of `content`, if available.
+    Returns:
+        str: The final HTML of the page.
+    """
+    return finish_html(render_template(template, title, content, context, node), basepath)
+
+
+def render_stream(input_fp: TextIO, output_fp: TextIO, template: str, basepath: str = "/", fallback_title: str = None, terms: dict[str, int] = None) -> str:
+    """
+    Renders a markdown file into a template block by block, writing each
+    block's HTML to `output_fp` as soon as it is rendered.
+
+    The template is split at `{{ Content }}`; its head is written once the
+    title is known (from front matter or the first h1), then every block,
+    then the tail. Blocks before the title are buffered, so peak memory is
+    bounded by the largest block plus whatever precedes the title, not by
+    the size of the document. Once `STREAM_TITLE_BUFFER_BYTES` of content
+    are buffered without an h1, the page gets `fallback_title` instead and
+    later h1s are ordinary headings.
+
+    The output is identical to `generate_page` for the same input,
+    including minification when a minifier is installed. No `PageMeta` is
+    kept past the title, as it grows with the document; only the search
+    terms of the page are counted into `terms` when it is given.
+
+    Args:
+        input_fp (TextIO): The markdown file, read line by line.
+        output_fp (TextIO): Where the final HTML is written.
+        template (str): The HTML template.
+        basepath (str): The basepath to replace in href/src attributes.
+        fallback_title (str): The title of a page whose h1 doesn't come
+            early enough.
+        terms (dict[str, int]): Optional counts to add the search terms of
+            the page to, as `PageMeta` counts them.
+    Returns:
+        str: The page title.
+    Raises:
+        Exception: If no title is found in the front matter or markdown,
+            or too late without a `fallback_title`.
+    """
+    front_matter, lines = read_front_matter(input_fp)
+
+    if _minifier is not None:
+        output_fp = _minifier.stream(output_fp)
+
+    head, _, tail = template.partition("{{ Content }}")
+    meta = PageMeta()
+    if terms is not None:
+        meta.terms = terms
+        inline_html = lambda text: _inline_html(text, terms)
+    else:
+        inline_html = _inline_html
+    title = str(front_matter["title"]) if "title" in front_matter else None
+    pending = ["<div>"]
+    pending_size = 0
+
+    for _, block in iter_markdown_blocks(lines):
+        if title is None:
+            node = block_to_html_node(block, meta)
+        else:
+            # nothing is collected from the tree once the title is known,
+            # so the inline spans are rendered straight to HTML
+            node = block_registry.find(block).render(block, inline_html)
+        if node is not None:
+            pending.append(rebase_html(node.to_html(), basepath))
+            pending_size += len(pending[-1])
+        if title is None:
+            title = meta.title
+        if title is None and pending_size >= STREAM_TITLE_BUFFER_BYTES:
+            if fallback_title is None:
+                raise Exception(
+                    "No header found in the first "
+                    f"{STREAM_TITLE_BUFFER_BYTES} bytes of the markdown file.")
+            title = fallback_title
+        if title is not None and pending:
+            if head is not None:
+                output_fp.write(rebase_html(head.replace("{{ Title }}", escape_html(title)), basepath))
+                head = None
+            output_fp.write("".join(pending))
+            pending = []
+
+    if title is None:
+        raise Exception("No header found in the markdown file.")
+    if head is not None:
+        output_fp.write(rebase_html(head.replace("{{ Title }}", escape_html(title)), basepath))
+    output_fp.write("".join(pending) + "</div>")
+    output_fp.write(rebase_html(tail.replace("{{ Title }}", escape_html(title)), basepath))
+    if _minifier is not None:
+        output_fp.close()
+    return title
+
+
+def _fallback_title(from_path: str) -> str:
+    # the name of the page: its file name, or its directory for an index
+    name = os.path.splitext(os.path.basename(from_path))[0]
+    if name == "index":
+        name = os.path.basename(os.path.dirname(os.path.abspath(from_path))) or name
+    return name
+
+
+def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str, page: str = None, targets: list[tuple[str, str]] = None) -> bool:
     """
     Generates a full HTML page from a given markdown file and a template.
 
-    Replaces the `{{ title }}` and `{{ content}}` placeholders in the template
-    with the extracted title and generated HTML.
+    Renders the template with the extracted title as `{{ Title }}`, the
+    generated HTML as `{{ Content }}` and the front matter as further
+    variables.
+
+    Front matter at the top of the page is stripped before parsing. It can
+    set the `title`, pick another `template` or `layout` (see
+    `select_template`), or mark the page as a `draft`, which is skipped.
 
     Writes the result to the `dest_path`, creating directories as needed.
+    Each of `targets` gets a copy for its own basepath, rendered from the
+    same parse of the page; only streamed pages are parsed once per target.
 
     Args:
         from_path (str): The path to the markdown file to be converted.
         template_path (str): The path to the HTML template file.
         dest_path (str): The path where the generated HTML file will be saved.
+        basepath (str): The basepath to replace in href/src attributes.
+        page (str): The page path relative to the content directory, used
+            to pick a directory layout.
+        targets (list[tuple[str, str]]): Further `(basepath, dest_path)`
+            pairs to write the page to.
     Returns:
-        None
+        bool: `True` if the page was written, `False` if it is a draft.
     """
+    # Stream very large files instead of holding them in memory
+    if sources.stat(from_path).st_size >= STREAM_THRESHOLD_BYTES:
+        front_matter, _ = read_page_header(from_path)
+        markdown = None
+    else:
+        # Read the markdown file
+        with sources.open_input(from_path) as f:
+            markdown = f.read()
+        front_matter, markdown = split_front_matter(markdown)
+
+    if front_matter.get("draft") is True:
+        print(f"Skipping draft {from_path}")
+        return False
+    template_path = select_template(template_path, front_matter, page)
+
     print(
         f"Generating page from {from_path} to {dest_path} using template {template_path}")
 
-    # Read the markdown file
-    with open(from_path, "r", encoding="utf-8") as f:
-        markdown = f.read()
+    # Load the compiled template
+    template = _template_loader.load(template_path)
+
+    outputs = [(basepath, dest_path)] + (targets or [])
+    # Ensure the destination directories exist
+    for _, output_path in outputs:
+        _output_backend.makedirs(os.path.dirname(output_path))
+
+    if markdown is None:
+        # the streaming renderer fills the title and content placeholders
+        # itself
+        template_text = inline_page_css(template(
+            {**front_matter, "Title": "{{ Title }}", "Content": "{{ Content }}"}))
+        for i, (output_basepath, output_path) in enumerate(outputs):
+            # the terms are the same for every target, so they are
+            # counted while rendering the first
+            terms = None
+            if i == 0 and _search_terms is not None:
+                terms = _search_terms[from_path] = {}
+            # the backend only replaces the page once it is complete
+            with sources.open_input(from_path) as f, _output_backend.open_text(output_path) as out:
+                render_stream(f, out, template_text, output_basepath, _fallback_title(from_path), terms)
+        return True
+
+    # Convert the markdown variale to HTML, collecting the page metadata
+    html_node, meta = parse_markdown(markdown)
+    html_string = html_node.to_html()
+    if _search_terms is not None:
+        _search_terms[from_path] = meta.terms
 
-    # Read the template file
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = f.read()
+    # Front matter wins over the title found while parsing
+    if "title" in front_matter:
+        page_title = str(front_matter["title"])
+    else:
+        page_title = extract_title(markdown, meta)
 
-    # Convert the markdown variale to HTML
-    html_node = markdown_to_html_node(markdown)
-    html_string = html_node.to_html()
+    html = render_template(template, page_title, html_string,
+                           front_matter, html_node)
 
-    # Extract the title from the markdown
-    page_title = extract_title(markdown)
+    # Write the final HTML to the destination files
+    for output_basepath, output_path in outputs:
+        write_output(output_path, finish_html(html, output_basepath))
+    return True
 
-    # Replace the placeholders in the template with the HTML string and title
-    final_html = template.replace("{{ Title }}", page_title).replace(
-        "{{ Content }}", html_string)
-    # Replace the basepath in the HTML string
-    final_html = final_html.replace(
-        'href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
 
-    # Ensure the destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    """
+    Compiles a path glob into a regex. `**` matches any number of path
+    segments, `*` and `?` never match across a `/`.
+    """
+    pattern = pattern.strip("/")
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r"\Z")
+
+
+def _glob_matches_dir(regex: re.Pattern, rel_dir: str) -> bool:
+    # `blog` and `blog/**` both select the whole `blog` directory
+    return bool(regex.match(rel_dir) or regex.match(rel_dir + "/"))
+
+
+def _glob_may_match_below(pattern: str, rel_dir: str) -> bool:
+    """
+    Returns whether `pattern` could match some path inside `rel_dir`, so
+    directories that cannot contain an included page are never walked.
+    """
+    pattern_parts = pattern.strip("/").split("/")
+    for i, part in enumerate(rel_dir.split("/")):
+        if i >= len(pattern_parts):
+            return False
+        if pattern_parts[i] == "**":
+            return True
+        if not fnmatch.fnmatchcase(part, pattern_parts[i]):
+            return False
+    return True
+
+
+def discover_pages(dir_path: str, include: list[str] = None, exclude: list[str] = None) -> list[str]:
+    """
+    Walks `dir_path` and returns the paths of all markdown pages found in it.
+
+    Paths are relative to `dir_path`, use `/` as the separator and are sorted
+    so that every machine discovers the same pages in the same order.
+
+    `include` and `exclude` are globs matched against those relative paths
+    (`**` spans directories, e.g. `blog/**`). A pattern matching a directory
+    selects everything below it. When `include` is given only matching pages
+    are returned; pages matching `exclude` are always dropped. Directories
+    that are excluded, or that cannot contain an included page, are pruned
+    without being listed.
+
+    Args:
+        dir_path (str): The path to the directory containing markdown files.
+        include (list[str]): Optional globs a page must match to be returned.
+        exclude (list[str]): Optional globs of pages to skip.
+    Returns:
+        list[str]: The sorted relative paths of all selected `.md` files.
+    """
+    include = include or []
+    include_regexes = [_glob_to_regex(pattern) for pattern in include]
+    exclude_regexes = [_glob_to_regex(pattern) for pattern in exclude or []]
+    pages = []
+
+    def _walk(current_dir: str, rel_dir: str, included: bool) -> None:
+        for entry in sources.listdir(current_dir):
+            entry_path = os.path.join(current_dir, entry)
+            rel_path = f"{rel_dir}/{entry}" if rel_dir else entry
+            if sources.isdir(entry_path):
+                if any(_glob_matches_dir(regex, rel_path) for regex in exclude_regexes):
+                    continue
+                entry_included = included or any(
+                    _glob_matches_dir(regex, rel_path) for regex in include_regexes)
+                if entry_included or any(_glob_may_match_below(pattern, rel_path) for pattern in include):
+                    _walk(entry_path, rel_path, entry_included)
+            elif entry.endswith(".md"):
+                if any(regex.match(rel_path) for regex in exclude_regexes):
+                    continue
+                if included or any(regex.match(rel_path) for regex in include_regexes):
+                    pages.append(rel_path)
+
+    _walk(dir_path, "", not include)
+    return sorted(pages)
 
-    # Write the final HTML to the destination file
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
 
+def page_output_path(page: str) -> str:
+    """
+    Maps a relative markdown page path to its relative HTML output path.
 
-def generate_pages_recursive(dir_path: str, template_path: str, dest_dir_path: str, basepath: str) -> None:
+    Args:
+        page (str): The relative path of the markdown page, e.g. `blog/tom/index.md`.
+    Returns:
+        str: The relative path of the generated page, e.g. `blog/tom/index.html`.
+    """
+    return os.path.splitext(page)[0] + ".html"
+
+
+def generate_pages(pages: list[str], dir_path: str, template_path: str, dest_dir_path: str, basepath: str, targets: list[tuple[str, str]] = None) -> dict[str, str]:
+    """
+    Generates HTML pages for the given relative markdown `pages` found in
+    `dir_path` and writes them to `dest_dir_path`, preserving structure.
+
+    Every page is parsed once and also written under each of `targets`
+    for its basepath, so publishing a site under several prefixes costs
+    about one build.
+
+    Args:
+        pages (list[str]): Relative paths of the markdown pages to render.
+        dir_path (str): The path to the directory containing markdown files.
+        template_path (str): The path to the HTML template file.
+        dest_dir_path (str): The path where the generated HTML files will be saved.
+        basepath (str): The basepath to replace in href/src attributes.
+        targets (list[tuple[str, str]]): Further `(basepath, dest_dir_path)`
+            pairs to write the site to.
+    Returns:
+        dict[str, str]: A mapping of each rendered page to its relative output
+            path. Skipped drafts are left out.
+    """
+
+    # Ensure the destination directories exist
+    _output_backend.makedirs(dest_dir_path)
+    for _, target_dir in targets or []:
+        _output_backend.makedirs(target_dir)
+
+    outputs = {}
+    for page in pages:
+        output = page_output_path(page)
+        page_targets = [(target_basepath, os.path.join(target_dir, output))
+                        for target_basepath, target_dir in targets or []]
+        if generate_page(os.path.join(dir_path, page), template_path,
+                         os.path.join(dest_dir_path, output), basepath, page, page_targets):
+            outputs[page] = output
+    return outputs
+
+
+def generate_pages_recursive(dir_path: str, template_path: str, dest_dir_path: str, basepath: str, include: list[str] = None, exclude: list[str] = None) -> None:
     """
     Recursively generates HTML pages from markdown files in dir_path,
     using template_path, and writes them to dest_dir_path, preserving structure.
 
     Replaces href/src basepaths using the provided basepath.
 
+    Only pages selected by the `include`/`exclude` globs are rendered (see
+    `discover_pages`); outputs of other pages are left untouched.
+
     Args:
         dir_path (str): The path to the directory containing markdown files.
         template_path (str): The path to the HTML template file.
         dest_dir_path (str): The path where the generated HTML files will be saved.
         basepath (str): The basepath to replace in href/src attributes.
+        include (list[str]): Optional globs a page must match to be rendered.
+        exclude (list[str]): Optional globs of pages to skip.
     Returns:
         None
     """
-
-    # Ensure the destination directory exists
-    os.makedirs(dest_dir_path, exist_ok=True)
-
-    # Iterate through all files and directories in the source directory
-    for entry in os.listdir(dir_path):
-        entry_path = os.path.join(dir_path, entry)
-        dest_entry_path = os.path.join(dest_dir_path, entry)
-
-        if os.path.isdir(entry_path):
-            # Recursively process subdirectories
-            generate_pages_recursive(
-                entry_path, template_path, dest_entry_path, basepath)
-        elif entry_path.endswith(".md"):
-            # Change .md to .html for the output file
-            dest_html_path = os.path.splitext(dest_entry_path)[0] + ".html"
-            generate_page(entry_path, template_path, dest_html_path, basepath)
+    generate_pages(discover_pages(dir_path, include, exclude), dir_path,
+                   template_path, dest_dir_path, basepath)
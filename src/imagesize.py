@@ -0,0 +1,196 @@
+"""
+module contains header-only image dimension reading
+
+`image_size` reads the width and height of PNG, GIF, JPEG and WebP files
+from their headers without decoding any pixels. `ImageSizeCache` keeps the
+results on disk keyed by path, mtime and size, so repeated builds don't
+reopen unchanged images, and its `props` method is the image props
+provider installed with `textnode.set_image_props_provider`.
+"""
+import json
+import os
+import struct
+
+import sources
+
+CACHE_VERSION = 1
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# start-of-frame markers carrying the dimensions; C4, C8 and CC are not frames
+_JPEG_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# markers without a length field
+_JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+
+def _jpeg_size(f) -> tuple[int, int] | None:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        # any number of 0xFF fill bytes may precede a marker
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            # end of image or start of the compressed data
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in _JPEG_FRAME_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(head: bytes) -> tuple[int, int] | None:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25 and head[20] == 0x2F:
+        bits = struct.unpack("<I", head[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        return (int.from_bytes(head[24:27], "little") + 1,
+                int.from_bytes(head[27:30], "little") + 1)
+    return None
+
+
+def image_size(path: str) -> tuple[int, int] | None:
+    """
+    Reads the dimensions of an image from its header.
+
+    Args:
+        path (str): The path of a PNG, GIF, JPEG or WebP file.
+    Returns:
+        tuple[int, int] | None: The width and height in pixels, or `None`
+            if the format is not recognised or the header is truncated.
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    with sources.open_input(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(_PNG_SIGNATURE) and head[12:16] == b"IHDR" and len(head) >= 24:
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+    return None
+
+
+def resolve_static_url(static_dir: str, url: str) -> str | None:
+    """
+    Returns the file under `static_dir` that a site-absolute URL points to.
+
+    Args:
+        static_dir (str): The directory with static assets.
+        url (str): The URL as written in the markdown, e.g. `/images/a.png`.
+    Returns:
+        str | None: The absolute file path, `None` for external or relative
+            URLs and paths escaping the directory.
+    """
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    static_dir = os.path.abspath(static_dir)
+    path = os.path.normpath(os.path.join(
+        static_dir, url.split("?")[0].split("#")[0].lstrip("/")))
+    if not path.startswith(static_dir + os.sep):
+        return None
+    return path
+
+
+class ImageSizeCache:
+    """
+    Image dimensions keyed by path, reused while the file's mtime and size
+    are unchanged. Images outside `static_dir` are never read.
+    """
+
+    def __init__(self, static_dir: str, cache_path: str = None) -> None:
+        self.static_dir = os.path.abspath(static_dir)
+        self.cache_path = cache_path
+        self.entries = self._load() if cache_path else {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cached.get("version") != CACHE_VERSION:
+            return {}
+        return cached.get("images", {})
+
+    def save(self) -> None:
+        """
+        Writes the cache to `cache_path`, creating directories as needed.
+        """
+        if not self.cache_path:
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "images": self.entries}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def resolve(self, url: str) -> str | None:
+        """
+        Returns the file under `static_dir` of a site-absolute image URL,
+        `None` for external or relative URLs and paths escaping the
+        directory.
+        """
+        return resolve_static_url(self.static_dir, url)
+
+    def size(self, url: str) -> tuple[int, int] | None:
+        """
+        Returns the dimensions of the image at `url`, `None` if it can't be
+        found or read.
+        """
+        path = self.resolve(url)
+        if path is None:
+            return None
+        try:
+            stat = sources.stat(path)
+        except OSError:
+            return None
+        key = os.path.relpath(path, self.static_dir)
+        entry = self.entries.get(key)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            try:
+                dimensions = image_size(path)
+            except OSError:
+                return None
+            entry = self.entries[key] = {
+                "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                "dimensions": list(dimensions) if dimensions else None}
+        return tuple(entry["dimensions"]) if entry["dimensions"] else None
+
+    def props(self, url: str) -> dict:
+        """
+        The extra props of an image: its `width`/`height` when known, and
+        lazy loading and async decoding.
+        """
+        props = {}
+        dimensions = self.size(url)
+        if dimensions is not None:
+            props["width"], props["height"] = dimensions
+        props["loading"] = "lazy"
+        props["decoding"] = "async"
+        return props
@@ -0,0 +1,89 @@
+"""
+module contains the optional memo cache of parsed inline markdown spans
+
+Sites repeat a lot of inline text (navigation items, list entries,
+disclaimers pasted into many pages). With a cache installed through
+`helpers.set_inline_cache`, `text_to_children` and the batched document
+parser look every span up by its text before parsing it.
+"""
+import threading
+from collections import OrderedDict
+
+
+class InlineCache:
+    """
+    A bounded, thread-safe LRU cache from span text to its parsed result.
+
+    The cache holds at most `max_entries` spans totalling at most
+    `max_chars` characters of span text; spans longer than
+    `max_span_chars` are never cached, they rarely repeat. Cached values
+    are shared between all callers and must not be modified.
+
+    Worker processes each get their own copy of the cache, so its counters
+    only cover the process they are read in.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_chars: int = 1024 * 1024, max_span_chars: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.max_span_chars = max_span_chars
+        self.hits = 0
+        self.misses = 0
+        self.chars = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str):
+        """
+        Returns the cached value of `text`, or `None` on a miss.
+        """
+        with self._lock:
+            value = self._entries.get(text)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return value
+
+    def put(self, text: str, value) -> None:
+        """
+        Caches `value` for `text`, evicting the least recently used spans
+        until the limits hold again.
+        """
+        if len(text) > self.max_span_chars:
+            return
+        with self._lock:
+            if text in self._entries:
+                self._entries.move_to_end(text)
+                return
+            self._entries[text] = value
+            self.chars += len(text)
+            while len(self._entries) > self.max_entries or self.chars > self.max_chars:
+                evicted, _ = self._entries.popitem(last=False)
+                self.chars -= len(evicted)
+
+    def clear(self) -> None:
+        """
+        Drops every entry and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.chars = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters and the current size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "chars": self.chars}
+
+    def __repr__(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"InlineCache(hits={self.hits}, misses={self.misses}, hit_rate={rate:.0%}, "
+                f"entries={len(self._entries)}, chars={self.chars})")
@@ -1,5 +1,9 @@
 from htmlnode import HTMLNode
 
+# elements without content or closing tag, rendered from a `None` value
+VOID_ELEMENTS = frozenset({"area", "base", "br", "col", "embed", "hr", "img",
+                           "input", "link", "meta", "source", "track", "wbr"})
+
 
 class LeafNode(HTMLNode):
 
@@ -8,6 +12,9 @@ class LeafNode(HTMLNode):
 
     def to_html(self) -> str:
         if self.value is None:
+            if self.tag in VOID_ELEMENTS:
+                props = self.props_to_html()
+                return f"<{self.tag} {props}>" if props else f"<{self.tag}>"
             raise ValueError("leaf node must have a value")
 
         if self.tag is None:
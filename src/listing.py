@@ -0,0 +1,262 @@
+"""
+module contains the generated listing pages: the paginated blog index,
+per-tag pages, RSS/Atom feeds and the sitemap
+
+Everything here is built from the page index (see `pageindex`), never by
+parsing posts. The inputs of every output are hashed and remembered in a
+state file, so only the listing pages whose entries changed are written
+again.
+"""
+import datetime
+import email.utils
+import hashlib
+import json
+import os
+import re
+from html import escape as escape_html
+from xml.sax.saxutils import escape
+
+from helpers import fill_template, get_critical_css, get_minifier, get_output_backend, get_template_loader, write_output
+from leafnode import LeafNode
+from pageindex import filter_pages, sort_pages
+from parentnode import ParentNode
+
+PAGE_SIZE = 10
+FEED_SIZE = 20
+
+
+def tag_slug(tag: str) -> str:
+    """
+    Returns the URL-safe slug of a tag, e.g. `Middle Earth` -> `middle-earth`.
+    """
+    return re.sub(r"[^a-z0-9]+", "-", str(tag).lower()).strip("-")
+
+
+def _parse_date(value) -> datetime.datetime | None:
+    try:
+        date = datetime.date.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return datetime.datetime(date.year, date.month, date.day, tzinfo=datetime.timezone.utc)
+
+
+def _entry(index: dict, page: str) -> dict:
+    # the subset of an index entry a listing depends on
+    entry = index[page]
+    return {
+        "url": entry["url"],
+        "title": entry["title"] or entry["url"],
+        "date": str(entry["front_matter"].get("date", "")),
+        "tags": entry["front_matter"].get("tags", []),
+    }
+
+
+def _page_dir(base: str, number: int) -> str:
+    if number == 1:
+        return base
+    return f"{base}/page/{number}"
+
+
+def _listing_node(title: str, entries: list[dict], number: int, total: int, base_url: str) -> ParentNode:
+    items = []
+    for entry in entries:
+        children = [LeafNode("a", escape_html(entry["title"]), {"href": entry["url"]})]
+        if entry["date"]:
+            children.append(LeafNode(None, f" ({entry['date']})"))
+        items.append(ParentNode("li", children))
+
+    children = [LeafNode("h1", escape_html(title))]
+    if items:
+        children.append(ParentNode("ul", items))
+
+    nav = []
+    if number > 1:
+        nav.append(LeafNode("a", "< Newer", {
+                   "href": _page_dir(base_url, number - 1) + "/"}))
+    if number < total:
+        if nav:
+            nav.append(LeafNode(None, " "))
+        nav.append(LeafNode("a", "Older >", {
+                   "href": _page_dir(base_url, number + 1) + "/"}))
+    if nav:
+        children.append(ParentNode("p", nav))
+    return ParentNode("div", children)
+
+
+def _paginate(dest_base: str, url_base: str, title: str, entries: list[dict], page_size: int) -> dict[str, tuple[str, ParentNode, list]]:
+    pages = [entries[i:i + page_size]
+             for i in range(0, len(entries), page_size)] or [[]]
+    outputs = {}
+    for number, chunk in enumerate(pages, start=1):
+        page_title = title if number == 1 else f"{title} (page {number})"
+        output = _page_dir(dest_base, number) + "/index.html"
+        outputs[output] = (page_title, _listing_node(
+            page_title, chunk, number, len(pages), url_base), chunk)
+    return outputs
+
+
+def _absolute(site_url: str, basepath: str, url: str) -> str:
+    return site_url.rstrip("/") + basepath.rstrip("/") + url
+
+
+def render_rss(title: str, entries: list[dict], site_url: str, basepath: str, home_url: str) -> str:
+    """
+    Renders an RSS 2.0 feed of the given entries.
+    """
+    items = []
+    for entry in entries:
+        link = escape(_absolute(site_url, basepath, entry["url"]))
+        item = f"<item><title>{escape(entry['title'])}</title><link>{link}</link><guid>{link}</guid>"
+        date = _parse_date(entry["date"])
+        if date:
+            item += f"<pubDate>{email.utils.format_datetime(date)}</pubDate>"
+        items.append(item + "</item>")
+    link = escape(_absolute(site_url, basepath, home_url))
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<rss version="2.0"><channel><title>{escape(title)}</title><link>{link}</link>'
+            f'<description>{escape(title)}</description>{"".join(items)}</channel></rss>\n')
+
+
+def render_atom(title: str, entries: list[dict], site_url: str, basepath: str, home_url: str) -> str:
+    """
+    Renders an Atom feed of the given entries.
+    """
+    dates = [_parse_date(entry["date"]) for entry in entries]
+    known = [date for date in dates if date]
+    updated = max(known) if known else datetime.datetime(
+        1970, 1, 1, tzinfo=datetime.timezone.utc)
+    items = []
+    for entry, date in zip(entries, dates):
+        link = escape(_absolute(site_url, basepath, entry["url"]))
+        items.append(
+            f'<entry><title>{escape(entry["title"])}</title><link href="{link}"/><id>{link}</id>'
+            f'<updated>{(date or updated).isoformat()}</updated></entry>')
+    link = escape(_absolute(site_url, basepath, home_url))
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<feed xmlns="http://www.w3.org/2005/Atom"><title>{escape(title)}</title>'
+            f'<link href="{link}"/><id>{link}</id><updated>{updated.isoformat()}</updated>'
+            f'{"".join(items)}</feed>\n')
+
+
+def render_sitemap(urls: list[tuple[str, str]], site_url: str, basepath: str) -> str:
+    """
+    Renders a `sitemap.xml` for the given `(url, date)` pairs.
+    """
+    entries = []
+    for url, date in urls:
+        entry = f"<url><loc>{escape(_absolute(site_url, basepath, url))}</loc>"
+        if _parse_date(date):
+            entry += f"<lastmod>{date}</lastmod>"
+        entries.append(entry + "</url>")
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'{"".join(entries)}</urlset>\n')
+
+
+def _load_state(state_path: str) -> dict:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _output_settings() -> list:
+    # outputs are written again when minification or stylesheet inlining
+    # is switched or changed
+    minifier = get_minifier()
+    critical_css = get_critical_css()
+    return [None if minifier is None else minifier.unquote_attributes,
+            None if critical_css is None else critical_css.fingerprint]
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def generate_listings(index: dict, template_path: str, dest_dir_path: str, basepath: str, site_url: str = "", state_path: str = None, blog_prefix: str = "blog/", page_size: int = PAGE_SIZE) -> list[str]:
+    """
+    Generates the blog index, tag pages, feeds and sitemap from the page
+    index.
+
+    Posts are the non-draft pages under `blog_prefix` (except the blog's
+    own index page), newest first by their front matter `date`. Writes:
+
+    - `blog/index.html`, `blog/page/<n>/index.html`
+    - `tags/<tag>/index.html`, `tags/<tag>/page/<n>/index.html`
+    - `blog/feed.xml` (RSS), `blog/atom.xml` (Atom) and `sitemap.xml`,
+      only when `site_url` is set: feeds and sitemaps need absolute URLs
+
+    When `state_path` is given, an output is only written again if the
+    entries it shows, the template or the settings changed since the
+    last run, or if the file is missing.
+
+    Args:
+        index (dict): A page index from `build_page_index`.
+        template_path (str): The path to the HTML template file.
+        dest_dir_path (str): The directory the site is written to.
+        basepath (str): The basepath to replace in href/src attributes.
+        site_url (str): Scheme and host used for absolute URLs in feeds and
+            the sitemap, e.g. `https://example.com`; without it neither
+            is written.
+        state_path (str): Optional path of the JSON state file.
+        blog_prefix (str): The content directory holding the posts.
+        page_size (int): The number of posts per listing page.
+    Returns:
+        list[str]: The relative paths of the outputs that were written.
+    """
+    template = get_template_loader().load(template_path)
+
+    blog_dir = blog_prefix.strip("/")
+    blog_url = f"/{blog_dir}/"
+    posts = [page for page in filter_pages(index, prefix=blog_prefix)
+             if page != f"{blog_dir}/index.md"]
+    entries = [_entry(index, page) for page in sort_pages(index, posts)]
+
+    html_outputs = _paginate(blog_dir, f"/{blog_dir}", "Blog", entries, page_size)
+    tags = sorted({tag for entry in entries for tag in entry["tags"]})
+    for tag in tags:
+        tagged = [entry for entry in entries if tag in entry["tags"]]
+        html_outputs.update(_paginate(
+            f"tags/{tag_slug(tag)}", f"/tags/{tag_slug(tag)}", f"Posts tagged {tag}", tagged, page_size))
+
+    sitemap_urls = [(index[page]["url"], str(index[page]["front_matter"].get("date", "")))
+                    for page in sorted(filter_pages(index))]
+    sitemap_urls += [("/" + output[:-len("index.html")], "")
+                     for output in html_outputs]
+
+    settings = [template.source_hash, basepath, site_url,
+                os.path.abspath(dest_dir_path), _output_settings()]
+    feed_entries = entries[:FEED_SIZE]
+    outputs = {}
+    for output, (title, node, chunk) in html_outputs.items():
+        outputs[output] = (_digest(settings, title, chunk), lambda title=title, node=node: fill_template(
+            template, title, node.to_html(), basepath, node=node))
+    if site_url:
+        outputs[f"{blog_dir}/feed.xml"] = (_digest(settings, "rss", feed_entries), lambda: render_rss(
+            "Blog", feed_entries, site_url, basepath, blog_url))
+        outputs[f"{blog_dir}/atom.xml"] = (_digest(settings, "atom", feed_entries), lambda: render_atom(
+            "Blog", feed_entries, site_url, basepath, blog_url))
+        outputs["sitemap.xml"] = (_digest(settings, "sitemap", sitemap_urls), lambda: render_sitemap(
+            sitemap_urls, site_url, basepath))
+
+    previous = _load_state(state_path) if state_path else {}
+    backend = get_output_backend()
+    written = []
+    for output, (digest, render) in outputs.items():
+        dest_path = os.path.join(dest_dir_path, output)
+        if previous.get(output) == digest and backend.exists(dest_path):
+            continue
+        backend.makedirs(os.path.dirname(dest_path))
+        write_output(dest_path, render())
+        print(f"Generated listing {dest_path}")
+        written.append(output)
+
+    if state_path:
+        state_dir = os.path.dirname(state_path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump({output: digest for output,
+                      (digest, _) in outputs.items()}, f)
+    return written
@@ -1,23 +1,404 @@
+import argparse
+import hashlib
+import os
 import sys
-from helpers import copy_static, generate_pages_recursive
+from helpers import copy_static, discover_pages, generate_pages, get_build_manifest, get_minifier, set_build_manifest, set_critical_css, set_inline_cache, set_minifier, set_output_backend, set_output_stager, set_search_terms, set_template_loader
+from imagesize import ImageSizeCache
+from inlinecache import InlineCache
+from minify import Minifier
+from output import ArchiveOutput, FilesystemOutput
+from changeset import BuildManifest
+from check import check_site
+from criticalcss import CriticalCSS
+from deploy import DEFAULT_JOBS, deploy, parse_destination
+from listing import generate_listings
+from pageindex import build_page_index
+from responsive import ResponsiveImages, build_image_variants, collect_image_urls
+from search import build_search_index
+from shard import build_shard, merge_shards, parse_shard
+from sources import mount_source, parse_source, unmount_source
+from staging import OutputStager
+from templates import TemplateLoader
+from textnode import set_image_props_provider
 
 
-def main():
+def parse_target(spec: str) -> tuple[str, str]:
+    """
+    Parses a `--target` value of the form `BASEPATH:OUTDIR`.
+    """
+    basepath, separator, out = spec.partition(":")
+    if not separator or not basepath.startswith("/") or not out:
+        raise argparse.ArgumentTypeError(
+            f"Expected BASEPATH:OUTDIR with an absolute basepath, got {spec!r}")
+    return basepath, out
 
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    else:
-        basepath = "/"
 
-    copy_static("static", "docs")
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="only render the pages owned by shard i of N")
+    parser.add_argument("--out", default="docs",
+                        help="directory the site is written to")
+    parser.add_argument("--target", action="append", type=parse_target, metavar="BASEPATH:OUTDIR",
+                        help="also write the site for BASEPATH to OUTDIR, from the same parse; "
+                             "can be repeated")
+    parser.add_argument("--only", action="append", metavar="GLOB",
+                        help="only render pages matching GLOB, e.g. 'blog/**'")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="skip pages matching GLOB, e.g. 'drafts/**'")
+    parser.add_argument("--site-url", default="",
+                        help="scheme and host for absolute URLs in feeds and the sitemap, "
+                             "which are only written when it is set")
+    parser.add_argument("--inline-cache", type=int, default=0, metavar="ENTRIES",
+                        help="cache up to ENTRIES parsed inline spans repeated across pages")
+    parser.add_argument("--no-image-variants", dest="image_variants", action="store_false",
+                        help="don't generate resized variants of images (they need Pillow)")
+    add_minify_arguments(parser)
+    add_staging_arguments(parser)
+    add_source_arguments(parser)
+    parser.add_argument("--inline-css", action="store_true",
+                        help="inline the stylesheet into every page")
+    parser.add_argument("--prune-css", action="store_true",
+                        help="inline only the CSS rules a page can use and load the rest asynchronously")
+    return parser
 
-    generate_pages_recursive(
-        "content",
-        "template.html",
-        "docs",
-        basepath
-    )
+
+def add_minify_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--minify", action="store_true",
+                        help="minify the HTML pages and the stylesheets")
+    parser.add_argument("--unquote-attributes", action="store_true",
+                        help="with --minify, drop quotes from attribute values that don't need them")
+
+
+def add_source_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--content-from", metavar="ARCHIVE[:DIR]",
+                        help="read the pages from a zip or tar archive, or from DIR inside it, "
+                             "instead of content/")
+    parser.add_argument("--static-from", metavar="ARCHIVE[:DIR]",
+                        help="read the static assets from a zip or tar archive, or from DIR "
+                             "inside it, instead of static/")
+
+
+def mount_inputs(parser: argparse.ArgumentParser, args: argparse.Namespace) -> list[str]:
+    """
+    Mounts the archives given for the input directories. Returns the
+    directories to unmount once the build is done.
+    """
+    mounted = []
+    for path, spec in (("content", args.content_from), ("static", args.static_from)):
+        if not spec:
+            continue
+        try:
+            mount_source(path, parse_source(spec))
+        except ValueError as e:
+            for mounted_path in mounted:
+                unmount_source(mounted_path)
+            parser.error(str(e))
+        mounted.append(path)
+    return mounted
+
+
+def add_staging_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--in-place", action="store_true",
+                        help="write straight into the output directory instead of staging the "
+                             "site next to it and swapping it in once the build succeeded")
+    parser.add_argument("--archive", metavar="FILE",
+                        help="write the site to a .zip, .tar, .tar.gz or .tgz archive instead of "
+                             "the output directory")
+    parser.add_argument("--no-precompress", dest="precompress", action="store_false",
+                        help="with --archive, leave out the .gz variants of text files")
+
+
+def make_output(args: argparse.Namespace) -> tuple[ArchiveOutput | None, OutputStager | None]:
+    """
+    Returns the archive or the stager the site is written with, depending
+    on the arguments, and installs them.
+    """
+    if args.archive:
+        archive = ArchiveOutput(args.archive, args.out, args.precompress)
+        set_output_backend(archive)
+        return archive, None
+    stager = None if args.in_place else OutputStager()
+    set_output_stager(stager)
+    return None, stager
+
+
+def finish_output(archive: ArchiveOutput | None, stager: OutputStager | None, succeeded: bool) -> None:
+    """
+    Publishes the archive or staged site of a build when it succeeded,
+    drops it otherwise, and restores writing into the output directory.
+    """
+    try:
+        if archive is not None:
+            if succeeded:
+                archive.close()
+            else:
+                archive.abort()
+        if stager is not None:
+            if succeeded:
+                stager.commit()
+            else:
+                stager.abort()
+    finally:
+        set_output_backend(FilesystemOutput())
+        set_output_stager(None)
+
+
+def make_minifier(args: argparse.Namespace) -> Minifier | None:
+    if not args.minify:
+        return None
+    return Minifier(".cache/minify", args.unquote_attributes)
+
+
+def build_merge_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py merge")
+    parser.add_argument("shard_dirs", nargs="+",
+                        help="output directories of the shard builds")
+    parser.add_argument("--out", default="docs",
+                        help="directory the merged site is written to")
+    parser.add_argument("--basepath", default="/")
+    parser.add_argument("--site-url", default="",
+                        help="scheme and host for absolute URLs in feeds and the sitemap, "
+                             "which are only written when it is set")
+    add_minify_arguments(parser)
+    add_staging_arguments(parser)
+    add_source_arguments(parser)
+    return parser
+
+
+def listing_state_path(output: str) -> str:
+    """
+    Returns the listing state of a build writing `output`, a directory or
+    an archive, that shares the output with other builds.
+    """
+    digest = hashlib.sha1(os.path.abspath(output).encode("utf-8")).hexdigest()[:12]
+    return f".cache/listings-{digest}.json"
+
+
+def build_indexes(out: str, basepath: str, site_url: str, listing_state: str = ".cache/listings.json") -> None:
+    index = build_page_index("content", ".cache/page-index.json")
+    generate_listings(index, "template.html", out, basepath,
+                      site_url, listing_state)
+    build_search_index(index, "content", out, basepath,
+                       ".cache/search-terms.json")
+
+
+def build_deploy_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py deploy")
+    parser.add_argument("destination",
+                        help="directory or s3://bucket/prefix to upload the site to")
+    parser.add_argument("--out", default="docs",
+                        help="output directory of the build to deploy")
+    parser.add_argument("--endpoint",
+                        help="URL of the S3-compatible endpoint, for s3:// destinations")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"number of concurrent transfers (default: {DEFAULT_JOBS})")
+    return parser
+
+
+def build_check_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py check")
+    parser.add_argument("--only", action="append", metavar="GLOB",
+                        help="only check pages matching GLOB")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="skip pages matching GLOB")
+    parser.add_argument("--jobs", type=int,
+                        help="number of worker processes (default: CPU count)")
+    return parser
+
+
+def build(args: argparse.Namespace, responsive_images: ResponsiveImages = None, stager: OutputStager = None) -> None:
+    pages = discover_pages("content", args.only, args.exclude)
+    if args.shard:
+        index, count = args.shard
+        # shards only need the srcset of their pages, the variants
+        # themselves are written by the merge
+        if responsive_images is not None:
+            responsive_images.manifest = build_image_variants(
+                collect_image_urls("content", pages), "static")
+        build_shard(pages, index, count,
+                    "content", "template.html", args.out, args.basepath)
+        return
+
+    # every target gets the same site for its own basepath
+    targets = [(args.basepath, args.out)] + (args.target or [])
+    # a selective build only re-renders the chosen pages and leaves the
+    # rest of the output, including static assets, untouched
+    selective = bool(args.only or args.exclude)
+    # (basepath, output directory, directory written to)
+    outputs = [(basepath, out, stager.stage(out, keep=selective) if stager else out)
+               for basepath, out in targets]
+    manifest = get_build_manifest()
+    if manifest is not None:
+        for _, out, dest in outputs:
+            manifest.track(dest, out)
+
+    for _, _, dest in outputs:
+        if not selective:
+            copy_static("static", dest, get_minifier())
+        if responsive_images is not None:
+            responsive_images.manifest = build_image_variants(
+                collect_image_urls("content", pages), "static", dest)
+
+    generate_pages(pages, "content", "template.html", outputs[0][2], args.basepath,
+                   [(basepath, dest) for basepath, _, dest in outputs[1:]])
+    for basepath, out, dest in outputs:
+        # targets and archives keep separate listing states so they don't
+        # rewrite each other's listings, or make a directory build skip its
+        # stale ones
+        listing_state = ".cache/listings.json"
+        if args.archive:
+            listing_state = listing_state_path(args.archive)
+        elif len(targets) > 1:
+            listing_state = listing_state_path(out)
+        build_indexes(dest, basepath, args.site_url, listing_state)
+    if manifest is not None:
+        manifest.scan()
+
+
+def main(argv: list[str] = None) -> int:
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # compiled templates are reused across builds
+    set_template_loader(TemplateLoader(".cache/templates"))
+
+    if argv and argv[0] == "merge":
+        parser = build_merge_parser()
+        args = parser.parse_args(argv[1:])
+        mounted = mount_inputs(parser, args)
+        minifier = make_minifier(args)
+        archive, stager = make_output(args)
+        # archives aren't deployed from the output directory
+        manifest = None if archive else BuildManifest()
+        set_build_manifest(manifest)
+        succeeded = False
+        try:
+            dest = stager.stage(args.out) if stager else args.out
+            if manifest is not None:
+                manifest.track(dest, args.out)
+            merge_shards(args.shard_dirs, "static", dest, minifier)
+            build_image_variants(collect_image_urls("content", discover_pages("content")),
+                                 "static", dest)
+            set_minifier(minifier)
+            build_indexes(dest, args.basepath, args.site_url,
+                          listing_state_path(args.archive) if args.archive else ".cache/listings.json")
+            if manifest is not None:
+                manifest.scan()
+            succeeded = True
+        finally:
+            set_minifier(None)
+            set_build_manifest(None)
+            finish_output(archive, stager, succeeded)
+            for path in mounted:
+                unmount_source(path)
+        # the manifests describe the published site, so they are only
+        # saved once it is in place
+        if manifest is not None:
+            manifest.finish()
+        return 0
+
+    if argv and argv[0] == "deploy":
+        parser = build_deploy_parser()
+        args = parser.parse_args(argv[1:])
+        try:
+            target = parse_destination(args.destination, args.endpoint)
+        except ValueError as e:
+            parser.error(str(e))
+        try:
+            deploy(args.out, target, args.jobs)
+        except (ValueError, OSError) as e:
+            print(e)
+            return 1
+        return 0
+
+    if argv and argv[0] == "check":
+        args = build_check_parser().parse_args(argv[1:])
+        errors = check_site("content", args.only, args.exclude, args.jobs)
+        for error in errors:
+            print(error)
+        print(f"Found {len(errors)} error(s)")
+        return 1 if errors else 0
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.shard and args.target:
+        parser.error("--target can't be combined with --shard")
+    if args.archive and (args.shard or args.target or args.only or args.exclude):
+        parser.error("--archive holds a whole site and can't be combined with "
+                     "--shard, --target, --only or --exclude")
+    mounted = mount_inputs(parser, args)
+
+    minifier = make_minifier(args)
+    critical_css = None
+    if args.inline_css or args.prune_css:
+        try:
+            critical_css = CriticalCSS("static/index.css", prune=args.prune_css, minifier=minifier)
+        except FileNotFoundError:
+            for path in mounted:
+                unmount_source(path)
+            parser.error("--inline-css and --prune-css need the stylesheet static/index.css")
+
+    inline_cache = None
+    if args.inline_cache > 0:
+        inline_cache = InlineCache(max_entries=args.inline_cache)
+        set_inline_cache(inline_cache)
+    set_minifier(minifier)
+    set_critical_css(critical_css)
+    # images get their dimensions and lazy loading attributes
+    image_sizes = ImageSizeCache("static", ".cache/image-sizes.json")
+    # and a srcset of their resized variants
+    responsive_images = ResponsiveImages() if args.image_variants else None
+
+    def image_props(url: str) -> dict:
+        props = image_sizes.props(url)
+        if responsive_images is not None:
+            props.update(responsive_images.props(url))
+        return props
+
+    set_image_props_provider(image_props)
+    # the search index takes the terms of the pages from their rendering
+    set_search_terms({})
+    archive, stager = None, None
+    # shard outputs are only read by the merge, which stages its own
+    if not args.shard:
+        archive, stager = make_output(args)
+    # every file of the site is recorded for the changeset of the build
+    manifest = None if args.shard or archive else BuildManifest()
+    set_build_manifest(manifest)
+    succeeded = False
+    try:
+        build(args, responsive_images, stager)
+        succeeded = True
+    finally:
+        finish_output(archive, stager, succeeded)
+        set_build_manifest(None)
+        for path in mounted:
+            unmount_source(path)
+        set_inline_cache(None)
+        set_minifier(None)
+        set_critical_css(None)
+        set_image_props_provider(None)
+        set_search_terms(None)
+    # the manifests describe the published site, so they are only saved
+    # once it is in place
+    if manifest is not None:
+        manifest.finish()
+    image_sizes.save()
+    if inline_cache is not None:
+        stats = inline_cache.stats()
+        print(f"Inline cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries")
+    if minifier is not None:
+        # only a complete build knows every entry the site needs
+        pruned = 0
+        if not (args.shard or args.only or args.exclude):
+            pruned = minifier.prune()
+        print(f"Minify cache: {minifier.hits} hits, {minifier.misses} misses, {pruned} pruned")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
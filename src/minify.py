@@ -0,0 +1,365 @@
+"""
+module contains the HTML and CSS minifiers of the output pipeline
+
+`HTMLMinifier` works incrementally: text fed in chunks comes out minified
+as soon as it can be, so streamed pages are minified as they are written.
+It collapses runs of whitespace to one space, drops whitespace next to
+block-level tags and comments, and normalizes the inside of tags. Text in
+`pre`, `code` and `textarea` and the contents of `script` and `style` are
+left untouched.
+
+`Minifier` bundles both minifiers with a disk cache keyed by the content
+hash of the input; it is installed for a build with
+`helpers.set_minifier`. A complete build prunes the entries it didn't
+use, so the cache stays the size of one site.
+"""
+import hashlib
+import os
+import re
+
+# bump to invalidate cached outputs when the minifiers change
+VERSION = 1
+
+# whitespace next to these tags doesn't render
+BLOCK_TAGS = frozenset({
+    "html", "head", "body", "title", "meta", "link", "base", "style", "script",
+    "noscript", "article", "section", "nav", "aside", "header", "footer", "main",
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt",
+    "dd", "blockquote", "pre", "figure", "figcaption", "hr", "br", "table",
+    "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset", "legend",
+})
+# text inside these tags keeps its whitespace
+PRESERVE_TAGS = frozenset({"pre", "code", "textarea"})
+# these tags hold raw text that is never parsed as markup
+RAW_TEXT_TAGS = frozenset({"script", "style"})
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "source", "track", "wbr",
+})
+
+# HTML whitespace; unlike `\s` this excludes non-breaking spaces
+_WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+_TAG = re.compile(r"""<(/?)([A-Za-z][A-Za-z0-9-]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""")
+_ATTRIBUTE = re.compile(
+    r"""([^\s"'=<>/]+)(?:[ \t\n\r\f]*=[ \t\n\r\f]*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?""")
+# attribute values that are safe without quotes
+_UNQUOTED_VALUE = re.compile(r"[A-Za-z0-9_./:#?&%+-]+")
+_RAW_TEXT_ENDS = {tag: re.compile(f"</{tag}", re.IGNORECASE) for tag in RAW_TEXT_TAGS}
+
+
+class HTMLMinifier:
+    """
+    An incremental HTML minifier. Everything passed to `feed` comes out,
+    minified, across the results of `feed` and the final `close`.
+
+    With `unquote_attributes`, quotes are dropped from attribute values
+    that don't need them.
+    """
+
+    def __init__(self, unquote_attributes: bool = False) -> None:
+        self.unquote_attributes = unquote_attributes
+        self._buffer = ""
+        # depth of the PRESERVE_TAGS around the current position
+        self._preserve = 0
+        # the closing tag pattern while inside a script or style
+        self._raw_text_end = None
+        # whitespace seen but not written yet
+        self._space = False
+        # whether whitespace at the current position can be dropped
+        self._after_block = True
+
+    def feed(self, text: str) -> str:
+        """
+        Adds `text` and returns the minified output that is ready.
+        """
+        self._buffer += text
+        return self._drain(final=False)
+
+    def close(self) -> str:
+        """
+        Returns the rest of the output. The minifier can't be fed again.
+        """
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> str:
+        buffer = self._buffer
+        out = []
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            if self._raw_text_end is not None:
+                match = self._raw_text_end.search(buffer, pos)
+                if match is None:
+                    # hold back what could be the start of the closing tag
+                    safe = end if final else max(pos, end - 8)
+                    out.append(buffer[pos:safe])
+                    pos = safe
+                    break
+                out.append(buffer[pos:match.start()])
+                pos = match.start()
+                self._raw_text_end = None
+
+            lt = buffer.find("<", pos)
+            if lt == -1:
+                self._text(buffer[pos:], out)
+                pos = end
+                break
+            if lt > pos:
+                self._text(buffer[pos:lt], out)
+                pos = lt
+            if pos + 1 >= end and not final:
+                break
+
+            if buffer.startswith("<!--", pos):
+                close = buffer.find("-->", pos + 4)
+                if close == -1:
+                    if not final:
+                        break
+                    close = end - 3
+                comment = buffer[pos:close + 3]
+                # conditional comments are markup
+                if comment.startswith("<!--[if"):
+                    self._markup(comment, out)
+                pos = close + 3
+                continue
+
+            if buffer.startswith(("<!", "<?"), pos):
+                gt = buffer.find(">", pos)
+                if gt == -1:
+                    if not final:
+                        break
+                    gt = end - 1
+                self._markup(buffer[pos:gt + 1], out)
+                pos = gt + 1
+                continue
+
+            match = _TAG.match(buffer, pos)
+            if match is None:
+                next_character = buffer[pos + 1:pos + 2]
+                if (next_character.isalpha() or next_character == "/") and not final:
+                    # an unfinished tag
+                    break
+                self._text("<", out)
+                pos += 1
+                continue
+            self._tag(match, out)
+            pos = match.end()
+
+        self._buffer = buffer[pos:]
+        return "".join(out)
+
+    def _text(self, text: str, out: list[str]) -> None:
+        if self._preserve or self._raw_text_end is not None:
+            out.append(text)
+            return
+        collapsed = _WHITESPACE.sub(" ", text)
+        core = collapsed.strip(" ")
+        if not core:
+            self._space = True
+            return
+        if (self._space or collapsed[0] == " ") and not self._after_block:
+            out.append(" ")
+        out.append(core)
+        self._space = collapsed[-1] == " "
+        self._after_block = False
+
+    def _markup(self, markup: str, out: list[str]) -> None:
+        # doctypes, processing instructions and conditional comments
+        # behave like block tags
+        out.append(markup)
+        self._space = False
+        self._after_block = True
+
+    def _tag(self, match: re.Match, out: list[str]) -> None:
+        closing, name, attributes = match.groups()
+        lower = name.lower()
+        is_block = lower in BLOCK_TAGS
+
+        if not self._preserve:
+            if self._space and not is_block and not self._after_block:
+                out.append(" ")
+            self._space = False
+            self._after_block = is_block
+
+        parts = [f"<{closing}{name}"]
+        for attribute in _ATTRIBUTE.finditer(attributes):
+            key, value = attribute.groups()
+            if value is None:
+                parts.append(f" {key}")
+                continue
+            if self.unquote_attributes and value[0] in "\"'" and _UNQUOTED_VALUE.fullmatch(value[1:-1]):
+                value = value[1:-1]
+            parts.append(f" {key}={value}")
+        self_closing = attributes.rstrip().endswith("/")
+        if self_closing and lower not in VOID_TAGS:
+            # an unquoted value would swallow the slash
+            parts.append("/" if parts[-1][-1] in "\"'" or len(parts) == 1 else " /")
+        parts.append(">")
+        out.append("".join(parts))
+
+        if lower in PRESERVE_TAGS and not self_closing:
+            if closing:
+                self._preserve = max(0, self._preserve - 1)
+            else:
+                self._preserve += 1
+        elif lower in RAW_TEXT_TAGS and not closing and not self_closing:
+            self._raw_text_end = _RAW_TEXT_ENDS[lower]
+
+
+def minify_html(html: str, unquote_attributes: bool = False) -> str:
+    """
+    Minifies a complete HTML document or fragment.
+
+    Args:
+        html (str): The HTML to minify.
+        unquote_attributes (bool): Drop quotes from attribute values that
+            don't need them.
+    Returns:
+        str: The minified HTML.
+    """
+    minifier = HTMLMinifier(unquote_attributes)
+    return minifier.feed(html) + minifier.close()
+
+
+# strings and comments, which the CSS rules below must not touch
+_CSS_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r"[ \t\n\r\f]*([{};,>])[ \t\n\r\f]*")
+_CSS_COLON = re.compile(r":[ \t\n\r\f]+")
+
+
+def _minify_css_code(code: str) -> str:
+    code = _WHITESPACE.sub(" ", code)
+    code = _CSS_PUNCTUATION.sub(r"\1", code)
+    # a space before a colon is a descendant selector, only the one after
+    # can go
+    code = _CSS_COLON.sub(":", code)
+    return code.replace(";}", "}")
+
+
+def minify_css(css: str) -> str:
+    """
+    Minifies a stylesheet: drops comments and the whitespace around
+    punctuation and the last semicolon of each rule. Strings are kept
+    as they are.
+
+    Args:
+        css (str): The stylesheet.
+    Returns:
+        str: The minified stylesheet.
+    """
+    out = []
+    pos = 0
+    for match in _CSS_TOKEN.finditer(css):
+        out.append(_minify_css_code(css[pos:match.start()]))
+        token = match.group()
+        if not token.startswith("/*"):
+            out.append(token)
+        elif token.startswith("/*!"):
+            # license comments are kept
+            out.append(token)
+        pos = match.end()
+    out.append(_minify_css_code(css[pos:]))
+    # a rule ending right before a removed comment leaves a stray ";}"
+    return "".join(out).replace(";}", "}").strip()
+
+
+class _MinifyingWriter:
+    """
+    A file-like wrapper minifying the HTML written through it.
+    """
+
+    def __init__(self, fp, unquote_attributes: bool) -> None:
+        self.fp = fp
+        self.minifier = HTMLMinifier(unquote_attributes)
+
+    def write(self, text: str) -> int:
+        self.fp.write(self.minifier.feed(text))
+        return len(text)
+
+    def close(self) -> None:
+        """
+        Writes the rest of the output; the wrapped file stays open.
+        """
+        self.fp.write(self.minifier.close())
+
+
+class Minifier:
+    """
+    The minifiers of a build, with outputs cached on disk under
+    `cache_dir` by the content hash of their input.
+    """
+
+    def __init__(self, cache_dir: str = None, unquote_attributes: bool = False) -> None:
+        self.cache_dir = cache_dir
+        self.unquote_attributes = unquote_attributes
+        self.hits = 0
+        self.misses = 0
+        # cache files read or written by this minifier
+        self._used = set()
+
+    def _cached(self, kind: str, text: str, minify) -> str:
+        if self.cache_dir is None:
+            self.misses += 1
+            return minify(text)
+        digest = hashlib.sha256(
+            f"{VERSION}\0{kind}\0{self.unquote_attributes}\0{text}".encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, kind, digest[:2], digest)
+        self._used.add(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                minified = f.read()
+            self.hits += 1
+            return minified
+        except OSError:
+            pass
+        self.misses += 1
+        minified = minify(text)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(minified)
+        os.replace(tmp_path, path)
+        return minified
+
+    def prune(self) -> int:
+        """
+        Removes the cache entries this minifier didn't use. Only call it
+        after a complete build, as the entries of pages left out of a
+        build would be lost.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return 0
+        removed = 0
+        for root, dirs, names in os.walk(self.cache_dir, topdown=False):
+            for name in names:
+                path = os.path.join(root, name)
+                if path not in self._used:
+                    os.remove(path)
+                    removed += 1
+            if root != self.cache_dir and not os.listdir(root):
+                os.rmdir(root)
+        return removed
+
+    def html(self, html: str) -> str:
+        """
+        Returns `html` minified.
+        """
+        return self._cached("html", html,
+                            lambda text: minify_html(text, self.unquote_attributes))
+
+    def css(self, css: str) -> str:
+        """
+        Returns `css` minified.
+        """
+        return self._cached("css", css, minify_css)
+
+    def stream(self, fp) -> _MinifyingWriter:
+        """
+        Wraps `fp` so the HTML written through it is minified as it
+        streams; call `close` on the wrapper when done. Streamed output
+        isn't cached, as its content is not known up front.
+        """
+        return _MinifyingWriter(fp, self.unquote_attributes)
@@ -0,0 +1,271 @@
+"""
+module contains the backends the site is written to
+
+Everything a build writes goes through the installed backend (see
+`helpers.set_output_backend`):
+
+- `FilesystemOutput` writes files into the output directory, the default
+- `ArchiveOutput` streams them into a single tar or zip archive as they
+  are rendered, along with gzip compressed variants of text files for
+  servers that serve precompressed files
+
+Backends take the paths the files would have on disk. An archive names
+its entries relative to the output directory.
+"""
+import contextlib
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import BinaryIO, Iterator, TextIO
+
+# file types that get a `.gz` variant in archives
+PRECOMPRESS_EXTENSIONS = frozenset({
+    ".html", ".css", ".js", ".json", ".xml", ".svg", ".txt", ".map",
+})
+# smaller files gain too little to be worth a variant
+PRECOMPRESS_MIN_BYTES = 256
+
+
+class FilesystemOutput:
+    """
+    Writes the site into its output directory.
+    """
+
+    def makedirs(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+
+    def remove_tree(self, path: str) -> bool:
+        """
+        Removes a directory written by an earlier build. Returns whether
+        there was one.
+        """
+        if not os.path.exists(path):
+            return False
+        shutil.rmtree(path)
+        return True
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def write_text(self, path: str, data: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+    @contextlib.contextmanager
+    def open_text(self, path: str) -> Iterator[TextIO]:
+        """
+        Opens `path` for writing. The text goes to a temporary file that
+        replaces `path` once closed, so a failed write leaves the previous
+        file in place, and a staged link to the live file is replaced
+        rather than written through.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                yield f
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+    def copy_file(self, src_path: str, path: str) -> None:
+        shutil.copy2(src_path, path)
+
+    def copy_fileobj(self, fileobj: BinaryIO, path: str, mtime_ns: int) -> None:
+        """
+        Writes the contents of `fileobj` to `path`, with the modification
+        time of the file it was read from.
+        """
+        with open(path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def place_file(self, src_path: str, path: str) -> None:
+        """
+        Adds a file that is never modified in place, like a cached image
+        derivative, sharing its inode when possible. A destination that is
+        the same file, or a copy with the same size and modification time,
+        is left alone.
+        """
+        if os.path.exists(path):
+            if os.path.samefile(path, src_path):
+                return
+            stat, src_stat = os.stat(path), os.stat(src_path)
+            if (stat.st_size, stat.st_mtime_ns) == (src_stat.st_size, src_stat.st_mtime_ns):
+                return
+            os.remove(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(src_path, path)
+        except OSError:
+            shutil.copy2(src_path, path)
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class ArchiveOutput:
+    """
+    Streams the site into the archive `archive_path`: a `.zip`, `.tar`,
+    `.tar.gz` or `.tgz`. Files are appended in one sequential write as they
+    are produced, with a `.gz` variant of every text file when
+    `precompress` is set. The archive only replaces `archive_path` once it
+    is closed, so a failed build leaves the previous one in place.
+
+    Args:
+        archive_path (str): The archive to write.
+        root (str): The output directory entries are named relative to.
+        precompress (bool): Add `.gz` variants of text files.
+    """
+
+    def __init__(self, archive_path: str, root: str, precompress: bool = True) -> None:
+        self.archive_path = archive_path
+        self.root = os.path.abspath(root)
+        self.precompress = precompress
+        self.mtime = int(time.time())
+        self._names = set()
+        directory = os.path.dirname(archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        if archive_path.endswith(".zip"):
+            self._zip = zipfile.ZipFile(self._file, "w", zipfile.ZIP_DEFLATED)
+            self._tar = None
+        elif archive_path.endswith((".tar.gz", ".tgz")):
+            self._zip = None
+            self._tar = tarfile.open(fileobj=self._file, mode="w|gz", format=tarfile.PAX_FORMAT)
+        elif archive_path.endswith(".tar"):
+            self._zip = None
+            self._tar = tarfile.open(fileobj=self._file, mode="w|", format=tarfile.PAX_FORMAT)
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+            raise ValueError(
+                f"Unknown archive type {archive_path}, expected .zip, .tar, .tar.gz or .tgz")
+
+    def _name(self, path: str) -> str:
+        rel_path = os.path.relpath(os.path.abspath(path), self.root)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise ValueError(f"{path} is outside of the archived directory {self.root}")
+        return rel_path.replace(os.sep, "/")
+
+    def _add(self, name: str, fileobj: BinaryIO, size: int, compress: bool = True) -> None:
+        if name in self._names:
+            raise ValueError(f"{name} was already written to {self.archive_path}")
+        self._names.add(name)
+        if self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self._tar.addfile(info, fileobj)
+        else:
+            info = zipfile.ZipInfo(name, time.localtime(self.mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            with self._zip.open(info, "w") as entry:
+                shutil.copyfileobj(fileobj, entry)
+
+    def _add_bytes(self, path: str, data: bytes) -> None:
+        name = self._name(path)
+        self._add(name, io.BytesIO(data), len(data))
+        if (self.precompress and len(data) >= PRECOMPRESS_MIN_BYTES
+                and os.path.splitext(name)[1] in PRECOMPRESS_EXTENSIONS):
+            compressed = gzip.compress(data, 9, mtime=0)
+            self._add(f"{name}.gz", io.BytesIO(compressed), len(compressed), compress=False)
+
+    def makedirs(self, path: str) -> None:
+        # entries carry their directories
+        pass
+
+    def remove_tree(self, path: str) -> bool:
+        return False
+
+    def exists(self, path: str) -> bool:
+        return self._name(path) in self._names
+
+    def write_text(self, path: str, data: str) -> None:
+        self._add_bytes(path, data.encode("utf-8"))
+
+    @contextlib.contextmanager
+    def open_text(self, path: str) -> Iterator[TextIO]:
+        # tar headers need the size up front, so the text is spooled to a
+        # temporary file first
+        with tempfile.TemporaryFile() as spool:
+            text = io.TextIOWrapper(spool, encoding="utf-8")
+            yield text
+            text.flush()
+            size = spool.tell()
+            spool.seek(0)
+            name = self._name(path)
+            self._add(name, spool, size)
+            if self.precompress and os.path.splitext(name)[1] in PRECOMPRESS_EXTENSIONS:
+                spool.seek(0)
+                with tempfile.TemporaryFile() as compressed:
+                    with gzip.GzipFile(fileobj=compressed, mode="wb", compresslevel=9, mtime=0) as f:
+                        shutil.copyfileobj(spool, f)
+                    size = compressed.tell()
+                    compressed.seek(0)
+                    self._add(f"{name}.gz", compressed, size, compress=False)
+            text.detach()
+
+    def copy_file(self, src_path: str, path: str) -> None:
+        name = self._name(path)
+        if self.precompress and os.path.splitext(name)[1] in PRECOMPRESS_EXTENSIONS:
+            with open(src_path, "rb") as f:
+                self._add_bytes(path, f.read())
+            return
+        with open(src_path, "rb") as f:
+            self._add(name, f, os.fstat(f.fileno()).st_size)
+
+    def copy_fileobj(self, fileobj: BinaryIO, path: str, mtime_ns: int) -> None:
+        name = self._name(path)
+        if self.precompress and os.path.splitext(name)[1] in PRECOMPRESS_EXTENSIONS:
+            self._add_bytes(path, fileobj.read())
+            return
+        # tar headers need the size up front
+        with tempfile.TemporaryFile() as spool:
+            shutil.copyfileobj(fileobj, spool)
+            size = spool.tell()
+            spool.seek(0)
+            self._add(name, spool, size)
+
+    def place_file(self, src_path: str, path: str) -> None:
+        self.copy_file(src_path, path)
+
+    def close(self) -> None:
+        """
+        Finishes the archive and moves it into place.
+        """
+        if self._tar is not None:
+            self._tar.close()
+        else:
+            self._zip.close()
+        self._file.close()
+        os.replace(self._tmp_path, self.archive_path)
+        print(f"Wrote {len(self._names)} files to {self.archive_path}")
+
+    def abort(self) -> None:
+        """
+        Drops the unfinished archive.
+        """
+        # the archive object writes its trailer when closed or collected,
+        # so it is closed before the file it writes to
+        with contextlib.suppress(Exception):
+            if self._tar is not None:
+                self._tar.close()
+            else:
+                self._zip.close()
+        self._file.close()
+        with contextlib.suppress(OSError):
+            os.remove(self._tmp_path)
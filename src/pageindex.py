@@ -0,0 +1,153 @@
+"""
+module contains the metadata-only page index
+
+The index holds the front matter and title of every page, read from the
+head of each file without parsing the markdown body. It is cached on disk
+and an entry is only re-read when its file's mtime or size changes, so
+listing, sorting and filtering pages costs O(headers) rather than
+O(documents).
+"""
+import json
+import os
+
+import sources
+from frontmatter import read_page_header
+from helpers import discover_pages, text_to_text_nodes
+from textnode import TextType
+
+INDEX_VERSION = 2
+
+
+def page_url(page: str) -> str:
+    """
+    Returns the site URL of a relative page path, e.g. `blog/tom/index.md`
+    becomes `/blog/tom/` and `about.md` becomes `/about.html`.
+    """
+    if page == "index.md":
+        return "/"
+    if page.endswith("/index.md"):
+        return "/" + page[:-len("index.md")]
+    return "/" + os.path.splitext(page)[0] + ".html"
+
+
+def _index_entry(dir_path: str, page: str, stat: os.stat_result) -> dict:
+    front_matter, title = read_page_header(os.path.join(dir_path, page))
+    if title is not None:
+        # drop inline markdown so listings show the same text as the page
+        title = "".join(node.text for node in text_to_text_nodes(title)
+                        if node.text_type != TextType.IMAGE).strip()
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "url": page_url(page),
+        "title": title,
+        "front_matter": front_matter,
+    }
+
+
+def load_page_index(cache_path: str) -> dict:
+    """
+    Loads a cached page index, returning an empty one if the cache is
+    missing, unreadable or from another index version.
+    """
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cached.get("version") != INDEX_VERSION:
+        return {}
+    return cached.get("pages", {})
+
+
+def save_page_index(cache_path: str, index: dict) -> None:
+    """
+    Writes the page index to `cache_path`, creating directories as needed.
+    """
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "pages": index}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def build_page_index(dir_path: str, cache_path: str = None, include: list[str] = None, exclude: list[str] = None) -> dict:
+    """
+    Builds the index of every page discovered under `dir_path`.
+
+    Entries whose file mtime and size match the cache at `cache_path` are
+    reused; only new or changed pages have their head re-read. The
+    refreshed index is written back to the cache.
+
+    Args:
+        dir_path (str): The path to the directory containing markdown files.
+        cache_path (str): Optional path of the JSON cache file.
+        include (list[str]): Optional globs a page must match to be indexed.
+        exclude (list[str]): Optional globs of pages to skip.
+    Returns:
+        dict: Maps each relative page path to its entry, a `dict` with
+            `url`, `title` and `front_matter` keys.
+    """
+    cached = load_page_index(cache_path) if cache_path else {}
+
+    index = {}
+    for page in discover_pages(dir_path, include, exclude):
+        stat = sources.stat(os.path.join(dir_path, page))
+        entry = cached.get(page)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            entry = _index_entry(dir_path, page, stat)
+        index[page] = entry
+
+    if cache_path and index != cached:
+        save_page_index(cache_path, index)
+    return index
+
+
+def filter_pages(index: dict, tag: str = None, prefix: str = None, include_drafts: bool = False) -> list[str]:
+    """
+    Selects pages from the index by tag and path prefix.
+
+    Args:
+        index (dict): A page index from `build_page_index`.
+        tag (str): Only keep pages whose `tags` contain this tag.
+        prefix (str): Only keep pages whose path starts with this prefix.
+        include_drafts (bool): Keep pages marked `draft: true`.
+    Returns:
+        list[str]: The selected relative page paths.
+    """
+    pages = []
+    for page, entry in index.items():
+        front_matter = entry["front_matter"]
+        if front_matter.get("draft") is True and not include_drafts:
+            continue
+        if prefix is not None and not page.startswith(prefix):
+            continue
+        if tag is not None and tag not in front_matter.get("tags", []):
+            continue
+        pages.append(page)
+    return pages
+
+
+def sort_pages(index: dict, pages: list[str], key: str = "date", reverse: bool = True) -> list[str]:
+    """
+    Sorts pages by a front matter field, newest first for dates. Pages
+    without the field sort last; ties are broken by path.
+
+    Args:
+        index (dict): A page index from `build_page_index`.
+        pages (list[str]): The relative page paths to sort.
+        key (str): The front matter field to sort by.
+        reverse (bool): Sort in descending order.
+    Returns:
+        list[str]: The sorted page paths.
+    """
+    with_key = [page for page in pages
+                if key in index[page]["front_matter"]]
+    without_key = sorted(page for page in pages
+                         if key not in index[page]["front_matter"])
+    with_key.sort(key=lambda page: page)
+    with_key.sort(key=lambda page: str(
+        index[page]["front_matter"][key]), reverse=reverse)
+    return with_key + without_key
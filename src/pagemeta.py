@@ -0,0 +1,78 @@
+import re
+
+from textnode import TextNode, TextType
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase search terms, dropping single characters.
+    """
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+def count_terms(text_nodes: list[TextNode], terms: dict[str, int]) -> None:
+    """
+    Adds the search terms of one inline span to the counts in `terms`.
+    Link text and image alt text are search terms, inline code is not.
+    """
+    for node in text_nodes:
+        if node.text_type != TextType.CODE:
+            for term in tokenize(node.text):
+                terms[term] = terms.get(term, 0) + 1
+
+
+class PageMeta:
+    """
+    Metadata collected while a page is parsed, so features such as the
+    title, a table of contents or a search index don't need another pass
+    over the markdown.
+    """
+
+    def __init__(self) -> None:
+        self.title = None
+        self.headings = []
+        self.links = []
+        self.images = []
+        self.word_count = 0
+        # search term -> number of occurrences, inline code excluded
+        self.terms = {}
+
+    def add_text_nodes(self, text_nodes: list[TextNode]) -> None:
+        """
+        Records the links, images, words and search terms (see
+        `count_terms`) of one inline span.
+        """
+        for node in text_nodes:
+            if node.text_type == TextType.LINK:
+                self.links.append((node.text, node.url))
+            elif node.text_type == TextType.IMAGE:
+                self.images.append((node.text, node.url))
+        count_terms(text_nodes, self.terms)
+        self.word_count += len("".join(node.text for node in text_nodes
+                                       if node.text_type != TextType.IMAGE).split())
+
+    def add_heading(self, level: int, text: str) -> None:
+        """
+        Records a heading; the first level 1 heading becomes the title.
+        """
+        self.headings.append((level, text))
+        if level == 1 and self.title is None:
+            self.title = text
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PageMeta):
+            return False
+        return (
+            self.title == other.title
+            and self.headings == other.headings
+            and self.links == other.links
+            and self.images == other.images
+            and self.word_count == other.word_count
+            and self.terms == other.terms
+        )
+
+    def __repr__(self) -> str:
+        return (f"PageMeta(title={self.title}, headings={self.headings}, links={self.links}, "
+                f"images={self.images}, word_count={self.word_count})")
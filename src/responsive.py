@@ -0,0 +1,303 @@
+"""
+module contains the responsive image variant stage
+
+`build_image_variants` writes smaller, recompressed copies of every local
+image referenced from markdown into the `variants/` directory of the
+output, mirroring the path of the original, e.g.
+`variants/images/tom-480w.webp` for `images/tom.png`, and
+`ResponsiveImages` turns the result into the `srcset`/`sizes` props of
+the image nodes. `variants/` is reserved for them, so they never
+overwrite a static file.
+
+Derivatives are kept under `.cache/images/`, in one directory per source
+content hash and variant settings, so they are only regenerated when an
+image or the settings change. Resizing runs in worker processes.
+
+Pillow (see `requirements.txt`) is optional: without it the stage is
+skipped with a warning and images render without `srcset`.
+"""
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+import sources
+from frontmatter import split_front_matter
+from helpers import extract_markdown_images, get_output_backend
+from imagesize import resolve_static_url
+
+CACHE_VERSION = 1
+
+# the output directory the variants are written to
+VARIANTS_DIR = "variants"
+
+# widths of the variants; only those narrower than the source are made
+VARIANT_WIDTHS = (480, 960, 1440)
+VARIANT_QUALITY = 80
+# the article column is at most 800px wide, full width below that
+DEFAULT_SIZES = "(max-width: 800px) 100vw, 800px"
+
+# Pillow formats of the sources that get variants, by extension
+_SOURCE_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
+
+
+def variant_format(source_format: str) -> str:
+    """
+    Returns the Pillow format variants of a source are encoded in: WebP
+    when Pillow was built with it, otherwise the source's own format.
+    """
+    if features is not None and features.check("webp"):
+        return "WEBP"
+    return source_format
+
+
+def _save_options(variant_format: str, quality: int) -> dict:
+    if variant_format == "WEBP":
+        return {"quality": quality, "method": 6}
+    if variant_format == "JPEG":
+        return {"quality": quality, "optimize": True, "progressive": True}
+    return {"optimize": True}
+
+
+def render_variants(source: str | bytes, cache_dir: str, widths: tuple[int, ...], quality: int, variant_format: str) -> dict:
+    """
+    Resizes one image to every width narrower than itself, writing the
+    variants and a `variants.json` describing them into `cache_dir`.
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Args:
+        source (str | bytes): The path of the image to resize, or its
+            bytes if it is read from a mounted archive.
+        cache_dir (str): The directory the variants are written to.
+        widths (tuple[int, ...]): The widths to produce.
+        quality (int): The encoder quality of lossy formats.
+        variant_format (str): The Pillow format of the variants.
+    Returns:
+        dict: The source `width` and the `variants` as `[width, file name]`
+            pairs, narrowest first.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    extension = _EXTENSIONS[variant_format]
+    options = _save_options(variant_format, quality)
+    variants = []
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as image:
+        image.load()
+        source_width, source_height = image.size
+        if variant_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for width in sorted(widths):
+            if width >= source_width:
+                break
+            height = max(1, round(source_height * width / source_width))
+            name = f"{width}w.{extension}"
+            tmp_path = os.path.join(cache_dir, name + ".tmp")
+            image.resize((width, height), Image.LANCZOS).save(
+                tmp_path, format=variant_format, **options)
+            os.replace(tmp_path, os.path.join(cache_dir, name))
+            variants.append([width, name])
+
+    result = {"width": source_width, "variants": variants}
+    tmp_path = os.path.join(cache_dir, "variants.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, os.path.join(cache_dir, "variants.json"))
+    return result
+
+
+def _render_task(task: tuple) -> dict:
+    return render_variants(*task)
+
+
+def _settings_key(widths: tuple[int, ...], quality: int, variant_format: str) -> str:
+    settings = json.dumps([CACHE_VERSION, sorted(widths), quality, variant_format])
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+
+
+class SourceHashes:
+    """
+    Content hashes of source images, recomputed only when a file's mtime
+    or size changes.
+    """
+
+    def __init__(self, cache_path: str = None) -> None:
+        self.cache_path = cache_path
+        self.entries = self._load() if cache_path else {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cached.get("version") != CACHE_VERSION:
+            return {}
+        return cached.get("sources", {})
+
+    def save(self) -> None:
+        """
+        Writes the hashes to `cache_path`, creating directories as needed.
+        """
+        if not self.cache_path:
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "sources": self.entries}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def hash(self, path: str) -> str:
+        """
+        Returns the SHA-1 of the file at `path`, which can be in a mounted
+        archive (see `sources`).
+        """
+        stat = sources.stat(path)
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            digest = hashlib.sha1()
+            with sources.open_input(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(chunk)
+            entry = self.entries[key] = {
+                "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                "sha1": digest.hexdigest()}
+        return entry["sha1"]
+
+
+def collect_image_urls(dir_path: str, pages: list[str]) -> list[str]:
+    """
+    Returns the image URLs referenced from the given pages, in order of
+    first appearance.
+
+    Args:
+        dir_path (str): The content directory.
+        pages (list[str]): The page paths relative to `dir_path`.
+    Returns:
+        list[str]: Every distinct image URL.
+    """
+    urls = {}
+    for page in pages:
+        with sources.open_input(os.path.join(dir_path, page)) as f:
+            _, body = split_front_matter(f.read())
+        for _, url in extract_markdown_images(body):
+            urls.setdefault(url, None)
+    return list(urls)
+
+
+def _variant_url(url: str, width: int, name: str) -> str:
+    stem = os.path.splitext(url)[0]
+    return f"/{VARIANTS_DIR}{stem}-{width}w{os.path.splitext(name)[1]}"
+
+
+def build_image_variants(urls: list[str], static_dir: str, dest_dir_path: str = None, cache_dir: str = ".cache/images", widths: tuple[int, ...] = VARIANT_WIDTHS, quality: int = VARIANT_QUALITY, jobs: int = None) -> dict[str, dict]:
+    """
+    Produces the responsive variants of every local image in `urls`.
+
+    Cached derivatives are reused; the rest are rendered in parallel
+    worker processes. External URLs, missing files and formats without
+    variants (GIF, SVG, ...) are skipped. `static_dir` can be read from a
+    mounted archive (see `sources`).
+
+    Args:
+        urls (list[str]): Site-absolute image URLs, e.g. `/images/a.png`.
+        static_dir (str): The directory the URLs resolve into.
+        dest_dir_path (str): The site directory the variants are copied
+            into, or `None` to only compute the manifest (shard builds).
+        cache_dir (str): The directory derivatives are cached in.
+        widths (tuple[int, ...]): The variant widths.
+        quality (int): The encoder quality of lossy formats.
+        jobs (int): Number of worker processes, defaults to the CPU count.
+    Returns:
+        dict[str, dict]: Per image URL, the source `width` and its
+            `variants` as `[width, url]` pairs, for `ResponsiveImages`.
+    """
+    if not urls:
+        return {}
+    if Image is None:
+        print("Pillow is not installed, skipping responsive image variants")
+        return {}
+
+    hashes = SourceHashes(os.path.join(cache_dir, "sources.json"))
+    images = []
+    tasks = []
+    for url in urls:
+        path = resolve_static_url(static_dir, url)
+        if path is None or not sources.isfile(path):
+            continue
+        source_format = _SOURCE_FORMATS.get(os.path.splitext(path)[1].lower())
+        if source_format is None:
+            continue
+        target_format = variant_format(source_format)
+        variant_dir = os.path.join(
+            cache_dir, f"{hashes.hash(path)}-{_settings_key(widths, quality, target_format)}")
+        images.append((url, variant_dir))
+        if not os.path.exists(os.path.join(variant_dir, "variants.json")):
+            source = path
+            if not sources.on_filesystem(path):
+                # worker processes don't see the mounted archives
+                with sources.open_input(path, "rb") as f:
+                    source = f.read()
+            tasks.append((source, variant_dir, tuple(widths), quality, target_format))
+    hashes.save()
+
+    # the same source under two URLs is only rendered once
+    tasks = list({task[1]: task for task in tasks}.values())
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        list(map(_render_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            list(executor.map(_render_task, tasks))
+    if tasks:
+        print(f"Rendered variants of {len(tasks)} image(s)")
+
+    manifest = {}
+    for url, variant_dir in images:
+        with open(os.path.join(variant_dir, "variants.json"), "r", encoding="utf-8") as f:
+            rendered = json.load(f)
+        variants = []
+        for width, name in rendered["variants"]:
+            variant_url = _variant_url(url, width, name)
+            if dest_dir_path is not None:
+                # derivatives in the cache are never modified in place, so
+                # the output can share their inode
+                get_output_backend().place_file(
+                    os.path.join(variant_dir, name), os.path.join(dest_dir_path, variant_url.lstrip("/")))
+            variants.append([width, variant_url])
+        manifest[url] = {"width": rendered["width"], "variants": variants}
+    return manifest
+
+
+class ResponsiveImages:
+    """
+    The `srcset`/`sizes` props of images with variants, from the manifest
+    returned by `build_image_variants`.
+    """
+
+    def __init__(self, manifest: dict[str, dict] = None, sizes: str = DEFAULT_SIZES) -> None:
+        self.manifest = manifest or {}
+        self.sizes = sizes
+
+    def props(self, url: str) -> dict:
+        """
+        The extra props of an image: a `srcset` listing its variants and
+        the original at full width, and `sizes`. Images without variants
+        get none.
+        """
+        entry = self.manifest.get(url)
+        if not entry or not entry["variants"]:
+            return {}
+        candidates = [f"{variant_url} {width}w" for width, variant_url in entry["variants"]]
+        candidates.append(f"{url} {entry['width']}w")
+        return {"srcset": ", ".join(candidates), "sizes": self.sizes}
@@ -0,0 +1,216 @@
+"""
+module contains the build-time full-text search index
+
+Pages are tokenized from their inline text nodes, skipping code, while
+`generate_page` parses them (see `helpers.set_search_terms`). The
+inverted index is written under
+`search/` in the output directory:
+
+- `search/docs.json`: `{"prefix": N, "docs": [[url, title], ...], "shards": [...]}`
+- `search/<shard>.json`: `{term: postings}` for every term whose first N
+  characters name the shard
+
+A posting list is a flat list `[gap, tf, gap, tf, ...]` where `gap` is the
+difference to the previous document id (ids index into `docs`) and `tf`
+is the number of times the term occurs in that document. A browser only
+has to fetch `docs.json` and the shard of each query term.
+
+Per-page term counts are cached keyed by mtime and size, so pages that
+were neither parsed by the build nor changed are not read again.
+"""
+import io
+import json
+import os
+import re
+from typing import Iterable
+
+import sources
+from blocks import block_registry
+from frontmatter import read_front_matter
+from helpers import get_output_backend, get_search_terms, iter_markdown_blocks, text_to_text_nodes, write_output
+from pageindex import filter_pages
+from pagemeta import count_terms, tokenize
+
+SEARCH_DIR = "search"
+PREFIX_LENGTH = 2
+CACHE_VERSION = 1
+
+
+def page_terms(markdown: str | Iterable[str]) -> dict[str, int]:
+    """
+    Counts the search terms of a markdown page, the same way `PageMeta`
+    does while the page is rendered.
+
+    Code blocks and inline code are skipped; link text and image alt text
+    are included, their URLs are not. The page is read block by block, so
+    an open file of any size is counted without reading it into memory.
+
+    Args:
+        markdown (str | Iterable[str]): The full contents of a page, front
+            matter included, or its lines, e.g. an open file.
+    Returns:
+        dict[str, int]: The number of occurrences of every term.
+    """
+    if isinstance(markdown, str):
+        markdown = io.StringIO(markdown)
+    _, lines = read_front_matter(markdown)
+    terms = {}
+
+    def inline(text: str) -> list:
+        # only the terms of the span are needed, not its nodes
+        count_terms(text_to_text_nodes(text), terms)
+        return []
+
+    for _, block in iter_markdown_blocks(lines):
+        block_registry.find(block).render(block, inline)
+    return terms
+
+
+def _shard_name(term: str, prefix_length: int) -> str:
+    prefix = term[:prefix_length]
+    if re.fullmatch(r"[a-z0-9_]+", prefix):
+        return prefix
+    # keep file names ASCII for non-latin terms
+    return "x" + prefix.encode("utf-8").hex()
+
+
+def encode_postings(postings: list[tuple[int, int]]) -> list[int]:
+    """
+    Encodes sorted `(doc_id, tf)` pairs as a flat gap-encoded list.
+    """
+    encoded = []
+    previous = 0
+    for doc_id, tf in postings:
+        encoded.extend((doc_id - previous, tf))
+        previous = doc_id
+    return encoded
+
+
+def decode_postings(encoded: list[int]) -> list[tuple[int, int]]:
+    """
+    Decodes a flat gap-encoded posting list back into `(doc_id, tf)` pairs.
+    """
+    postings = []
+    doc_id = 0
+    for i in range(0, len(encoded), 2):
+        doc_id += encoded[i]
+        postings.append((doc_id, encoded[i + 1]))
+    return postings
+
+
+def _load_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cached.get("version") != CACHE_VERSION:
+        return {}
+    return cached.get("pages", {})
+
+
+def build_search_index(index: dict, dir_path: str, dest_dir_path: str, basepath: str = "/", cache_path: str = None, prefix_length: int = PREFIX_LENGTH) -> dict[str, int]:
+    """
+    Builds the inverted index of every non-draft page in the page index
+    and writes it as prefix-sharded JSON under `search/`.
+
+    Pages parsed by the build reuse the terms collected while they were
+    rendered (see `helpers.set_search_terms`), and pages whose mtime and
+    size match the cache at `cache_path` their cached term counts; only
+    the remaining pages are read and tokenized.
+
+    Args:
+        index (dict): A page index from `build_page_index`.
+        dir_path (str): The path to the directory containing markdown files.
+        dest_dir_path (str): The directory the site is written to.
+        basepath (str): The basepath prefixed to the page URLs.
+        cache_path (str): Optional path of the JSON term cache.
+        prefix_length (int): Number of leading term characters naming a shard.
+    Returns:
+        dict[str, int]: The number of terms written to each shard.
+    """
+    cached = _load_cache(cache_path) if cache_path else {}
+    collected = get_search_terms() or {}
+    pages = sorted(filter_pages(index))
+
+    terms_cache = {}
+    postings = {}
+    for doc_id, page in enumerate(pages):
+        page_path = os.path.join(dir_path, page)
+        stat = sources.stat(page_path)
+        entry = cached.get(page)
+        if page_path in collected:
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                     "terms": collected[page_path]}
+        elif entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            with sources.open_input(page_path) as f:
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                         "terms": page_terms(f)}
+        terms_cache[page] = entry
+        for term, tf in entry["terms"].items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    shards = {}
+    for term in sorted(postings):
+        shards.setdefault(_shard_name(term, prefix_length), {})[
+            term] = encode_postings(postings[term])
+
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    backend = get_output_backend()
+    backend.remove_tree(search_dir)
+    backend.makedirs(search_dir)
+    docs = [[basepath.rstrip("/") + index[page]["url"], index[page]["title"]]
+            for page in pages]
+    write_output(os.path.join(search_dir, "docs.json"), json.dumps(
+        {"prefix": prefix_length, "docs": docs, "shards": sorted(shards)}, separators=(",", ":")))
+    for name, terms in shards.items():
+        write_output(os.path.join(search_dir, f"{name}.json"),
+                     json.dumps(terms, separators=(",", ":")))
+    print(
+        f"Wrote search index for {len(pages)} pages in {len(shards)} shards")
+
+    if cache_path:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "pages": terms_cache}, f)
+    return {name: len(terms) for name, terms in shards.items()}
+
+
+def search(dest_dir_path: str, query: str) -> list[str]:
+    """
+    Looks up a query in a written search index, loading only the shards
+    of the query terms, the same way the browser does. All terms must
+    match; results are ordered by total term frequency.
+
+    Args:
+        dest_dir_path (str): The directory the site was written to.
+        query (str): The search query.
+    Returns:
+        list[str]: The URLs of the matching pages.
+    """
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    with open(os.path.join(search_dir, "docs.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    scores = None
+    for term in tokenize(query):
+        shard_path = os.path.join(
+            search_dir, f"{_shard_name(term, meta['prefix'])}.json")
+        if not os.path.exists(shard_path):
+            return []
+        with open(shard_path, "r", encoding="utf-8") as f:
+            encoded = json.load(f).get(term)
+        if encoded is None:
+            return []
+        term_scores = dict(decode_postings(encoded))
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {doc_id: scores[doc_id] + tf for doc_id,
+                      tf in term_scores.items() if doc_id in scores}
+    if not scores:
+        return []
+    ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+    return [meta["docs"][doc_id][0] for doc_id in ranked]
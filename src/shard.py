@@ -0,0 +1,156 @@
+"""
+module contains helpers for splitting a build across several machines
+and merging the resulting shard outputs back into a single site
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from helpers import copy_output, copy_static, generate_pages, get_output_backend
+from minify import Minifier
+
+SHARD_MANIFEST = "shard-manifest.json"
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """
+    Parses a `--shard` specification of the form `i/N`.
+
+    Shards are numbered from 1 to N.
+
+    Args:
+        spec (str): The shard specification, e.g. `2/4`.
+    Returns:
+        tuple[int, int]: The shard index and the total number of shards.
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid shard specification: {spec}")
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index out of range: {spec}")
+    return index, count
+
+
+def shard_of(page: str, count: int) -> int:
+    """
+    Returns the shard (1 to `count`) that owns the given relative page path.
+
+    Uses a SHA-1 of the path rather than `hash()` so that the assignment
+    is the same on every machine and every Python process.
+
+    Args:
+        page (str): The relative path of the markdown page.
+        count (int): The total number of shards.
+    Returns:
+        int: The shard index owning the page.
+    """
+    digest = hashlib.sha1(page.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(pages: list[str], index: int, count: int) -> list[str]:
+    """
+    Filters the discovered `pages` down to the ones owned by shard `index`.
+
+    Args:
+        pages (list[str]): Relative paths of all discovered pages.
+        index (int): The shard index to keep.
+        count (int): The total number of shards.
+    Returns:
+        list[str]: The pages owned by the shard, in their original order.
+    """
+    return [page for page in pages if shard_of(page, count) == index]
+
+
+def build_shard(pages: list[str], index: int, count: int, dir_path: str, template_path: str, dest_dir_path: str, basepath: str) -> dict:
+    """
+    Renders the pages owned by one shard into `dest_dir_path` and writes a
+    shard manifest next to them.
+
+    Static assets are not copied; that happens once in `merge_shards`.
+
+    Args:
+        pages (list[str]): Relative paths of all discovered pages.
+        index (int): The shard index to build.
+        count (int): The total number of shards.
+        dir_path (str): The path to the directory containing markdown files.
+        template_path (str): The path to the HTML template file.
+        dest_dir_path (str): The directory the shard output is written to.
+        basepath (str): The basepath to replace in href/src attributes.
+    Returns:
+        dict: The shard manifest that was written.
+    """
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+        print(f"Deleted existing directory: {dest_dir_path}")
+
+    outputs = generate_pages(select_shard(pages, index, count), dir_path,
+                             template_path, dest_dir_path, basepath)
+
+    manifest = {"shard": index, "count": count, "pages": outputs}
+    with open(os.path.join(dest_dir_path, SHARD_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Built shard {index}/{count} with {len(outputs)} pages")
+    return manifest
+
+
+def merge_shards(shard_dirs: list[str], static_path: str, dest_dir_path: str, minifier: Minifier = None) -> None:
+    """
+    Combines the outputs of all shards into a single site.
+
+    Copies the static assets into `dest_dir_path` once, then copies every
+    page listed in each shard manifest. The shards must form a complete,
+    non-overlapping set.
+
+    Args:
+        shard_dirs (list[str]): The output directories of the shard builds.
+        static_path (str): The directory with static assets to copy.
+        dest_dir_path (str): The directory the merged site is written to.
+        minifier (Minifier): Optional minifier stylesheets are copied
+            through.
+    Returns:
+        None
+    Raises:
+        ValueError: If a manifest is missing, the shards disagree on the
+            shard count, a shard is missing or repeated, or two shards
+            produced the same output file.
+    """
+    manifests = []
+    for shard_dir in shard_dirs:
+        manifest_path = os.path.join(shard_dir, SHARD_MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"Missing shard manifest: {manifest_path}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifests.append((shard_dir, json.load(f)))
+
+    counts = {manifest["count"] for _, manifest in manifests}
+    if len(counts) != 1:
+        raise ValueError(f"Shards disagree on the shard count: {sorted(counts)}")
+    count = counts.pop()
+    indexes = sorted(manifest["shard"] for _, manifest in manifests)
+    if indexes != list(range(1, count + 1)):
+        raise ValueError(
+            f"Expected shards 1 to {count}, got {indexes}")
+
+    owners = {}
+    for shard_dir, manifest in manifests:
+        for output in manifest["pages"].values():
+            if output in owners:
+                raise ValueError(
+                    f"Output {output} produced by both {owners[output]} and {shard_dir}")
+            owners[output] = shard_dir
+
+    copy_static(static_path, dest_dir_path, minifier)
+
+    for output, shard_dir in sorted(owners.items()):
+        src_path = os.path.join(shard_dir, output)
+        dest_path = os.path.join(dest_dir_path, output)
+        get_output_backend().makedirs(os.path.dirname(dest_path))
+        if copy_output(src_path, dest_path):
+            print(f"Copied file: {src_path} to {dest_path}")
+        else:
+            print(f"Reused file: {dest_path}")
@@ -0,0 +1,214 @@
+"""
+module contains the sources the build reads its input from
+
+The content and static directories can be read straight from a zip or
+tar archive instead of the filesystem. An `ArchiveSource` is mounted at
+the path of the directory it stands in for, e.g. `content`, and the
+build reads through `listdir`, `isdir`, `stat` and `open_input`, which
+look paths up in the mounted archives and fall back to the filesystem.
+
+Zip archives and uncompressed tars read every member directly. A
+compressed tar can only be read forwards, so reading a member that comes
+before the last one read decompresses the archive again from its start;
+archives whose members are sorted by path are read in one pass.
+"""
+import io
+import os
+import posixpath
+import re
+import tarfile
+import time
+import zipfile
+from typing import IO, NamedTuple
+
+# directory path -> the source mounted there
+_mounts = {}
+
+
+class SourceStat(NamedTuple):
+    """
+    The fields of `os.stat_result` the build uses.
+    """
+    st_size: int
+    st_mtime_ns: int
+
+
+def _member_path(archive_path: str, name: str) -> str:
+    # the normalized path of an archive member, refusing the ones that
+    # would point outside the directory the archive stands in for, like
+    # tarfile's `data` filter does
+    path = name.replace("\\", "/")
+    if posixpath.isabs(path) or re.match(r"[A-Za-z]:", path):
+        raise ValueError(f"Archive {archive_path} has a member with an absolute path: {name}")
+    if ".." in path.split("/"):
+        raise ValueError(f"Archive {archive_path} has a member outside of its directory: {name}")
+    return posixpath.normpath(path)
+
+
+class ArchiveSource:
+    """
+    A directory tree read from the archive `archive_path`, a `.zip` or a
+    tar, optionally compressed. With `root`, the tree is the directory of
+    that name inside the archive.
+
+    Members with an absolute path or a `..` component are refused, so an
+    archive can't make the build read or write outside its directories.
+
+    Raises:
+        ValueError: If the archive can't be read, has no `root` or has a
+            member outside of its directory.
+    """
+
+    def __init__(self, archive_path: str, root: str = "") -> None:
+        self.archive_path = archive_path
+        prefix = root.strip("/") + "/" if root.strip("/") else ""
+        # relative path -> (member, size, mtime_ns)
+        self._files = {}
+        self._dirs = {""}
+        try:
+            if zipfile.is_zipfile(archive_path):
+                self._zip = zipfile.ZipFile(archive_path)
+                self._tar = None
+                members = [(info.filename, info, info.file_size,
+                            int(time.mktime(info.date_time + (0, 0, -1))) * 10**9)
+                           for info in self._zip.infolist() if not info.is_dir()]
+            else:
+                self._zip = None
+                self._tar = tarfile.open(archive_path)
+                members = [(info.name, info, info.size, int(info.mtime) * 10**9)
+                           for info in self._tar.getmembers() if info.isfile()]
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            raise ValueError(f"Cannot read archive {archive_path}: {e}") from e
+
+        for name, member, size, mtime_ns in members:
+            name = _member_path(archive_path, name)
+            if not name.startswith(prefix):
+                continue
+            rel_path = name[len(prefix):]
+            self._files[rel_path] = (member, size, mtime_ns)
+            parent = os.path.dirname(rel_path)
+            while parent not in self._dirs:
+                self._dirs.add(parent)
+                parent = os.path.dirname(parent)
+        if prefix and not self._files:
+            raise ValueError(f"No {root} directory in archive {archive_path}")
+
+    def listdir(self, rel_path: str) -> list[str]:
+        if rel_path not in self._dirs:
+            raise FileNotFoundError(f"No directory {rel_path} in {self.archive_path}")
+        prefix = rel_path + "/" if rel_path else ""
+        names = {path[len(prefix):].split("/", 1)[0]
+                 for path in self._files if path.startswith(prefix)}
+        return sorted(names)
+
+    def isdir(self, rel_path: str) -> bool:
+        return rel_path in self._dirs
+
+    def isfile(self, rel_path: str) -> bool:
+        return rel_path in self._files
+
+    def stat(self, rel_path: str) -> SourceStat:
+        if rel_path not in self._files:
+            raise FileNotFoundError(f"No file {rel_path} in {self.archive_path}")
+        _, size, mtime_ns = self._files[rel_path]
+        return SourceStat(size, mtime_ns)
+
+    def open(self, rel_path: str, mode: str = "r") -> IO:
+        if rel_path not in self._files:
+            raise FileNotFoundError(f"No file {rel_path} in {self.archive_path}")
+        member = self._files[rel_path][0]
+        if self._zip is not None:
+            f = self._zip.open(member)
+        else:
+            f = self._tar.extractfile(member)
+        if mode == "rb":
+            return f
+        return io.TextIOWrapper(f, encoding="utf-8")
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+
+def parse_source(spec: str) -> ArchiveSource:
+    """
+    Opens the archive given as `ARCHIVE` or `ARCHIVE:DIR`, where `DIR` is
+    the directory inside the archive to read.
+
+    Raises:
+        ValueError: If the archive can't be read or has no `DIR`.
+    """
+    archive_path, root = spec, ""
+    if not os.path.isfile(spec) and ":" in spec:
+        archive_path, root = spec.rsplit(":", 1)
+    return ArchiveSource(archive_path, root)
+
+
+def mount_source(path: str, source: ArchiveSource) -> None:
+    """
+    Reads the directory `path` from `source` from now on.
+    """
+    _mounts[os.path.abspath(path)] = source
+
+
+def unmount_source(path: str) -> None:
+    """
+    Reads the directory `path` from the filesystem again, closing the
+    source mounted there.
+    """
+    source = _mounts.pop(os.path.abspath(path), None)
+    if source is not None:
+        source.close()
+
+
+def _resolve(path: str) -> tuple[ArchiveSource | None, str]:
+    if _mounts:
+        path = os.path.abspath(path)
+        for mount, source in _mounts.items():
+            if path == mount:
+                return source, ""
+            if path.startswith(mount + os.sep):
+                return source, os.path.relpath(path, mount).replace(os.sep, "/")
+    return None, path
+
+
+def on_filesystem(path: str) -> bool:
+    """
+    Returns whether `path` is read from the filesystem rather than from a
+    mounted archive.
+    """
+    return _resolve(path)[0] is None
+
+
+def listdir(path: str) -> list[str]:
+    source, rel_path = _resolve(path)
+    return os.listdir(path) if source is None else source.listdir(rel_path)
+
+
+def isdir(path: str) -> bool:
+    source, rel_path = _resolve(path)
+    return os.path.isdir(path) if source is None else source.isdir(rel_path)
+
+
+def isfile(path: str) -> bool:
+    source, rel_path = _resolve(path)
+    return os.path.isfile(path) if source is None else source.isfile(rel_path)
+
+
+def stat(path: str) -> os.stat_result | SourceStat:
+    source, rel_path = _resolve(path)
+    return os.stat(path) if source is None else source.stat(rel_path)
+
+
+def open_input(path: str, mode: str = "r") -> IO:
+    """
+    Opens an input file for reading, as text (`"r"`) or bytes (`"rb"`).
+    """
+    source, rel_path = _resolve(path)
+    if source is None:
+        if mode == "rb":
+            return open(path, "rb")
+        return open(path, "r", encoding="utf-8")
+    return source.open(rel_path, mode)
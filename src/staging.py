@@ -0,0 +1,140 @@
+"""
+module contains the staged output directories of a build
+
+A build writes into `<out>.staging` instead of `out`, and the finished
+tree replaces the live one only once the build succeeded, so whatever
+serves `out` never sees a half written site and a failed build leaves it
+untouched.
+
+Files a build writes with the same content as the live tree are
+hardlinked from it rather than written again (see
+`helpers.write_output` and `helpers.copy_output`), so a rebuild only
+writes what changed. Since staged files can share their inode with live
+ones, nothing may write into a staged file in place.
+
+The swap renames the live tree away and the staged one in its place.
+When `out` is a symlink to the live tree it is flipped to the staged one
+instead, which is atomic.
+"""
+import os
+import shutil
+import time
+
+STAGING_SUFFIX = ".staging"
+
+
+def _link_or_copy(src_path: str, dest_path: str) -> None:
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copy2(src_path, dest_path)
+
+
+def link_tree(src: str, dest: str) -> int:
+    """
+    Recreates the directory tree `src` under `dest` with every file
+    hardlinked, or copied where links aren't supported.
+
+    Args:
+        src (str): The directory to link from.
+        dest (str): The directory to create.
+    Returns:
+        int: The number of files linked or copied.
+    """
+    count = 0
+    for root, _, files in os.walk(src):
+        dest_root = os.path.join(dest, os.path.relpath(root, src))
+        os.makedirs(dest_root, exist_ok=True)
+        for name in files:
+            _link_or_copy(os.path.join(root, name), os.path.join(dest_root, name))
+            count += 1
+    return count
+
+
+class OutputStager:
+    """
+    Stages the output directories of a build and swaps them in once it
+    succeeded.
+    """
+
+    def __init__(self) -> None:
+        # staging directory -> live directory
+        self._staged = {}
+
+    def stage(self, out: str, keep: bool = False) -> str:
+        """
+        Creates the staging directory of `out`, removing one left behind
+        by a failed build.
+
+        Args:
+            out (str): The live output directory.
+            keep (bool): Start from a linked copy of the live tree, for
+                builds that only rewrite part of the site.
+        Returns:
+            str: The directory the build writes to instead of `out`.
+        """
+        staging = out.rstrip(os.sep) + STAGING_SUFFIX
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        if keep and os.path.isdir(out):
+            count = link_tree(out, staging)
+            print(f"Staged {count} files of {out} in {staging}")
+        else:
+            os.makedirs(staging)
+        self._staged[os.path.abspath(staging)] = out
+        return staging
+
+    def live_path(self, path: str) -> str | None:
+        """
+        Returns the live counterpart of a path inside a staging directory,
+        `None` for paths outside of them.
+        """
+        path = os.path.abspath(path)
+        for staging, out in self._staged.items():
+            if path.startswith(staging + os.sep):
+                return os.path.join(out, os.path.relpath(path, staging))
+        return None
+
+    def commit(self) -> None:
+        """
+        Swaps every staged directory in for its live one.
+        """
+        for staging, out in self._staged.items():
+            _swap(staging, out)
+            print(f"Published {out}")
+        self._staged = {}
+
+    def abort(self) -> None:
+        """
+        Removes the staging directories, leaving the live ones untouched.
+        """
+        for staging in self._staged:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._staged = {}
+
+
+def _swap(staging: str, out: str) -> None:
+    out = out.rstrip(os.sep)
+    if os.path.islink(out):
+        previous = os.path.realpath(out)
+        # the staged tree gets a name of its own and the link flips to it
+        release = f"{out}.{time.time_ns()}"
+        os.rename(staging, release)
+        tmp_link = f"{out}.{os.getpid()}.tmp"
+        os.symlink(os.path.basename(release), tmp_link)
+        os.replace(tmp_link, out)
+        # only remove releases this module created
+        prefix = os.path.basename(out) + "."
+        name = os.path.basename(previous)
+        if (os.path.dirname(previous) == os.path.dirname(os.path.realpath(release))
+                and name.startswith(prefix) and name[len(prefix):].isdigit()):
+            shutil.rmtree(previous, ignore_errors=True)
+    elif os.path.exists(out):
+        previous = f"{out}.previous"
+        if os.path.exists(previous):
+            shutil.rmtree(previous)
+        os.rename(out, previous)
+        os.rename(staging, out)
+        shutil.rmtree(previous)
+    else:
+        os.rename(staging, out)
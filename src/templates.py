@@ -0,0 +1,360 @@
+"""
+module contains the page template language and its compiler
+
+Templates are HTML with three kinds of tags:
+
+    {{ name }}                      the page variable `name`, HTML escaped;
+                                    `Title` and `Content` always exist, the
+                                    rest come from the page's front matter
+    {{ name|raw }}                  the variable as is, for values holding
+                                    HTML; `Content` is never escaped
+    {% include "partial.html" %}    the contents of another template
+    {% extends "base.html" %}       fill the blocks of another template
+    {% block name %}...{% endblock %}
+
+Paths are relative to the directory of the template containing the tag.
+Unknown variables render as nothing.
+
+A template and everything it includes or extends is compiled once into a
+Python function that joins its literal text and variables, so rendering
+a page is one `str.join`. `TemplateLoader` keeps compiled templates in
+memory and, with a `cache_dir`, their code objects on disk keyed by the
+hashes of their sources.
+"""
+import functools
+import hashlib
+import html
+import marshal
+import os
+import re
+import sys
+
+# bump to invalidate compiled templates when the compiler changes
+VERSION = 2
+
+_TAG = re.compile(r"\{\{\s*(\w+)(\|raw)?\s*\}\}|\{%\s*(\w+)(?:\s+(.*?))?\s*%\}", re.DOTALL)
+_QUOTED = re.compile(r"""^(["'])(.+)\1$""")
+_HTML_TAG = re.compile(r"<([A-Za-z][A-Za-z0-9-]*)")
+
+
+class TemplateError(Exception):
+    """
+    Raised for malformed templates, with the template name in the message.
+    """
+
+
+def _value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+class Template:
+    """
+    A compiled template. Call it with the page variables to render it.
+    `dependencies` maps every file it was compiled from to the hash of
+    its source, and `tags` holds the HTML tags of its literal text.
+    """
+
+    def __init__(self, name: str, render, dependencies: dict[str, str], tags: frozenset[str] = frozenset()) -> None:
+        self.name = name
+        self.render = render
+        self.dependencies = dependencies
+        self.tags = tags
+        self.source_hash = hashlib.sha256(
+            "\0".join(sorted(dependencies.values())).encode("utf-8")).hexdigest()
+
+    def __call__(self, context: dict) -> str:
+        return self.render(context)
+
+    def __repr__(self) -> str:
+        return f"Template({self.name})"
+
+
+def _hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _parse(source: str, name: str) -> tuple[str | None, list]:
+    """
+    Parses a template into its nodes: `("text", str)`, `("var", name)`,
+    `("raw", name)`, `("include", path)` and `("block", name, nodes)`. Returns the path of
+    the template it extends, if any, along with the nodes.
+    """
+    root = []
+    # (block name, nodes of the block)
+    stack = [(None, root)]
+    extends = None
+    pos = 0
+    for match in _TAG.finditer(source):
+        nodes = stack[-1][1]
+        if match.start() > pos:
+            nodes.append(("text", source[pos:match.start()]))
+        pos = match.end()
+        variable, raw, tag, argument = match.groups()
+        if variable is not None:
+            # the content of the page is HTML
+            nodes.append(("raw" if raw or variable == "Content" else "var", variable))
+        elif tag in ("include", "extends"):
+            quoted = _QUOTED.match((argument or "").strip())
+            if quoted is None:
+                raise TemplateError(f"{name}: {tag} needs a quoted path")
+            if tag == "include":
+                nodes.append(("include", quoted.group(2)))
+            elif extends is not None or len(stack) > 1:
+                raise TemplateError(f"{name}: extends must be a top level tag used once")
+            else:
+                extends = quoted.group(2)
+        elif tag == "block":
+            if not argument or not argument.strip().isidentifier():
+                raise TemplateError(f"{name}: block needs a name")
+            block = []
+            nodes.append(("block", argument.strip(), block))
+            stack.append((argument.strip(), block))
+        elif tag == "endblock":
+            if len(stack) == 1:
+                raise TemplateError(f"{name}: endblock without block")
+            stack.pop()
+        else:
+            raise TemplateError(f"{name}: unknown tag {tag}")
+    if len(stack) > 1:
+        raise TemplateError(f"{name}: unclosed block {stack[-1][0]}")
+    if pos < len(source):
+        root.append(("text", source[pos:]))
+    return extends, root
+
+
+def _blocks(nodes: list, blocks: dict, directory: str) -> None:
+    # the outermost definition of a block wins, so a child template's
+    # blocks are collected before its parent's. Blocks keep the directory
+    # of the template defining them, which their includes are relative to
+    for node in nodes:
+        if node[0] == "block":
+            blocks.setdefault(node[1], (node[2], directory))
+            _blocks(node[2], blocks, directory)
+
+
+def _tags(parts: list[tuple[str, str]]) -> frozenset[str]:
+    return frozenset(tag.lower() for kind, value in parts if kind == "text"
+                     for tag in _HTML_TAG.findall(value))
+
+
+def _generate(parts: list[tuple[str, str]], name: str) -> str:
+    # `parts` alternates literal text and variables. The literals become
+    # module constants and the function body a single f-string, which
+    # formats faster than joining a tuple
+    lines = [f"# compiled from {name}"]
+    literals = {}
+    variables = {}
+    pieces = []
+    for kind, value in parts:
+        if kind == "text":
+            if not value:
+                continue
+            if value not in literals:
+                literals[value] = f"_t{len(literals)}"
+                lines.append(f"{literals[value]} = {value!r}")
+            pieces.append(literals[value])
+        else:
+            if (kind, value) not in variables:
+                variables[kind, value] = f"v{len(variables)}"
+            pieces.append(variables[kind, value])
+    lines.append("def render(context):")
+    if variables:
+        lines.append("    get = context.get")
+    for (kind, variable), local in variables.items():
+        lines.append(f"    {local} = get({variable!r})")
+        lines.append(f"    if {local}.__class__ is not str:")
+        lines.append(f"        {local} = _value({local})")
+        if kind == "var":
+            lines.append(f"    {local} = _escape({local})")
+    body = "".join(f"{{{piece}}}" for piece in pieces)
+    lines.append(f"    return f'{body}'")
+    return "\n".join(lines) + "\n"
+
+
+class TemplateLoader:
+    """
+    Loads and compiles template files, reusing compiled templates while
+    none of their sources changed.
+    """
+
+    def __init__(self, cache_dir: str = None) -> None:
+        self.cache_dir = cache_dir
+        # path -> (Template, mtime and size of each of its sources)
+        self._templates = {}
+        self.compiled = 0
+
+    def _read(self, path: str) -> str:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError as e:
+            raise TemplateError(f"Cannot read template {path}: {e.strerror}") from e
+
+    def _resolve(self, path: str, dependencies: dict[str, str], chain: tuple[str, ...]) -> list[tuple[str, str]]:
+        # flattens a template into text and variable parts, following its
+        # extends and includes
+        if path in chain:
+            raise TemplateError(
+                f"Template cycle: {' -> '.join(chain + (path,))}")
+        chain += (path,)
+        source = self._read(path)
+        dependencies[path] = _hash(source)
+        directory = os.path.dirname(path)
+
+        extends, nodes = _parse(source, path)
+        layers = [(nodes, directory)]
+        while extends is not None:
+            parent = os.path.normpath(os.path.join(directory, extends))
+            if parent in chain:
+                raise TemplateError(
+                    f"Template cycle: {' -> '.join(chain + (parent,))}")
+            chain += (parent,)
+            source = self._read(parent)
+            dependencies[parent] = _hash(source)
+            directory = os.path.dirname(parent)
+            extends, nodes = _parse(source, parent)
+            layers.append((nodes, directory))
+        # the base template is rendered with the blocks of every layer
+        blocks = {}
+        for nodes, layer_directory in layers:
+            _blocks(nodes, blocks, layer_directory)
+        base, base_directory = layers[-1]
+
+        parts = []
+
+        def emit(nodes: list, directory: str) -> None:
+            for node in nodes:
+                kind = node[0]
+                if kind in ("text", "var", "raw"):
+                    parts.append(node)
+                elif kind == "include":
+                    parts.extend(self._resolve(
+                        os.path.normpath(os.path.join(directory, node[1])), dependencies, chain))
+                else:
+                    emit(*blocks.get(node[1], (node[2], directory)))
+
+        emit(base, base_directory)
+        return parts
+
+    def _cache_path(self, path: str) -> str:
+        key = _hash(f"{VERSION}\0{sys.implementation.cache_tag}\0{os.path.abspath(path)}")
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _load_cached(self, path: str) -> Template | None:
+        try:
+            with open(self._cache_path(path), "rb") as f:
+                dependencies, tags, code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        for dependency, digest in dependencies.items():
+            try:
+                if _hash(self._read(dependency)) != digest:
+                    return None
+            except TemplateError:
+                return None
+        return Template(path, _exec(code), dependencies, frozenset(tags))
+
+    def _remember(self, path: str, template: Template) -> Template:
+        stats = {}
+        for dependency in template.dependencies:
+            try:
+                stat = os.stat(dependency)
+            except OSError:
+                return template
+            stats[dependency] = (stat.st_mtime_ns, stat.st_size)
+        self._templates[path] = (template, stats)
+        return template
+
+    def _get_remembered(self, path: str) -> Template | None:
+        entry = self._templates.get(path)
+        if entry is None:
+            return None
+        template, stats = entry
+        for dependency, (mtime_ns, size) in stats.items():
+            try:
+                stat = os.stat(dependency)
+            except OSError:
+                return None
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return None
+        return template
+
+    def load(self, path: str) -> Template:
+        """
+        Returns the compiled template at `path`.
+
+        Args:
+            path (str): The template file.
+        Returns:
+            Template: The compiled template.
+        Raises:
+            TemplateError: If the template or one it uses can't be read or
+                is malformed, or templates include each other.
+        """
+        path = os.path.normpath(path)
+        template = self._get_remembered(path)
+        if template is not None:
+            return template
+        if self.cache_dir is not None:
+            template = self._load_cached(path)
+            if template is not None:
+                return self._remember(path, template)
+
+        dependencies = {}
+        parts = self._resolve(path, dependencies, ())
+        code = compile(_generate(parts, path), path, "exec")
+        self.compiled += 1
+        tags = _tags(parts)
+        template = self._remember(path, Template(path, _exec(code), dependencies, tags))
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_path = self._cache_path(path)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump((dependencies, tuple(sorted(tags)), code), f)
+            os.replace(tmp_path, cache_path)
+        return template
+
+
+def _exec(code) -> callable:
+    namespace = {"_value": _value, "_escape": html.escape}
+    exec(code, namespace)
+    return namespace["render"]
+
+
+@functools.lru_cache(maxsize=64)
+def compile_template(source: str, name: str = "<string>") -> Template:
+    """
+    Compiles a template given as a string. It can't include or extend
+    other templates.
+
+    Args:
+        source (str): The template source.
+        name (str): The name used in error messages.
+    Returns:
+        Template: The compiled template.
+    Raises:
+        TemplateError: If the template is malformed or uses include or
+            extends.
+    """
+    extends, nodes = _parse(source, name)
+    if extends is not None:
+        raise TemplateError(f"{name}: extends needs a template file")
+    parts = []
+
+    def emit(nodes: list) -> None:
+        for node in nodes:
+            if node[0] == "include":
+                raise TemplateError(f"{name}: include needs a template file")
+            if node[0] == "block":
+                emit(node[2])
+            else:
+                parts.append(node)
+
+    emit(nodes)
+    code = compile(_generate(parts, name), name, "exec")
+    return Template(name, _exec(code), {name: _hash(source)}, _tags(parts))
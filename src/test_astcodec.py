@@ -0,0 +1,77 @@
+import pickle
+import unittest
+
+from astcodec import dumps, loads, MAGIC
+from helpers import markdown_to_html_node, text_to_text_nodes
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextNode, TextType
+
+
+class TestAstCodec(unittest.TestCase):
+
+    def test_round_trip_markdown_tree(self):
+        node = markdown_to_html_node(
+            "# Title\n\nSome **bold** [link](/x) and ![img](/i.png) café ✓\n\n- a\n- b\n\n```\ncode\n```")
+        self.assertEqual(loads(dumps(node)), node)
+
+    def test_round_trip_none_values(self):
+        node = ParentNode("div", [
+            LeafNode(None, "text"),
+            LeafNode("img", None, {"src": "/a.png", "alt": ""}),
+            LeafNode("b", ""),
+            ParentNode("p", None),
+        ])
+        self.assertEqual(loads(dumps(node)), node)
+        self.assertIsNone(loads(dumps(node)).children[3].children)
+
+    def test_round_trip_props_types(self):
+        node = LeafNode("img", "x", {"width": 640, "height": -1,
+                        "hidden": True, "alt": "a"})
+        loaded = loads(dumps(node))
+        self.assertEqual(loaded.props, node.props)
+        self.assertIs(loaded.props["hidden"], True)
+
+    def test_round_trip_text_nodes(self):
+        nodes = text_to_text_nodes(
+            "A `code` **bold** _it_ [l](/u) ![a](/i)")
+        self.assertEqual(loads(dumps(nodes)), nodes)
+        self.assertEqual(loads(dumps(TextNode("x", TextType.LINK, "/u"))),
+                         TextNode("x", TextType.LINK, "/u"))
+
+    def test_round_trip_nested_lists_and_deep_trees(self):
+        node = LeafNode(None, "x")
+        for _ in range(3000):
+            node = ParentNode("span", [node])
+        loaded = loads(dumps([[node], []]))
+        self.assertEqual(loaded[1], [])
+        # node equality recurses, so walk the chain instead
+        depth, current = 0, loaded[0][0]
+        while isinstance(current, ParentNode):
+            depth, current = depth + 1, current.children[0]
+        self.assertEqual(depth, 3000)
+        self.assertEqual(current, LeafNode(None, "x"))
+
+    def test_strings_and_props_are_interned(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("a", str(i), {"href": "/same"})])
+                                 for i in range(100)])
+        data = dumps(node)
+        self.assertEqual(data.count(b"/same"), 1)
+        self.assertEqual(data.count(b"href"), 1)
+        self.assertLess(len(data), len(pickle.dumps(node)) / 3)
+
+    def test_dumps_unsupported_raises_exception(self):
+        with self.assertRaises(TypeError):
+            dumps(ParentNode("p", [object()]))
+        with self.assertRaises(TypeError):
+            dumps(LeafNode("a", "x", {"href": 1.5}))
+
+    def test_loads_invalid_data_raises_exception(self):
+        with self.assertRaises(ValueError):
+            loads(b"nope")
+        with self.assertRaises(ValueError):
+            loads(MAGIC + bytes([99]))
+
+
+if __name__ == "__main__":
+    unittest.main()
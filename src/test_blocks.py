@@ -0,0 +1,82 @@
+import unittest
+
+from blocks import BlockHandler, BlockRegistry, BlockType, BUILTIN_BLOCK_HANDLERS, PARAGRAPH_HANDLER, register_block_handler, block_registry
+from helpers import block_to_block_type, markdown_to_html_node, parse_markdown
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def _render_table(block, inline):
+    rows = []
+    for line in block.splitlines():
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        rows.append(ParentNode("tr", [ParentNode("td", inline(cell))
+                                      for cell in cells]))
+    return ParentNode("table", rows)
+
+
+TABLE_HANDLER = BlockHandler("table", "|", lambda block: all(
+    line.startswith("|") for line in block.splitlines()), _render_table)
+
+
+class TestBlockRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        block_registry.unregister("table")
+        block_registry.unregister("admonition")
+
+    def test_find_dispatches_on_first_character(self):
+        registry = BlockRegistry(BUILTIN_BLOCK_HANDLERS)
+        self.assertEqual(registry.find("# Title").block_type, BlockType.HEADING)
+        self.assertEqual(registry.find("  - item").block_type,
+                         BlockType.UNORDERED_LIST)
+        self.assertEqual(registry.find("3. item").block_type,
+                         BlockType.ORDERED_LIST)
+        self.assertIs(registry.find("#no space"), PARAGRAPH_HANDLER)
+        self.assertIs(registry.find(""), PARAGRAPH_HANDLER)
+
+    def test_find_only_tries_handlers_for_the_character(self):
+        tried = []
+        registry = BlockRegistry([BlockHandler(
+            "bang", "!", lambda block: tried.append(block) or False, _render_table)])
+        registry.find("plain paragraph")
+        self.assertEqual(tried, [])
+        registry.find("!!! note")
+        self.assertEqual(tried, ["!!! note"])
+
+    def test_register_custom_block(self):
+        register_block_handler(TABLE_HANDLER)
+        self.assertEqual(block_to_block_type("| a | b |"), "table")
+        node = markdown_to_html_node("| a | **b** |\n| c | d |")
+        self.assertEqual(
+            node.to_html(),
+            "<div><table><tr><td>a</td><td><b>b</b></td></tr>"
+            "<tr><td>c</td><td>d</td></tr></table></div>")
+
+    def test_register_handler_without_triggers(self):
+        register_block_handler(BlockHandler(
+            "admonition", "", lambda block: block.startswith("NOTE:"),
+            lambda block, inline: ParentNode("aside", inline(block[5:].strip()))))
+        self.assertEqual(markdown_to_html_node("NOTE: careful").to_html(),
+                         "<div><aside>careful</aside></div>")
+        self.assertEqual(block_to_block_type("# Title"), BlockType.HEADING)
+
+    def test_register_replaces_handler_with_same_name(self):
+        registry = BlockRegistry(BUILTIN_BLOCK_HANDLERS)
+        registry.register(BlockHandler(
+            "heading", "#", lambda block: block.startswith("#"),
+            lambda block, inline: LeafNode("h2", block.lstrip("#").strip()), BlockType.HEADING))
+        self.assertEqual(len(registry.handlers), len(BUILTIN_BLOCK_HANDLERS))
+        self.assertEqual(registry.find("#tight").render("#tight", None).to_html(),
+                         "<h2>tight</h2>")
+
+    def test_custom_block_meta(self):
+        register_block_handler(TABLE_HANDLER)
+        _, meta = parse_markdown("# Title\n\n| [a](/a) | b |")
+        self.assertEqual(meta.title, "Title")
+        self.assertEqual(meta.links, [("a", "/a")])
+        self.assertEqual(meta.word_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from changeset import BuildManifest, changeset_path, diff_manifests, file_sha256, load_manifest, manifest_path
+from helpers import set_build_manifest, write_output
+from staging import OutputStager
+
+
+class TestChangeset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        set_build_manifest(None)
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.out, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return path
+
+    def build(self, files):
+        manifest = BuildManifest(self.cache)
+        manifest.track(self.out)
+        set_build_manifest(manifest)
+        for name, data in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.out, name)), exist_ok=True)
+            write_output(os.path.join(self.out, name), data)
+        with redirect_stdout(io.StringIO()):
+            return manifest.finish()[self.out]
+
+    def test_diff_manifests(self):
+        old = {"a": ["1", 1, 0], "b": ["2", 2, 0], "c": ["3", 3, 0]}
+        new = {"a": ["1", 1, 5], "b": ["4", 4, 0], "d": ["5", 5, 0]}
+        self.assertEqual(diff_manifests(old, new), {
+            "added": [{"path": "d", "sha256": "5", "size": 5}],
+            "modified": [{"path": "b", "sha256": "4", "size": 4}],
+            "deleted": [{"path": "c", "sha256": "3", "size": 3}],
+            "unchanged": 1,
+        })
+
+    def test_changeset_of_builds(self):
+        changeset = self.build({"index.html": "home", "blog/a.html": "a"})
+        self.assertEqual([entry["path"] for entry in changeset["added"]], ["blog/a.html", "index.html"])
+
+        os.remove(os.path.join(self.out, "blog", "a.html"))
+        asset = self.write("img/logo.png", "png")
+        changeset = self.build({"index.html": "home page"})
+        self.assertEqual(changeset["added"], [
+            {"path": "img/logo.png", "sha256": file_sha256(asset), "size": 3}])
+        self.assertEqual([entry["path"] for entry in changeset["modified"]], ["index.html"])
+        self.assertEqual([entry["path"] for entry in changeset["deleted"]], ["blog/a.html"])
+
+        with open(changeset_path(self.out, self.cache)) as f:
+            self.assertEqual(json.load(f)["modified"], changeset["modified"])
+        self.assertEqual(set(load_manifest(manifest_path(self.out, self.cache))),
+                         {"index.html", "img/logo.png"})
+
+    def test_unchanged_files_are_not_hashed(self):
+        self.write("img/logo.png", "png")
+        self.build({})
+        files = load_manifest(manifest_path(self.out, self.cache))
+        # a stale hash for the same mtime and size is trusted
+        files["img/logo.png"][0] = "stale"
+        with open(manifest_path(self.out, self.cache), "w") as f:
+            json.dump({"version": 1, "files": files}, f)
+        self.assertEqual(self.build({})["unchanged"], 1)
+        self.assertEqual(load_manifest(manifest_path(self.out, self.cache))["img/logo.png"][0], "stale")
+
+    def test_manifest_saved_after_publishing(self):
+        stager = OutputStager()
+        dest = stager.stage(self.out)
+        manifest = BuildManifest(self.cache)
+        manifest.track(dest, self.out)
+        set_build_manifest(manifest)
+        write_output(os.path.join(dest, "index.html"), "home")
+        manifest.scan()
+        # a build that fails to publish leaves no manifest behind
+        self.assertFalse(os.path.exists(manifest_path(self.out, self.cache)))
+        stager.commit()
+        with redirect_stdout(io.StringIO()):
+            changeset = manifest.finish()[self.out]
+        self.assertEqual([entry["path"] for entry in changeset["added"]], ["index.html"])
+        self.assertEqual(set(load_manifest(manifest_path(self.out, self.cache))), {"index.html"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from check import PageError, check_page, check_site, markdown_to_blocks_with_lines
+from helpers import markdown_to_blocks
+
+
+class TestCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, page, markdown):
+        path = os.path.join(self.content, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        return path
+
+    def test_markdown_to_blocks_with_lines(self):
+        md = """
+# Heading
+
+This is **bolded** paragraph
+text in a p
+tag here
+
+- a list
+- with items
+"""
+        result = markdown_to_blocks_with_lines(md)
+        self.assertEqual([line for line, _ in result], [2, 4, 8])
+        self.assertEqual([block for _, block in result],
+                         markdown_to_blocks(md))
+
+    def test_check_page_valid(self):
+        path = self.write_page("index.md", "# Title\n\nSome `code` here.")
+        self.assertEqual(check_page(path), [])
+
+    def test_check_page_collects_every_error(self):
+        path = self.write_page(
+            "index.md", "Intro\n\nBad `code here\n\nFine\n\nBad **bold here")
+        errors = check_page(path)
+        self.assertEqual([error.line for error in errors], [3, 7, None])
+        self.assertIn("No header", errors[-1].message)
+
+    def test_page_error_str(self):
+        self.assertEqual(str(PageError("a.md", 3, "boom")), "a.md:3: boom")
+        self.assertEqual(str(PageError("a.md", None, "boom")), "a.md: boom")
+
+    def test_check_site_parallel(self):
+        for i in range(40):
+            self.write_page(f"page{i:02}/index.md", f"# Page {i}")
+        bad = self.write_page("page07/index.md", "# Page\n\n_unclosed")
+
+        errors = check_site(self.content, jobs=2)
+
+        self.assertEqual(errors, [PageError(bad, 3, errors[0].message)])
+
+    def test_check_site_serial_matches_parallel(self):
+        for i in range(40):
+            self.write_page(f"page{i:02}/index.md",
+                            "no title" if i % 10 == 0 else f"# Page {i}")
+        self.assertEqual(check_site(self.content, jobs=1),
+                         check_site(self.content, jobs=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
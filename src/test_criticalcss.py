@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+from criticalcss import CSSRule, CriticalCSS, node_tags, parse_css, prune_css, selector_may_match
+from helpers import generate_page, markdown_to_html_node, set_critical_css
+from minify import Minifier
+from templates import compile_template
+
+CSS = """/* site */
+@charset "utf-8";
+body { margin: 0; }
+h1, h2 { color: red; }
+ul > li a:hover, .note { content: "}"; }
+pre code:not(table) { padding: 0; }
+@media (max-width: 600px) {
+  table td { padding: 0; }
+  p { margin: 0; }
+}
+"""
+
+TEMPLATE = """<html>
+<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet" /></head>
+<body><article>{{ Content }}</article></body>
+</html>"""
+
+
+class TestCriticalCSS(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.css_path = os.path.join(self.tmp.name, "index.css")
+        with open(self.css_path, "w", encoding="utf-8") as f:
+            f.write(CSS)
+
+    def tearDown(self):
+        set_critical_css(None)
+        self.tmp.cleanup()
+
+    def test_parse_css(self):
+        rules = parse_css(CSS)
+        self.assertEqual(rules[0], CSSRule('@charset "utf-8"', None))
+        self.assertEqual(rules[3], CSSRule('ul > li a:hover, .note', 'content: "}";'))
+        self.assertEqual(rules[5].body, [
+            CSSRule("table td", "padding: 0;"), CSSRule("p", "margin: 0;")])
+
+    def test_selector_may_match(self):
+        tags = frozenset({"html", "body", "pre", "code", "p"})
+        self.assertTrue(selector_may_match("pre code:not(table)", tags))
+        self.assertTrue(selector_may_match(".note", tags))
+        self.assertTrue(selector_may_match("p::first-line", tags))
+        self.assertFalse(selector_may_match("ul > li a:hover", tags))
+        self.assertFalse(selector_may_match("table td", tags))
+
+    def test_prune_css(self):
+        tags = frozenset({"html", "body", "h2", "p"})
+        self.assertEqual([rule.prelude for rule in prune_css(parse_css(CSS), tags)], [
+            '@charset "utf-8"', "body", "h1, h2", "ul > li a:hover, .note", "@media (max-width: 600px)"])
+
+    def test_inline_whole_stylesheet(self):
+        html = CriticalCSS(self.css_path).apply(TEMPLATE)
+        self.assertIn(f"<style>{CSS}</style></head>", html)
+        self.assertNotIn("<link", html)
+
+    def test_stylesheet_link_attributes(self):
+        critical_css = CriticalCSS(self.css_path)
+        for link in ["<link rel=stylesheet href=/index.css>",
+                     "<link rel='stylesheet' href='/index.css'>",
+                     '<LINK HREF="/index.css" REL="Stylesheet"/>']:
+            self.assertEqual(critical_css.apply(link), f"<style>{CSS}</style>")
+        for link in ['<link rel="preload" href="/index.css">',
+                     '<link rel="alternate stylesheet" href="/index.css">',
+                     '<link rel="stylesheet" href="/other.css">',
+                     '<link rel="stylesheet" data-href="/index.css">']:
+            self.assertEqual(critical_css.apply(link), link)
+
+    def test_inline_pruned_stylesheet(self):
+        critical_css = CriticalCSS(self.css_path, prune=True, minifier=Minifier())
+        tags = compile_template(TEMPLATE).tags | node_tags(markdown_to_html_node("# Title\n\nText"))
+        self.assertEqual(tags, {"html", "head", "title", "link", "body", "article", "div", "h1", "p"})
+        html = critical_css.apply(TEMPLATE, tags)
+        self.assertIn(
+            '<style>@charset "utf-8";body{margin:0}h1,h2{color:red}ul>li a:hover,.note{content:"}"}'
+            "@media (max-width:600px){p{margin:0}}</style>"
+            '<link rel="preload" href="/index.css" as="style" '
+            "onload=\"this.onload=null;this.rel='stylesheet'\">"
+            '<noscript><link rel="stylesheet" href="/index.css"></noscript></head>',
+            html,
+        )
+        # pages without a node tree get the whole stylesheet
+        self.assertIn("table td", critical_css.apply(TEMPLATE))
+
+    def test_generate_page(self):
+        set_critical_css(CriticalCSS(self.css_path, prune=True))
+        src = os.path.join(self.tmp.name, "index.md")
+        dest = os.path.join(self.tmp.name, "out", "index.html")
+        template_path = os.path.join(self.tmp.name, "template.html")
+        with open(src, "w", encoding="utf-8") as f:
+            f.write("# Title\n\n```\ncode\n```\n")
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write(TEMPLATE)
+        generate_page(src, template_path, dest, "/site/")
+        with open(dest, encoding="utf-8") as f:
+            html = f.read()
+        self.assertIn("pre code:not(table) { padding: 0; }", html)
+        self.assertNotIn("table td", html)
+        self.assertIn('<link rel="preload" href="/site/index.css"', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from changeset import BuildManifest
+from deploy import DirectoryTarget, S3Target, deploy, parse_destination
+
+
+class _Bucket(BaseHTTPRequestHandler):
+    objects = {}
+    requests = []
+
+    def do_PUT(self):
+        self.objects[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.requests.append(("PUT", self.path, self.headers["Content-Type"]))
+        self.send_response(200)
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.objects.pop(self.path, None)
+        self.requests.append(("DELETE", self.path, None))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDeploy(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.manifests = os.path.join(self.tmp.name, "manifests")
+        self.states = os.path.join(self.tmp.name, "deploys")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, files):
+        for name, data in files.items():
+            path = os.path.join(self.out, name)
+            if data is None:
+                os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        manifest = BuildManifest(self.manifests)
+        manifest.track(self.out)
+        with redirect_stdout(io.StringIO()):
+            manifest.finish()
+
+    def deploy(self, target):
+        with redirect_stdout(io.StringIO()):
+            return deploy(self.out, target, 4, self.manifests, self.states)
+
+    def test_deploy_to_directory(self):
+        dest = os.path.join(self.tmp.name, "site")
+        self.build({"index.html": "home", "blog/a.html": "a", "index.css": "css"})
+        changeset = self.deploy(DirectoryTarget(dest))
+        self.assertEqual(len(changeset["added"]), 3)
+        with open(os.path.join(dest, "blog", "a.html")) as f:
+            self.assertEqual(f.read(), "a")
+
+        # only the change is transferred
+        self.build({"index.html": "new home", "blog/a.html": None})
+        with open(os.path.join(dest, "index.css"), "w") as f:
+            f.write("untouched")
+        changeset = self.deploy(DirectoryTarget(dest))
+        self.assertEqual([entry["path"] for entry in changeset["modified"]], ["index.html"])
+        self.assertEqual([entry["path"] for entry in changeset["deleted"]], ["blog/a.html"])
+        self.assertEqual(sorted(os.listdir(dest)), ["index.css", "index.html"])
+        with open(os.path.join(dest, "index.css")) as f:
+            self.assertEqual(f.read(), "untouched")
+        self.assertEqual(self.deploy(DirectoryTarget(dest))["unchanged"], 2)
+
+    def test_deploy_to_s3(self):
+        server = HTTPServer(("127.0.0.1", 0), _Bucket)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        endpoint = f"http://127.0.0.1:{server.server_port}"
+        target = parse_destination("s3://bucket/site", endpoint)
+        self.assertIsInstance(target, S3Target)
+
+        self.build({"index.html": "home", "a b.css": "css", "old.txt": "old"})
+        self.deploy(target)
+        self.build({"old.txt": None})
+        self.deploy(target)
+        self.assertEqual(_Bucket.objects, {
+            "/bucket/site/index.html": b"home", "/bucket/site/a%20b.css": b"css"})
+        # assets go before pages
+        puts = [request for request in _Bucket.requests if request[0] == "PUT"]
+        self.assertEqual(puts[-1], ("PUT", "/bucket/site/index.html", "text/html"))
+        self.assertEqual(_Bucket.requests[-1], ("DELETE", "/bucket/site/old.txt", None))
+
+    def test_deploy_needs_a_build(self):
+        with self.assertRaisesRegex(ValueError, "No build manifest"):
+            self.deploy(DirectoryTarget(os.path.join(self.tmp.name, "site")))
+        with self.assertRaisesRegex(ValueError, "needs an endpoint"):
+            parse_destination("s3://bucket")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import pickle
+import unittest
+
+from flatast import FlatTree, markdown_to_flat_tree, NONE, PARENT, LEAF
+from helpers import markdown_to_html_node
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+class TestFlatTree(unittest.TestCase):
+
+    markdown = """
+# Title with `code`
+
+A paragraph with **bold**, _italic_ and a [link](https://example.com).
+
+An image ![alt text](/images/a.png) inline.
+
+> a quote
+
+- one
+- two
+
+1. first
+2. second
+
+```
+code block
+```
+"""
+
+    def test_markdown_to_flat_tree_matches_markdown_to_html_node(self):
+        tree = markdown_to_flat_tree(self.markdown)
+        node = markdown_to_html_node(self.markdown)
+        self.assertEqual(tree.to_html(), node.to_html())
+        self.assertEqual(tree.to_nodes(), node)
+
+    def test_from_node_round_trip(self):
+        node = ParentNode("div", [
+            LeafNode("a", "link", {"href": "/x"}),
+            ParentNode("p", [LeafNode(None, "text"), LeafNode("b", "")]),
+        ], {"class": "wrap"})
+        tree = FlatTree.from_node(node)
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(tree.to_nodes(), node)
+        self.assertEqual(tree.to_html(), node.to_html())
+
+    def test_navigation(self):
+        tree = FlatTree()
+        root = tree.add_node(NONE, PARENT, "ul")
+        first = tree.add_node(root, LEAF, "li", "a")
+        second = tree.add_node(root, LEAF, "li", "b")
+        self.assertEqual(tree.children(root), [first, second])
+        self.assertEqual(tree.parents[second], root)
+        self.assertEqual(tree.value(second), "b")
+        self.assertEqual(tree.tag(root), "ul")
+        self.assertEqual(tree.tag_names, [None, "ul", "li"])
+
+    def test_to_html_deep_tree_is_iterative(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        tree = FlatTree.from_node(node)
+        html = tree.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + 1)
+
+    def test_to_html_invalid_leaf_raises_exception(self):
+        tree = FlatTree.from_node(ParentNode("p", [LeafNode("b", None)]))
+        with self.assertRaises(ValueError):
+            tree.to_html()
+
+    def test_props_are_shared(self):
+        node = ParentNode("div", [LeafNode("a", str(i), {"href": "/same"})
+                                  for i in range(10)])
+        tree = FlatTree.from_node(node)
+        self.assertEqual(len(tree.props_table), 1)
+
+    def test_pickle_round_trip(self):
+        tree = markdown_to_flat_tree(self.markdown * 20)
+        loaded = pickle.loads(pickle.dumps(tree))
+        self.assertEqual(loaded.to_html(), tree.to_html())
+        self.assertEqual(loaded, tree)
+        loaded.add_node(0, LEAF, "p", "appended")
+        self.assertTrue(loaded.to_html().endswith("<p>appended</p></div>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from frontmatter import parse_front_matter_value, split_front_matter, read_page_header
+from helpers import generate_page
+
+
+class TestFrontMatter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_parse_front_matter_value(self):
+        self.assertEqual(parse_front_matter_value(" 'quoted' "), "quoted")
+        self.assertEqual(parse_front_matter_value("[a, b]"), ["a", "b"])
+        self.assertEqual(parse_front_matter_value("[]"), [])
+        self.assertEqual(parse_front_matter_value("True"), True)
+        self.assertEqual(parse_front_matter_value("42"), 42)
+        self.assertEqual(parse_front_matter_value("2024-05-01"), "2024-05-01")
+
+    def test_split_front_matter_yaml(self):
+        md = "---\ndate: 2024-05-01\ntags:\n  - elves\n  - balrogs\ndraft: false\n---\n# Title\n"
+        front_matter, body = split_front_matter(md)
+        self.assertEqual(front_matter, {
+            "date": "2024-05-01", "tags": ["elves", "balrogs"], "draft": False})
+        self.assertEqual(body, "# Title\n")
+
+    def test_split_front_matter_toml(self):
+        md = "+++\ntitle = \"Hello\"\ntags = [a]\n+++\n\n# Title"
+        front_matter, body = split_front_matter(md)
+        self.assertEqual(front_matter, {"title": "Hello", "tags": ["a"]})
+        self.assertEqual(body, "\n# Title")
+
+    def test_split_front_matter_none(self):
+        md = "# Title\n\n---\n"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
+    def test_split_front_matter_unclosed_raises_exception(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ndate: 2024\n# Title")
+
+    def test_split_front_matter_invalid_line_raises_exception(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\nnot a pair\n---\n")
+
+    def test_read_page_header(self):
+        path = self.write(
+            "a.md", "---\ndate: 2024-05-01\n---\n\n# The Title\n\nBody")
+        self.assertEqual(read_page_header(path),
+                         ({"date": "2024-05-01"}, "The Title"))
+
+    def test_read_page_header_title_from_front_matter(self):
+        path = self.write("a.md", "---\ntitle: Override\n---\n# Heading")
+        self.assertEqual(read_page_header(path),
+                         ({"title": "Override"}, "Override"))
+
+    def test_read_page_header_skips_code_and_paragraphs(self):
+        path = self.write(
+            "a.md", "```\n# not a title\n```\n\nText\n# still text\n\n# The Title\n")
+        self.assertEqual(read_page_header(path), ({}, "The Title"))
+
+    def test_read_page_header_reads_only_the_head(self):
+        path = self.write("a.md", "Text\n" * 70 + "\n# Too Late\n")
+        self.assertEqual(read_page_header(path), ({}, None))
+
+    def test_read_page_header_no_title(self):
+        path = self.write("a.md", "Just text")
+        self.assertEqual(read_page_header(path), ({}, None))
+
+    def test_generate_page_uses_front_matter(self):
+        self.write("template.html", "{{ Title }}|{{ Content }}")
+        self.write("other.html", "OTHER {{ Title }}|{{ Content }}")
+        page = self.write(
+            "page.md", "---\ntitle: Custom\ntemplate: other.html\n---\n# Heading")
+        dest = os.path.join(self.root, "out", "page.html")
+
+        self.assertTrue(generate_page(page, os.path.join(
+            self.root, "template.html"), dest, "/"))
+        with open(dest, "r", encoding="utf-8") as f:
+            self.assertEqual(
+                f.read(), "OTHER Custom|<div><h1>Heading</h1></div>")
+
+    def test_generate_page_skips_drafts(self):
+        self.write("template.html", "{{ Title }}|{{ Content }}")
+        page = self.write("page.md", "---\ndraft: true\n---\n# Heading")
+        dest = os.path.join(self.root, "out", "page.html")
+
+        self.assertFalse(generate_page(page, os.path.join(
+            self.root, "template.html"), dest, "/"))
+        self.assertFalse(os.path.exists(dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
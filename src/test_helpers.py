@@ -1,9 +1,14 @@
+import io
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from htmlnode import HTMLNode
 from textnode import TextNode, TextType
 from leafnode import LeafNode
-from helpers import split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_link, text_to_text_nodes, markdown_to_blocks, block_to_block_type, text_node_to_html_node, text_to_children, markdown_to_html_node, extract_title, BlockType
+from pagemeta import PageMeta
+from helpers import split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_link, text_to_text_nodes, markdown_to_blocks, block_to_block_type, text_node_to_html_node, text_to_children, markdown_to_html_node, extract_title, BlockType, discover_pages, generate_page, generate_pages, iter_markdown_blocks, render_stream, text_to_html, batch_text_to_text_nodes, block_to_html_node, parse_markdown
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -787,7 +792,7 @@ class TestHelperFunctions(unittest.TestCase):
                         "https://i.imgur.com/aKaOqIh.gif")
         result = text_node_to_html_node(node)
         expected_result = HTMLNode(
-            tag="img", value="This is an image", children=None, props={"src": "https://i.imgur.com/aKaOqIh.gif"})
+            tag="img", value=None, children=None, props={"src": "https://i.imgur.com/aKaOqIh.gif", "alt": "This is an image"})
         self.assertEqual(result, expected_result)
 
     def test_text_node_to_html_node_link(self):
@@ -839,9 +844,17 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(
             nodes,
             [LeafNode(None, "An image: "), LeafNode(
-                "img", "alt", {"src": "img.png"})]
+                "img", None, {"src": "img.png", "alt": "alt"})]
         )
 
+    def test_text_to_html_matches_text_to_children(self):
+        text = "**b** _i_ `c` [l](/u) ![a](/i.png) plain"
+        self.assertEqual(
+            text_to_html(text),
+            "".join(node.to_html() for node in text_to_children(text)))
+        self.assertEqual(text_to_html("![a](/i.png)"),
+                         '<img src="/i.png" alt="a">')
+
     def test_text_to_children_mixed(self):
         nodes = text_to_children(
             "**Bold** and _italic_ with `code` and a [link](url).")
@@ -888,5 +901,263 @@ class TestHelperFunctions(unittest.TestCase):
             extract_title(md)
 
 
+class TestDiscoverPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = self.tmp.name
+        for page in ["index.md", "blog/a/index.md", "blog/b/index.md", "drafts/c/index.md", "contact/index.md", "blog/notes.txt"]:
+            path = os.path.join(self.content, page)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# Title")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover_pages_all(self):
+        self.assertEqual(
+            discover_pages(self.content),
+            ["blog/a/index.md", "blog/b/index.md", "contact/index.md",
+                "drafts/c/index.md", "index.md"]
+        )
+
+    def test_discover_pages_only(self):
+        self.assertEqual(
+            discover_pages(self.content, include=["blog/**"]),
+            ["blog/a/index.md", "blog/b/index.md"]
+        )
+
+    def test_discover_pages_only_directory_name(self):
+        self.assertEqual(
+            discover_pages(self.content, include=["contact"]),
+            ["contact/index.md"]
+        )
+
+    def test_discover_pages_exclude(self):
+        self.assertEqual(
+            discover_pages(self.content, exclude=["drafts/**", "blog/b/*"]),
+            ["blog/a/index.md", "contact/index.md", "index.md"]
+        )
+
+    def test_discover_pages_double_star_any_depth(self):
+        self.assertEqual(
+            discover_pages(self.content, include=["**/a/*.md", "index.md"]),
+            ["blog/a/index.md", "index.md"]
+        )
+
+    def test_discover_pages_prunes_filtered_directories(self):
+        with mock.patch("helpers.os.listdir", side_effect=os.listdir) as listdir:
+            discover_pages(self.content, include=[
+                           "blog/**"], exclude=["blog/b/**"])
+        walked = {os.path.relpath(call.args[0], self.content)
+                  for call in listdir.call_args_list}
+        self.assertEqual(walked, {".", "blog", os.path.join("blog", "a")})
+
+
+class TestRenderStream(unittest.TestCase):
+
+    template = "<title>{{ Title }}</title><a href=\"/index.css\"></a><article>{{ Content }}</article>{{ Title }}"
+
+    markdown = """---
+date: 2024-01-01
+---
+
+Intro before the title with a [link](/about).
+
+# The Title
+
+- item one
+- item **two**
+
+```
+code here
+```
+"""
+
+    def test_iter_markdown_blocks_matches_markdown_to_blocks(self):
+        blocks = list(iter_markdown_blocks(io.StringIO(self.markdown)))
+        self.assertEqual([block for _, block in blocks],
+                         markdown_to_blocks(self.markdown))
+        self.assertEqual([line for line, _ in blocks][:2], [1, 5])
+
+    def test_render_stream_matches_generate_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "page.html")
+            with open(page, "w", encoding="utf-8") as f:
+                f.write(self.markdown)
+            with open(template, "w", encoding="utf-8") as f:
+                f.write(self.template)
+            generate_page(page, template, dest, "/base/")
+            with open(dest, "r", encoding="utf-8") as f:
+                expected = f.read()
+
+        output = io.StringIO()
+        title = render_stream(io.StringIO(self.markdown),
+                              output, self.template, "/base/")
+
+        self.assertEqual(output.getvalue(), expected)
+        self.assertEqual(title, "The Title")
+
+    def test_render_stream_writes_before_reading_everything(self):
+        lines_read = []
+        writes = []
+
+        def lines():
+            yield "# Title\n"
+            for i in range(1000):
+                lines_read.append(i)
+                yield "\n"
+                yield f"Paragraph {i}\n"
+
+        class Output:
+            def write(self, chunk):
+                writes.append(len(lines_read))
+
+        render_stream(lines(), Output(), self.template)
+
+        # the head and first blocks went out long before the input ended
+        self.assertGreater(len(writes), 100)
+        self.assertLess(writes[1], 10)
+
+    def test_render_stream_no_title_raises_exception(self):
+        with self.assertRaises(Exception):
+            render_stream(io.StringIO("no title"),
+                          io.StringIO(), self.template)
+
+    def test_render_stream_flushes_without_early_title(self):
+        writes = []
+
+        class Output:
+            def write(self, chunk):
+                writes.append(chunk)
+
+        markdown = "".join(f"Paragraph {i}\n\n" for i in range(100)) + "# Late\n"
+        with mock.patch("helpers.STREAM_TITLE_BUFFER_BYTES", 100):
+            title = render_stream(io.StringIO(markdown), Output(),
+                                  "<title>{{ Title }}</title>{{ Content }}", "/", "page")
+            with self.assertRaisesRegex(Exception, "No header found in the first 100 bytes"):
+                render_stream(io.StringIO(markdown), io.StringIO(), self.template)
+        self.assertEqual(title, "page")
+        self.assertEqual(writes[0], "<title>page</title>")
+        self.assertLess(len(writes[1]), 200)
+        self.assertTrue("".join(writes).endswith("<h1>Late</h1></div>"))
+
+    def test_failed_stream_keeps_previous_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "page.html")
+            with open(page, "w", encoding="utf-8") as f:
+                f.write("# Title\n\nSome text\n")
+            with open(template, "w", encoding="utf-8") as f:
+                f.write(self.template)
+            with open(dest, "w", encoding="utf-8") as f:
+                f.write("previous")
+            with mock.patch("helpers.STREAM_THRESHOLD_BYTES", 1), \
+                    mock.patch("helpers._inline_html", side_effect=ValueError("bad block")):
+                with self.assertRaisesRegex(ValueError, "bad block"):
+                    generate_page(page, template, dest, "/")
+            with open(dest, "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), "previous")
+            self.assertEqual(sorted(os.listdir(tmp)), ["page.html", "page.md", "template.html"])
+
+    def test_generate_page_streams_large_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "page.html")
+            with open(page, "w", encoding="utf-8") as f:
+                f.write(self.markdown)
+            with open(template, "w", encoding="utf-8") as f:
+                f.write(self.template)
+            generate_page(page, template, dest, "/")
+            with open(dest, "r", encoding="utf-8") as f:
+                expected = f.read()
+            with mock.patch("helpers.STREAM_THRESHOLD_BYTES", 1), mock.patch("helpers.render_stream", wraps=render_stream) as stream:
+                generate_page(page, template, dest, "/")
+            stream.assert_called_once()
+            with open(dest, "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_generate_pages_for_several_targets(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "content"))
+            with open(os.path.join(tmp, "content", "index.md"), "w", encoding="utf-8") as f:
+                f.write(self.markdown)
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w", encoding="utf-8") as f:
+                f.write(self.template)
+
+            def build(basepath, out, targets=None):
+                generate_pages(["index.md"], os.path.join(tmp, "content"), template,
+                               os.path.join(tmp, out), basepath, targets)
+
+            def read(out):
+                with open(os.path.join(tmp, out, "index.html"), "r", encoding="utf-8") as f:
+                    return f.read()
+
+            build("/", "single-root")
+            build("/repo/", "single-repo")
+            with mock.patch("helpers.parse_markdown", wraps=parse_markdown) as parse:
+                build("/", "root", [("/repo/", os.path.join(tmp, "repo"))])
+            parse.assert_called_once()
+            self.assertEqual(read("root"), read("single-root"))
+            self.assertEqual(read("repo"), read("single-repo"))
+            self.assertIn('href="/repo/about"', read("repo"))
+
+            with mock.patch("helpers.STREAM_THRESHOLD_BYTES", 1):
+                build("/", "root", [("/repo/", os.path.join(tmp, "repo"))])
+            self.assertEqual(read("repo"), read("single-repo"))
+
+
+class TestBatchInline(unittest.TestCase):
+
+    def test_batch_text_to_text_nodes_matches_text_to_text_nodes(self):
+        texts = [
+            "plain text",
+            "",
+            "**bold** and _italic_ and `code`",
+            "![image](/a.png) then [link](/b)",
+            "!![not a link](/c)",
+            "\x00[(\x00 looks like the separator [x](/y)",
+            "ends with an image ![alt](/d.png)",
+        ]
+        self.assertEqual(batch_text_to_text_nodes(texts),
+                         [text_to_text_nodes(text) for text in texts])
+
+    def test_batch_text_to_text_nodes_matches_do_not_cross_spans(self):
+        texts = ["text ![alt", "](/a.png) [anchor", "](/b)"]
+        self.assertEqual(batch_text_to_text_nodes(texts),
+                         [[TextNode(text, TextType.TEXT)] for text in texts])
+
+    def test_batch_text_to_text_nodes_unmatched_delimiter_raises_exception(self):
+        with self.assertRaises(Exception):
+            batch_text_to_text_nodes(["fine", "**not fine"])
+
+    def test_markdown_to_html_node_batched_matches_per_block(self):
+        md = """
+# Title with [a link](/t)
+
+Paragraph with **bold** and ![img](/i.png).
+
+- one [x](/x)
+- two
+
+```
+code words here
+```
+"""
+        node, meta = parse_markdown(md)
+        expected_meta = PageMeta()
+        expected = [block_to_html_node(block, expected_meta)
+                    for block in markdown_to_blocks(md)]
+        self.assertEqual(node.children, expected)
+        self.assertEqual(meta, expected_meta)
+        self.assertEqual(meta.title, "Title with a link")
+
+
 if __name__ == "__main__":
     unittest.main()
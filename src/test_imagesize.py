@@ -0,0 +1,95 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import imagesize
+from helpers import text_to_html
+from imagesize import ImageSizeCache, image_size
+from textnode import set_image_props_provider
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc2" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + b"\xff\xff" + sof + b"\xff\xda"
+
+
+class TestImageSize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        set_image_props_provider(None)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_image_size_formats(self):
+        vp8x = b"VP8X" + struct.pack("<I", 10) + b"\x00" * 4 + \
+            (639).to_bytes(3, "little") + (479).to_bytes(3, "little")
+        vp8l_bits = (99 & 0x3FFF) | ((49 & 0x3FFF) << 14)
+        vp8l = b"VP8L" + struct.pack("<I", 5) + b"\x2f" + struct.pack("<I", vp8l_bits)
+        vp8 = b"VP8 " + struct.pack("<I", 10) + b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 320, 200)
+        cases = {
+            "a.png": (png(1026, 388), (1026, 388)),
+            "a.gif": (b"GIF89a" + struct.pack("<HH", 12, 34) + b"\x00" * 8, (12, 34)),
+            "a.jpg": (jpeg(800, 600), (800, 600)),
+            "x.webp": (b"RIFF\x00\x00\x00\x00WEBP" + vp8x, (640, 480)),
+            "l.webp": (b"RIFF\x00\x00\x00\x00WEBP" + vp8l, (100, 50)),
+            "v.webp": (b"RIFF\x00\x00\x00\x00WEBP" + vp8, (320, 200)),
+            "a.txt": (b"not an image", None),
+            "short.jpg": (b"\xff\xd8\xff\xe0\x00", None),
+        }
+        for name, (data, expected) in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(image_size(self.write(name, data)), expected)
+
+    def test_cache_reuses_unchanged_files(self):
+        self.write("static/images/a.png", png(10, 20))
+        cache_path = os.path.join(self.tmp.name, ".cache", "sizes.json")
+        cache = ImageSizeCache(os.path.join(
+            self.tmp.name, "static"), cache_path)
+        self.assertEqual(cache.size("/images/a.png"), (10, 20))
+        cache.save()
+
+        cache = ImageSizeCache(os.path.join(
+            self.tmp.name, "static"), cache_path)
+        with mock.patch.object(imagesize, "image_size") as read:
+            self.assertEqual(cache.size("/images/a.png"), (10, 20))
+            read.assert_not_called()
+
+        self.write("static/images/a.png", png(30, 40) + b"\x00")
+        self.assertEqual(cache.size("/images/a.png"), (30, 40))
+
+    def test_cache_only_reads_static_files(self):
+        self.write("secret.png", png(1, 1))
+        cache = ImageSizeCache(os.path.join(self.tmp.name, "static"))
+        self.assertIsNone(cache.size("/../secret.png"))
+        self.assertIsNone(cache.size("https://example.com/a.png"))
+        self.assertIsNone(cache.size("/images/missing.png"))
+        self.assertEqual(cache.props("/images/missing.png"), {
+                         "loading": "lazy", "decoding": "async"})
+
+    def test_image_props_provider(self):
+        self.write("static/images/a.png", png(10, 20))
+        cache = ImageSizeCache(os.path.join(self.tmp.name, "static"))
+        set_image_props_provider(cache.props)
+        self.assertEqual(
+            text_to_html("![alt](/images/a.png)"),
+            '<img src="/images/a.png" alt="alt" width="10" height="20" loading="lazy" decoding="async">')
+
+
+if __name__ == "__main__":
+    unittest.main()
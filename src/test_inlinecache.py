@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+from helpers import markdown_to_html_node, parse_markdown, set_inline_cache, text_to_children
+from inlinecache import InlineCache
+
+
+class TestInlineCache(unittest.TestCase):
+
+    def test_get_put_counts_hits_and_misses(self):
+        cache = InlineCache()
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats(), {
+                         "hits": 1, "misses": 1, "entries": 1, "chars": 1})
+
+    def test_evicts_least_recently_used(self):
+        cache = InlineCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_memory_cap(self):
+        cache = InlineCache(max_chars=10, max_span_chars=8)
+        cache.put("x" * 9, 1)
+        self.assertEqual(len(cache), 0)
+        cache.put("a" * 6, 1)
+        cache.put("b" * 6, 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.chars, 6)
+        self.assertEqual(cache.get("b" * 6), 2)
+
+    def test_threads(self):
+        cache = InlineCache(max_entries=50)
+
+        def work(offset):
+            for i in range(2000):
+                key = str((i + offset) % 100)
+                if cache.get(key) is None:
+                    cache.put(key, key)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 8000)
+        self.assertLessEqual(stats["entries"], 50)
+
+
+class TestInlineCacheParsing(unittest.TestCase):
+
+    markdown = "# Home\n\n- [Blog](/blog) and **more**\n- [About](/about)\n\nFooter text"
+
+    def setUp(self):
+        self.cache = InlineCache()
+        set_inline_cache(self.cache)
+
+    def tearDown(self):
+        set_inline_cache(None)
+
+    def test_repeated_spans_hit_the_cache(self):
+        first, first_meta = parse_markdown(self.markdown)
+        second, second_meta = parse_markdown(self.markdown)
+        self.assertEqual(self.cache.hits, 4)
+        self.assertEqual(self.cache.misses, 4)
+        self.assertEqual(first, second)
+        self.assertEqual(first_meta, second_meta)
+        self.assertEqual(second_meta.links, [
+                         ("Blog", "/blog"), ("About", "/about")])
+
+    def test_results_match_uncached(self):
+        cached = markdown_to_html_node(self.markdown)
+        set_inline_cache(None)
+        self.assertEqual(cached, markdown_to_html_node(self.markdown))
+
+    def test_text_to_children_returns_a_new_list(self):
+        children = text_to_children("**bold**")
+        children.append("extra")
+        self.assertEqual(len(text_to_children("**bold**")), 1)
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,6 +24,11 @@ class TestLeafNode(unittest.TestCase):
         self.assertEqual(
             node.to_html(), '<div id="my-div">this is a div</div>')
 
+    def test_leaf_to_html_void_element(self):
+        node = LeafNode("img", None, {"src": "/a.png", "alt": "a"})
+        self.assertEqual(node.to_html(), '<img src="/a.png" alt="a">')
+        self.assertEqual(LeafNode("br", None).to_html(), "<br>")
+
     def test_leaf_to_html_anchor(self):
         node = LeafNode("a", "link tag", {"href": "https://www.google.com"})
         self.assertEqual(
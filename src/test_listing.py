@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from listing import generate_listings, tag_slug, render_sitemap
+from pageindex import build_page_index
+
+
+class TestListing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, ".cache", "listings.json")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.write("index.md", "# Home")
+        for i in range(1, 6):
+            tags = "[odd]" if i % 2 else "[even, Middle Earth]"
+            self.write(f"blog/post{i}/index.md",
+                       f"---\ndate: 2024-01-0{i}\ntags: {tags}\n---\n# Post {i}")
+        self.write("blog/draft/index.md",
+                   "---\ndate: 2024-02-01\ndraft: true\n---\n# Draft")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, page, text):
+        path = os.path.join(self.content, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, output):
+        with open(os.path.join(self.out, output), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def generate(self, site_url="https://example.com"):
+        index = build_page_index(self.content)
+        with redirect_stdout(io.StringIO()):
+            return generate_listings(index, self.template, self.out, "/", site_url, self.state, page_size=2)
+
+    def test_tag_slug(self):
+        self.assertEqual(tag_slug("Middle Earth"), "middle-earth")
+
+    def test_generate_listings_paginates_newest_first(self):
+        self.generate()
+        first = self.read("blog/index.html")
+        self.assertLess(first.index("Post 5"), first.index("Post 4"))
+        self.assertNotIn("Post 3", first)
+        self.assertIn('href="/blog/page/2/"', first)
+        self.assertIn("Post 1", self.read("blog/page/3/index.html"))
+        self.assertNotIn("Draft", first)
+
+    def test_generate_listings_tag_pages(self):
+        self.generate()
+        even = self.read("tags/middle-earth/index.html")
+        self.assertIn("Post 4", even)
+        self.assertIn("Post 2", even)
+        self.assertNotIn("Post 1", even)
+
+    def test_generate_listings_feeds_and_sitemap(self):
+        self.generate()
+        rss = self.read("blog/feed.xml")
+        self.assertIn(
+            "<link>https://example.com/blog/post5/</link>", rss)
+        self.assertIn("Fri, 05 Jan 2024 00:00:00 +0000", rss)
+        self.assertIn('<link href="https://example.com/blog/post1/"/>',
+                      self.read("blog/atom.xml"))
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/tags/odd/</loc>", sitemap)
+        self.assertNotIn("draft", sitemap)
+
+    def test_generate_listings_without_site_url_skips_feeds_and_sitemap(self):
+        written = self.generate(site_url="")
+        self.assertIn("blog/index.html", written)
+        for output in ("blog/feed.xml", "blog/atom.xml", "sitemap.xml"):
+            self.assertNotIn(output, written)
+            self.assertFalse(os.path.exists(os.path.join(self.out, output)))
+
+    def test_generate_listings_escapes_titles(self):
+        self.write("blog/post1/index.md",
+                   "---\ndate: 2024-01-01\ntags: [odd]\n---\n# Fish & <chips>")
+        self.generate()
+        page = self.read("blog/page/3/index.html")
+        self.assertIn(">Fish &amp; &lt;chips&gt;</a>", page)
+        self.assertNotIn("<chips>", page)
+
+    def test_generate_listings_only_rewrites_affected_pages(self):
+        self.assertIn("blog/index.html", self.generate())
+        self.assertEqual(self.generate(), [])
+
+        # post 1 is on the last blog page and tagged odd only
+        self.write("blog/post1/index.md",
+                   "---\ndate: 2024-01-01\ntags: [odd]\n---\n# Renamed post")
+        self.assertEqual(sorted(self.generate()), [
+            "blog/atom.xml", "blog/feed.xml", "blog/page/3/index.html", "tags/odd/page/2/index.html"])
+
+    def test_render_sitemap_skips_invalid_dates(self):
+        sitemap = render_sitemap([("/a/", "soon")], "https://example.com", "/")
+        self.assertIn("<loc>https://example.com/a/</loc>", sitemap)
+        self.assertNotIn("lastmod", sitemap)
+
+
+if __name__ == "__main__":
+    unittest.main()
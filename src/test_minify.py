@@ -0,0 +1,139 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from helpers import copy_static, fill_template, render_stream, set_minifier
+from minify import HTMLMinifier, Minifier, minify_css, minify_html
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+class TestMinifyHTML(unittest.TestCase):
+
+    def test_collapses_whitespace(self):
+        self.assertEqual(
+            minify_html("<div>\n  <p>Some   <b>bold</b>\n text </p>\n\n</div>\n"),
+            "<div><p>Some <b>bold</b> text</p></div>",
+        )
+
+    def test_preserves_pre_code_and_raw_text(self):
+        html = ("<p>a <code>x  y</code>  b</p>\n<pre><code>  indented\n    more\n</code></pre>\n"
+                "<script>if (a <b) {  }</script><style>p  >  a {}</style>")
+        self.assertEqual(
+            minify_html(html),
+            "<p>a <code>x  y</code> b</p><pre><code>  indented\n    more\n</code></pre>"
+            "<script>if (a <b) {  }</script><style>p  >  a {}</style>",
+        )
+
+    def test_tags_and_comments(self):
+        self.assertEqual(
+            minify_html('<!-- note --><meta charset="utf-8" />\n<img  src="/a.png"\n alt="a > b" /> 1 < 2'),
+            '<meta charset="utf-8"><img src="/a.png" alt="a > b"> 1 < 2',
+        )
+        self.assertEqual(minify_html("<p>a&nbsp; \xa0b</p>"), "<p>a&nbsp; \xa0b</p>")
+
+    def test_unquote_attributes(self):
+        self.assertEqual(
+            minify_html('<a href="/blog/" class="a b" title="">x</a><g id="g" />', unquote_attributes=True),
+            '<a href=/blog/ class="a b" title="">x</a><g id=g />',
+        )
+
+    def test_streaming_matches_whole_document(self):
+        html = fill_template(TEMPLATE, "Title", "<div><p>x  <i>y</i>\n z</p><pre> a\n b</pre>"
+                             "<!-- c --><script>a<b</script></div>", "/")
+        expected = minify_html(html)
+        for size in (1, 2, 3, 7, 64):
+            minifier = HTMLMinifier()
+            out = "".join(minifier.feed(html[i:i + size]) for i in range(0, len(html), size))
+            self.assertEqual(out + minifier.close(), expected, size)
+
+
+class TestMinifyCSS(unittest.TestCase):
+
+    def test_minify_css(self):
+        css = """/* theme */
+body {
+  font-family: "Open  Sans", serif;
+  margin : 0 auto;
+}
+
+a :hover,
+ul > li {
+  color: #fff;  /* trailing */
+}
+/*! license */
+"""
+        self.assertEqual(
+            minify_css(css),
+            'body{font-family:"Open  Sans",serif;margin :0 auto}a :hover,ul>li{color:#fff}/*! license */',
+        )
+
+
+class TestMinifier(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        set_minifier(None)
+        self.tmp.cleanup()
+
+    def test_cache_by_content_hash(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        self.assertEqual(Minifier(cache_dir).css("a { color: red; }"), "a{color:red}")
+        minifier = Minifier(cache_dir)
+        self.assertEqual(minifier.css("a { color: red; }"), "a{color:red}")
+        self.assertEqual(minifier.css("b { color: red; }"), "b{color:red}")
+        self.assertEqual((minifier.hits, minifier.misses), (1, 1))
+
+    def test_prune_unused_entries(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        Minifier(cache_dir).css("a { color: red; }")
+        minifier = Minifier(cache_dir)
+        minifier.css("b { color: red; }")
+        self.assertEqual(minifier.prune(), 1)
+        self.assertEqual(minifier.prune(), 0)
+        minifier = Minifier(cache_dir)
+        minifier.css("b { color: red; }")
+        self.assertEqual((minifier.hits, minifier.misses), (1, 0))
+
+    def test_pages_and_static(self):
+        set_minifier(Minifier())
+        markdown = "# Title\n\nSome   text\n\n```\ncode\n```\n"
+        out = io.StringIO()
+        render_stream(io.StringIO(markdown), out, TEMPLATE, "/site/")
+        self.assertEqual(
+            out.getvalue(),
+            '<!DOCTYPE html><html><head><title>Title</title><link href="/site/index.css" rel="stylesheet">'
+            "</head><body><article><div><h1>Title</h1><p>Some text</p><pre><code>code\n</code></pre>"
+            "</div></article></body></html>",
+        )
+        self.assertEqual(out.getvalue(), fill_template(
+            TEMPLATE, "Title", "<div><h1>Title</h1><p>Some   text</p><pre><code>code\n</code></pre></div>",
+            "/site/"))
+
+        src = os.path.join(self.tmp.name, "static")
+        dest = os.path.join(self.tmp.name, "out")
+        os.makedirs(src)
+        with open(os.path.join(src, "index.css"), "w") as f:
+            f.write("a {\n  color: red;\n}\n")
+        with redirect_stdout(io.StringIO()):
+            copy_static(src, dest, Minifier())
+        with open(os.path.join(dest, "index.css")) as f:
+            self.assertEqual(f.read(), "a{color:red}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+
+from helpers import copy_static, generate_pages, set_output_backend
+from output import ArchiveOutput, FilesystemOutput
+
+PAGE = "# Title\n\n" + "Some text that is long enough to be worth compressing. " * 10
+
+
+class TestOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.out = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for name, data in [("content/index.md", PAGE), ("content/blog/a.md", "# A"),
+                           ("static/index.css", "body {}"), ("static/images/logo.png", "png")]:
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+
+    def tearDown(self):
+        set_output_backend(FilesystemOutput())
+        self.tmp.cleanup()
+
+    def build(self, archive):
+        set_output_backend(archive)
+        with redirect_stdout(io.StringIO()):
+            copy_static(os.path.join(self.root, "static"), self.out)
+            generate_pages(["index.md", "blog/a.md"], os.path.join(self.root, "content"),
+                           self.template, self.out, "/")
+            archive.close()
+
+    def test_tar_archive(self):
+        path = os.path.join(self.root, "site.tar.gz")
+        self.build(ArchiveOutput(path, self.out))
+        self.assertFalse(os.path.exists(self.out))
+        with tarfile.open(path) as tar:
+            self.assertEqual(sorted(tar.getnames()), [
+                "blog/a.html", "images/logo.png", "index.css", "index.html", "index.html.gz"])
+            html = tar.extractfile("index.html").read()
+            self.assertTrue(html.startswith(b"<title>Title</title>"))
+            self.assertEqual(gzip.decompress(tar.extractfile("index.html.gz").read()), html)
+
+    def test_zip_archive_without_variants(self):
+        path = os.path.join(self.root, "site.zip")
+        self.build(ArchiveOutput(path, self.out, precompress=False))
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(sorted(archive.namelist()), [
+                "blog/a.html", "images/logo.png", "index.css", "index.html"])
+            self.assertEqual(archive.read("blog/a.html"), b"<title>A</title><div><h1>A</h1></div>")
+
+    def test_streamed_entries(self):
+        path = os.path.join(self.root, "site.tar")
+        archive = ArchiveOutput(path, self.out)
+        with archive.open_text(os.path.join(self.out, "big.html")) as f:
+            for _ in range(1000):
+                f.write("<p>é</p>")
+        with self.assertRaisesRegex(ValueError, "already written"):
+            archive.write_text(os.path.join(self.out, "big.html"), "")
+        with self.assertRaisesRegex(ValueError, "outside of the archived directory"):
+            archive.write_text(os.path.join(self.root, "other.html"), "")
+        with redirect_stdout(io.StringIO()):
+            archive.close()
+        with tarfile.open(path) as tar:
+            self.assertEqual(tar.extractfile("big.html").read(), "<p>é</p>".encode() * 1000)
+            self.assertEqual(gzip.decompress(tar.extractfile("big.html.gz").read()),
+                             "<p>é</p>".encode() * 1000)
+
+    def test_place_file_replaces_other_files_of_the_same_size(self):
+        src = os.path.join(self.root, "static", "index.css")
+        path = os.path.join(self.out, "index.css")
+        os.makedirs(self.out)
+        with open(path, "w") as f:
+            f.write("p {}   ")
+        FilesystemOutput().place_file(src, path)
+        with open(path) as f:
+            self.assertEqual(f.read(), "body {}")
+        # a file placed before is kept
+        FilesystemOutput().place_file(src, path)
+        self.assertTrue(os.path.samefile(path, src))
+
+    def test_abort_keeps_previous_archive(self):
+        path = os.path.join(self.root, "site.zip")
+        with open(path, "w") as f:
+            f.write("previous")
+        archive = ArchiveOutput(path, self.out)
+        archive.write_text(os.path.join(self.out, "index.html"), "new")
+        archive.abort()
+        with open(path) as f:
+            self.assertEqual(f.read(), "previous")
+        self.assertEqual(sorted(os.listdir(self.root)), ["content", "site.zip", "static", "template.html"])
+        with self.assertRaisesRegex(ValueError, "Unknown archive type"):
+            ArchiveOutput(os.path.join(self.root, "site.rar"), self.out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pageindex import build_page_index, filter_pages, sort_pages, page_url
+
+
+class TestPageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.cache = os.path.join(self.tmp.name, ".cache", "index.json")
+        self.write("index.md", "# Home")
+        self.write("blog/a/index.md",
+                   "---\ndate: 2024-01-01\ntags: [elves]\n---\n# Post **A**")
+        self.write("blog/b/index.md",
+                   "---\ndate: 2024-03-01\ntags: [elves, dwarves]\n---\n# Post B")
+        self.write("blog/c/index.md",
+                   "---\ndate: 2024-02-01\ndraft: true\n---\n# Post C")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, page, text):
+        path = os.path.join(self.content, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.md"), "/")
+        self.assertEqual(page_url("blog/tom/index.md"), "/blog/tom/")
+        self.assertEqual(page_url("about.md"), "/about.html")
+
+    def test_build_page_index(self):
+        index = build_page_index(self.content, self.cache)
+        self.assertEqual(index["blog/a/index.md"]["title"], "Post A")
+        self.assertEqual(index["blog/a/index.md"]["url"], "/blog/a/")
+        self.assertEqual(index["blog/b/index.md"]["front_matter"]["tags"], [
+                         "elves", "dwarves"])
+        self.assertTrue(os.path.exists(self.cache))
+
+    def test_build_page_index_reuses_cache(self):
+        build_page_index(self.content, self.cache)
+        with mock.patch("pageindex.read_page_header") as read_page_header:
+            index = build_page_index(self.content, self.cache)
+        read_page_header.assert_not_called()
+        self.assertEqual(index["index.md"]["title"], "Home")
+
+    def test_build_page_index_rereads_changed_pages(self):
+        build_page_index(self.content, self.cache)
+        self.write("index.md", "# New home title")
+        index = build_page_index(self.content, self.cache)
+        self.assertEqual(index["index.md"]["title"], "New home title")
+
+    def test_filter_and_sort_pages(self):
+        index = build_page_index(self.content)
+        posts = filter_pages(index, prefix="blog/")
+        self.assertEqual(sort_pages(index, posts), [
+                         "blog/b/index.md", "blog/a/index.md"])
+        self.assertEqual(filter_pages(index, tag="dwarves"),
+                         ["blog/b/index.md"])
+        self.assertIn("blog/c/index.md", filter_pages(
+            index, include_drafts=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from helpers import parse_markdown, extract_title, markdown_to_html_node
+from pagemeta import PageMeta
+from textnode import TextNode, TextType
+
+
+class TestPageMeta(unittest.TestCase):
+
+    def test_add_heading_first_h1_is_title(self):
+        meta = PageMeta()
+        meta.add_heading(2, "Intro")
+        meta.add_heading(1, "Title")
+        meta.add_heading(1, "Second")
+        self.assertEqual(meta.title, "Title")
+        self.assertEqual(
+            meta.headings, [(2, "Intro"), (1, "Title"), (1, "Second")])
+
+    def test_add_text_nodes(self):
+        meta = PageMeta()
+        meta.add_text_nodes([
+            TextNode("Read ", TextType.TEXT),
+            TextNode("the docs", TextType.LINK, "/docs"),
+            TextNode(" now", TextType.TEXT),
+            TextNode("a cat", TextType.IMAGE, "/cat.png"),
+        ])
+        self.assertEqual(meta.links, [("the docs", "/docs")])
+        self.assertEqual(meta.images, [("a cat", "/cat.png")])
+        self.assertEqual(meta.word_count, 4)
+
+    def test_parse_markdown_collects_metadata(self):
+        md = """
+# The **Title**
+
+Some text with a [link](/about) and ![img](/a.png).
+
+## Section
+
+- one item
+- [two](https://example.com)
+
+```
+code words
+```
+"""
+        html_node, meta = parse_markdown(md)
+
+        self.assertEqual(html_node, markdown_to_html_node(md))
+        self.assertEqual(meta.title, "The Title")
+        self.assertEqual(meta.headings, [(1, "The Title"), (2, "Section")])
+        self.assertEqual(
+            meta.links, [("link", "/about"), ("two", "https://example.com")])
+        self.assertEqual(meta.images, [("img", "/a.png")])
+        self.assertEqual(meta.word_count, 2 + 7 + 1 + 3 + 2)
+
+    def test_extract_title_from_meta_does_not_reparse(self):
+        meta = PageMeta()
+        meta.add_heading(1, "Cached title")
+        self.assertEqual(extract_title("", meta), "Cached title")
+
+    def test_extract_title_meta_without_title_raises_exception(self):
+        with self.assertRaises(Exception):
+            extract_title("# Title", PageMeta())
+
+
+if __name__ == "__main__":
+    unittest.main()
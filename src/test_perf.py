@@ -0,0 +1,161 @@
+import sys
+import unittest
+from unittest import mock
+
+import blocks
+import helpers
+from blocks import block_registry
+from helpers import batch_text_to_text_nodes, block_to_block_type, markdown_to_blocks, markdown_to_html_node, text_to_text_nodes
+
+# growing the input by GROWTH must not grow the work by more than
+# MAX_RATIO; linear code lands at or below GROWTH, quadratic code near
+# GROWTH ** 2. Work is counted, not timed, so the result doesn't depend on
+# the machine; `bench_linear.py` measures the same inputs in wall-clock time
+GROWTH = 8
+MAX_RATIO = 12
+
+# the patterns of the parsing stages, by module
+PATTERNS = {
+    helpers: ["_IMAGE_PATTERN", "_LINK_PATTERN", "_DELIMITER_PATTERN"],
+    blocks: ["_HEADING_PATTERN", "_QUOTE_PATTERN", "_UNORDERED_LIST_PATTERN",
+             "_ORDERED_LIST_PATTERN", "_FIRST_CHARACTER_PATTERN"],
+}
+
+
+class _CountingPattern:
+    """
+    Stands in for a compiled pattern and counts the characters each
+    search scans, so scanning the same text over and over shows up even
+    though every single search is linear.
+    """
+
+    def __init__(self, pattern, counter):
+        self._pattern = pattern
+        self._counter = counter
+
+    def __getattr__(self, name):
+        method = getattr(self._pattern, name)
+        if name not in ("search", "match", "fullmatch", "finditer", "findall", "split"):
+            return method
+
+        def scan(string, pos=0, *args, **kwargs):
+            result = method(string, pos, *args, **kwargs)
+            if name == "split":
+                # split takes maxsplit rather than a start position
+                pos = 0
+            # a search stops at its first match
+            end = len(string)
+            if name in ("search", "match") and result is not None:
+                end = result.end()
+            self._counter[0] += end - pos
+            return result
+        return scan
+
+
+def count_operations(func, arg) -> int:
+    """
+    Returns the work `func(arg)` does: every Python and C function call,
+    plus every character the parsing patterns scan.
+    """
+    counter = [0]
+
+    def profile(frame, event, _):
+        if event == "call" or event == "c_call":
+            counter[0] += 1
+
+    patches = [mock.patch.object(module, name, _CountingPattern(getattr(module, name), counter))
+               for module, names in PATTERNS.items() for name in names]
+    for patch in patches:
+        patch.start()
+    try:
+        sys.setprofile(profile)
+        try:
+            func(arg)
+        finally:
+            sys.setprofile(None)
+    finally:
+        for patch in patches:
+            patch.stop()
+    return counter[0]
+
+
+class TestLinearWork(unittest.TestCase):
+    """
+    Adversarial inputs for every parsing stage: huge whitespace runs,
+    unmatched brackets and delimiters, long lines.
+    """
+
+    def assertLinear(self, func, make_input, size):
+        small = count_operations(func, make_input(size))
+        large = count_operations(func, make_input(size * GROWTH))
+        ratio = large / small
+        self.assertLess(ratio, MAX_RATIO,
+                        f"{func.__name__} did {ratio:.1f}x the work for {GROWTH}x input")
+
+    def test_markdown_to_blocks_whitespace_runs(self):
+        self.assertLinear(markdown_to_blocks,
+                          lambda n: "a\n" + " " * n + "b", 10_000)
+        self.assertLinear(markdown_to_blocks,
+                          lambda n: "a\n" + " \r\n\t" * n + "b", 2_000)
+        self.assertLinear(markdown_to_blocks,
+                          lambda n: ("\n" + " " * 50 + "x") * n, 200)
+
+    def test_block_type_unclosed_code_fence(self):
+        self.assertLinear(block_to_block_type,
+                          lambda n: "```" + "`x\n" * n, 5_000)
+        self.assertLinear(block_to_block_type,
+                          lambda n: "```" + "x" * n + "``", 10_000)
+
+    def test_block_type_almost_lists(self):
+        self.assertLinear(block_to_block_type,
+                          lambda n: "- item\n" * n + "not an item", 500)
+        self.assertLinear(block_to_block_type,
+                          lambda n: "1. item\n" * n + "2 missing dot", 500)
+        self.assertLinear(block_registry.find,
+                          lambda n: " " * n + "#", 10_000)
+
+    def test_unmatched_brackets(self):
+        self.assertLinear(text_to_text_nodes, lambda n: "[" * n, 2_000)
+        self.assertLinear(text_to_text_nodes, lambda n: "![" * n, 1_000)
+        self.assertLinear(text_to_text_nodes, lambda n: "](" * n, 1_000)
+        self.assertLinear(text_to_text_nodes, lambda n: "![a](" * n, 500)
+        self.assertLinear(text_to_text_nodes,
+                          lambda n: "[" + "a" * n + "](" + "b" * n, 2_000)
+
+    def test_many_inline_elements(self):
+        self.assertLinear(text_to_text_nodes,
+                          lambda n: "![a](b) [c](d) " * n, 100)
+        self.assertLinear(text_to_text_nodes, lambda n: "_a_ **b** " * n, 100)
+
+    def test_batched_spans(self):
+        self.assertLinear(batch_text_to_text_nodes,
+                          lambda n: ["plain", "[x](y)", "_i_"] * n, 100)
+        self.assertLinear(batch_text_to_text_nodes,
+                          lambda n: ["[" * 100] * n, 50)
+
+    def test_long_lines(self):
+        self.assertLinear(markdown_to_html_node,
+                          lambda n: "word " * n, 2_000)
+        self.assertLinear(markdown_to_html_node,
+                          lambda n: "# " + "[" * n, 2_000)
+
+    def test_many_blocks(self):
+        self.assertLinear(markdown_to_html_node,
+                          lambda n: "- item [x](/y)\n" * n, 100)
+        self.assertLinear(markdown_to_html_node,
+                          lambda n: "> quote\n" * n, 100)
+        self.assertLinear(markdown_to_html_node,
+                          lambda n: "para _i_\n\n" * n, 100)
+
+    def test_rescanning_is_counted(self):
+        # searching a text again from its start for every match is
+        # quadratic even though each search is linear
+        def rescan(text):
+            while (match := helpers._DELIMITER_PATTERN.search(text)) is not None:
+                text = text[:match.start()] + text[match.end():]
+        with self.assertRaises(AssertionError):
+            self.assertLinear(rescan, lambda n: "a_" * n + "b" * n, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+import responsive
+from helpers import rebase_html, text_to_html
+from responsive import ResponsiveImages, build_image_variants, collect_image_urls
+from sources import ArchiveSource, mount_source, unmount_source
+from textnode import set_image_props_provider
+
+
+def fake_render_variants(source, cache_dir, widths, quality, variant_format):
+    # stands in for Pillow: the "variants" are named after their width
+    os.makedirs(cache_dir, exist_ok=True)
+    variants = []
+    for width in sorted(widths):
+        if width >= 1000:
+            break
+        with open(os.path.join(cache_dir, f"{width}w.webp"), "w") as f:
+            f.write(f"{width}")
+        variants.append([width, f"{width}w.webp"])
+    result = {"width": 1000, "variants": variants}
+    with open(os.path.join(cache_dir, "variants.json"), "w") as f:
+        json.dump(result, f)
+    return result
+
+
+class TestResponsiveImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.out = os.path.join(self.tmp.name, "out")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.write("static/images/a.png", "a")
+        self.write("static/images/b.gif", "b")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        set_image_props_provider(None)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return path
+
+    def build(self, urls, **kwargs):
+        with mock.patch.object(responsive, "Image", object()), \
+                mock.patch.object(responsive, "variant_format", lambda source_format: "WEBP"), \
+                mock.patch.object(responsive, "render_variants", wraps=fake_render_variants) as render, \
+                redirect_stdout(io.StringIO()):
+            manifest = build_image_variants(
+                urls, self.static, self.out, self.cache, widths=(480, 960, 1440), jobs=1, **kwargs)
+        return manifest, render
+
+    def test_collect_image_urls(self):
+        self.write("content/index.md", "---\nimage: ![x](/skip.png)\n---\n# Home\n\n![a](/images/a.png)\n")
+        self.write("content/post.md", "# Post\n\n![a again](/images/a.png) ![b](/images/b.gif)\n")
+        urls = collect_image_urls(os.path.join(self.tmp.name, "content"), ["index.md", "post.md"])
+        self.assertEqual(urls, ["/images/a.png", "/images/b.gif"])
+
+    def test_variants_are_cached_and_copied(self):
+        urls = ["/images/a.png", "/images/b.gif", "/images/missing.png", "https://example.com/c.png"]
+        manifest, render = self.build(urls)
+        self.assertEqual(manifest, {"/images/a.png": {"width": 1000, "variants": [
+            [480, "/variants/images/a-480w.webp"], [960, "/variants/images/a-960w.webp"]]}})
+        self.assertEqual(render.call_count, 1)
+        with open(os.path.join(self.out, "variants", "images", "a-480w.webp")) as f:
+            self.assertEqual(f.read(), "480")
+
+        # an unchanged source is not rendered again
+        self.assertEqual(self.build(urls)[1].call_count, 0)
+
+        # new content or new settings are
+        self.write("static/images/a.png", "changed")
+        self.assertEqual(self.build(urls)[1].call_count, 1)
+        self.assertEqual(self.build(urls, quality=50)[1].call_count, 1)
+
+    def test_variants_of_an_archive(self):
+        archive_path = os.path.join(self.tmp.name, "static.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("images/c.png", b"c")
+        self.static = os.path.join(self.tmp.name, "archived")
+        mount_source(self.static, ArchiveSource(archive_path))
+        try:
+            manifest, render = self.build(["/images/c.png", "/images/missing.png"])
+        finally:
+            unmount_source(self.static)
+        self.assertEqual(list(manifest), ["/images/c.png"])
+        # the worker gets the bytes, it can't read the archive
+        self.assertEqual(render.call_args[0][0], b"c")
+        self.assertTrue(os.path.exists(os.path.join(self.out, "variants", "images", "c-480w.webp")))
+
+    def test_skipped_without_pillow(self):
+        out = io.StringIO()
+        with mock.patch.object(responsive, "Image", None), redirect_stdout(out):
+            self.assertEqual(build_image_variants(["/images/a.png"], self.static, self.out), {})
+        self.assertIn("Pillow is not installed", out.getvalue())
+        self.assertFalse(os.path.exists(self.out))
+
+    def test_props_and_rebase(self):
+        images = ResponsiveImages({"/images/a.png": {"width": 1000, "variants": [
+            [480, "/variants/images/a-480w.webp"], [960, "/variants/images/a-960w.webp"]]}})
+        self.assertEqual(images.props("/images/other.png"), {})
+
+        set_image_props_provider(images.props)
+        html = text_to_html("![a](/images/a.png)")
+        self.assertEqual(
+            html,
+            '<img src="/images/a.png" alt="a" srcset="/variants/images/a-480w.webp 480w, '
+            '/variants/images/a-960w.webp 960w, /images/a.png 1000w" sizes="(max-width: 800px) 100vw, 800px">'
+        )
+        self.assertEqual(
+            rebase_html(html, "/site/"),
+            '<img src="/site/images/a.png" alt="a" srcset="/site/variants/images/a-480w.webp 480w, '
+            '/site/variants/images/a-960w.webp 960w, /site/images/a.png 1000w" sizes="(max-width: 800px) 100vw, 800px">'
+        )
+
+    @unittest.skipIf(responsive.Image is None, "Pillow is not installed")
+    def test_render_variants(self):
+        path = os.path.join(self.static, "images", "big.png")
+        responsive.Image.new("RGB", (1200, 600)).save(path)
+        result = responsive.render_variants(path, self.cache, (480, 960, 1440), 80, "PNG")
+        self.assertEqual(result, {"width": 1200, "variants": [[480, "480w.png"], [960, "960w.png"]]})
+        with responsive.Image.open(os.path.join(self.cache, "480w.png")) as image:
+            self.assertEqual(image.size, (480, 240))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from helpers import generate_pages, set_search_terms
+from pageindex import build_page_index
+from search import build_search_index, decode_postings, encode_postings, page_terms, search, tokenize
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, ".cache", "search.json")
+        self.write("index.md", "# Home\n\nWelcome to the **Tolkien** fan club.")
+        self.write("blog/tom/index.md",
+                   "---\ndate: 2024-01-01\n---\n# Tom Bombadil\n\n- Tolkien wrote Tom\n- Tom sings\n\n```\nsecret_code\n```")
+        self.write("blog/draft/index.md",
+                   "---\ndraft: true\n---\n# Hidden Tolkien draft")
+
+    def tearDown(self):
+        set_search_terms(None)
+        self.tmp.cleanup()
+
+    def write(self, page, text):
+        path = os.path.join(self.content, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def build(self):
+        index = build_page_index(self.content)
+        return build_search_index(index, self.content, self.out, "/", self.cache)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Tom's a-ok, I say!"),
+                         ["tom", "ok", "say"])
+
+    def test_page_terms_skips_code_and_markers(self):
+        terms = page_terms(
+            "# Title\n\nRead `inline_code` and [the docs](/docs-url).\n\n```\nblock_code\n```")
+        self.assertEqual(terms, {"title": 1, "read": 1,
+                         "and": 1, "the": 1, "docs": 1})
+
+    def test_encode_decode_postings(self):
+        postings = [(0, 3), (4, 1), (9, 2)]
+        self.assertEqual(encode_postings(postings), [0, 3, 4, 1, 5, 2])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_build_search_index_and_search(self):
+        self.build()
+        self.assertEqual(search(self.out, "tolkien"), ["/blog/tom/", "/"])
+        self.assertEqual(search(self.out, "Tom"), ["/blog/tom/"])
+        self.assertEqual(search(self.out, "tolkien welcome"), ["/"])
+        self.assertEqual(search(self.out, "secret_code"), [])
+        self.assertEqual(search(self.out, "hidden"), [])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.out, "search", "to.json")))
+
+    def test_build_search_index_reuses_cached_terms(self):
+        self.build()
+        with mock.patch("search.page_terms") as page_terms_mock:
+            self.build()
+        page_terms_mock.assert_not_called()
+        self.assertEqual(search(self.out, "sings"), ["/blog/tom/"])
+
+    def test_build_search_index_retokenizes_changed_pages(self):
+        self.build()
+        self.write("index.md", "# Home\n\nNow about hobbits.")
+        with mock.patch("search.page_terms", wraps=page_terms) as page_terms_mock:
+            self.build()
+        self.assertEqual(page_terms_mock.call_count, 1)
+        self.assertEqual(search(self.out, "hobbits"), ["/"])
+
+    def test_build_search_index_uses_rendered_terms(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w", encoding="utf-8") as f:
+            f.write("{{ Content }}")
+        set_search_terms({})
+        with redirect_stdout(io.StringIO()):
+            generate_pages(["index.md", "blog/tom/index.md"], self.content,
+                           template, self.out, "/")
+        with mock.patch("search.page_terms") as page_terms_mock:
+            self.build()
+        page_terms_mock.assert_not_called()
+        self.assertEqual(search(self.out, "tolkien"), ["/blog/tom/", "/"])
+        self.assertEqual(search(self.out, "secret_code"), [])
+
+    def test_streamed_pages_count_terms_while_rendering(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w", encoding="utf-8") as f:
+            f.write("{{ Content }}")
+        terms = {}
+        set_search_terms(terms)
+        with redirect_stdout(io.StringIO()), mock.patch("helpers.STREAM_THRESHOLD_BYTES", 1):
+            generate_pages(["index.md", "blog/tom/index.md"], self.content,
+                           template, self.out, "/")
+        page = os.path.join(self.content, "blog/tom/index.md")
+        with open(page, encoding="utf-8") as f:
+            self.assertEqual(terms[page], page_terms(f.read()))
+        with mock.patch("search.page_terms") as page_terms_mock:
+            self.build()
+        page_terms_mock.assert_not_called()
+        self.assertEqual(search(self.out, "sings"), ["/blog/tom/"])
+
+    def test_page_terms_of_lines(self):
+        page = os.path.join(self.content, "blog/tom/index.md")
+        with open(page, encoding="utf-8") as f:
+            expected = page_terms(f.read())
+        # only iterated, never read as a whole
+        with open(page, encoding="utf-8") as f:
+            self.assertEqual(page_terms(line for line in f), expected)
+        self.assertEqual(expected, {"tom": 3, "bombadil": 1, "tolkien": 1, "wrote": 1, "sings": 1})
+
+if __name__ == "__main__":
+    unittest.main()
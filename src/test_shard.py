@@ -0,0 +1,92 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from helpers import discover_pages
+from shard import parse_shard, shard_of, select_shard, build_shard, merge_shards, SHARD_MANIFEST
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+
+        for page in ["index.md", "blog/a/index.md", "blog/b/index.md", "contact/index.md"]:
+            path = os.path.join(self.content, page)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# {page}\n\nSome text.")
+        os.makedirs(self.static)
+        with open(os.path.join(self.static, "index.css"), "w", encoding="utf-8") as f:
+            f.write("body {}")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_shard_works(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+
+    def test_parse_shard_invalid_raises_exception(self):
+        for spec in ["2", "0/4", "5/4", "a/b", "1/0"]:
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of("blog/a/index.md", 4),
+                         shard_of("blog/a/index.md", 4))
+        self.assertTrue(1 <= shard_of("blog/a/index.md", 4) <= 4)
+
+    def test_select_shard_partitions_pages(self):
+        pages = discover_pages(self.content)
+        shards = [select_shard(pages, i, 3) for i in range(1, 4)]
+        self.assertEqual(sorted(sum(shards, [])), pages)
+
+    def test_discover_pages_sorted_relative_paths(self):
+        self.assertEqual(
+            discover_pages(self.content),
+            ["blog/a/index.md", "blog/b/index.md",
+                "contact/index.md", "index.md"]
+        )
+
+    def test_build_and_merge_shards(self):
+        pages = discover_pages(self.content)
+        shard_dirs = []
+        for i in range(1, 3):
+            shard_dir = os.path.join(self.root, f"shard{i}")
+            with redirect_stdout(io.StringIO()):
+                build_shard(pages, i, 2, self.content,
+                            self.template, shard_dir, "/")
+            self.assertTrue(os.path.exists(
+                os.path.join(shard_dir, SHARD_MANIFEST)))
+            shard_dirs.append(shard_dir)
+
+        out = os.path.join(self.root, "docs")
+        with redirect_stdout(io.StringIO()):
+            merge_shards(shard_dirs, self.static, out)
+
+        self.assertTrue(os.path.exists(os.path.join(out, "index.css")))
+        for page in ["index.html", "blog/a/index.html", "blog/b/index.html", "contact/index.html"]:
+            self.assertTrue(os.path.exists(os.path.join(out, page)))
+        self.assertFalse(os.path.exists(os.path.join(out, SHARD_MANIFEST)))
+
+    def test_merge_shards_missing_shard_raises_exception(self):
+        pages = discover_pages(self.content)
+        shard_dir = os.path.join(self.root, "shard1")
+        with redirect_stdout(io.StringIO()):
+            build_shard(pages, 1, 2, self.content, self.template, shard_dir, "/")
+
+        with self.assertRaises(ValueError):
+            merge_shards([shard_dir], self.static,
+                         os.path.join(self.root, "docs"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+
+from helpers import copy_static, discover_pages, generate_pages
+from sources import ArchiveSource, mount_source, open_input, parse_source, stat, unmount_source
+
+FILES = {
+    "site/content/index.md": "---\ntitle: Home\n---\nSome text\n",
+    "site/content/blog/a.md": "# A\n\n![logo](/images/logo.png)\n",
+    "site/static/index.css": "body {}",
+    "site/static/images/logo.png": "png",
+}
+
+
+class TestSources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.zip_path = os.path.join(self.root, "site.zip")
+        with zipfile.ZipFile(self.zip_path, "w") as archive:
+            for name, data in FILES.items():
+                archive.writestr(name, data)
+        self.tar_path = os.path.join(self.root, "site.tar.gz")
+        with tarfile.open(self.tar_path, "w:gz") as archive:
+            for name, data in FILES.items():
+                info = tarfile.TarInfo("./" + name)
+                info.size = len(data)
+                info.mtime = 1700000000
+                archive.addfile(info, io.BytesIO(data.encode()))
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+
+    def tearDown(self):
+        unmount_source(self.content)
+        unmount_source(self.static)
+        self.tmp.cleanup()
+
+    def test_archive_source(self):
+        for path in (self.zip_path, self.tar_path):
+            source = ArchiveSource(path, "site/content")
+            self.assertEqual(source.listdir(""), ["blog", "index.md"])
+            self.assertTrue(source.isdir("blog"))
+            self.assertFalse(source.isdir("index.md"))
+            self.assertEqual(source.stat("blog/a.md").st_size, len(FILES["site/content/blog/a.md"]))
+            with source.open("blog/a.md") as f:
+                self.assertEqual(f.readline(), "# A\n")
+            with self.assertRaises(FileNotFoundError):
+                source.open("missing.md")
+            source.close()
+        self.assertEqual(ArchiveSource(self.tar_path, "site").stat("static/index.css").st_mtime_ns,
+                         1700000000 * 10**9)
+        with self.assertRaisesRegex(ValueError, "No other directory"):
+            parse_source(f"{self.zip_path}:other")
+        with self.assertRaisesRegex(ValueError, "Cannot read archive"):
+            parse_source(self.template)
+
+    def test_members_outside_the_archive_are_refused(self):
+        for name, message in [("../evil", "outside of its directory"),
+                              ("site/content/../../evil", "outside of its directory"),
+                              ("/etc/evil", "absolute path")]:
+            path = os.path.join(self.root, "evil.zip")
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.writestr("site/content/index.md", "# Home")
+                archive.writestr(name, "evil")
+            with self.assertRaisesRegex(ValueError, message):
+                ArchiveSource(path)
+            path = os.path.join(self.root, "evil.tar")
+            with tarfile.open(path, "w") as archive:
+                info = tarfile.TarInfo(name)
+                info.size = 4
+                archive.addfile(info, io.BytesIO(b"evil"))
+            with self.assertRaisesRegex(ValueError, message):
+                parse_source(f"{path}:site")
+
+    def test_build_from_archives(self):
+        mount_source(self.content, parse_source(f"{self.tar_path}:site/content"))
+        mount_source(self.static, parse_source(f"{self.zip_path}:site/static"))
+        self.assertFalse(os.path.exists(self.content))
+        self.assertEqual(stat(os.path.join(self.static, "index.css")).st_size, 7)
+
+        out = os.path.join(self.root, "docs")
+        pages = discover_pages(self.content)
+        self.assertEqual(pages, ["blog/a.md", "index.md"])
+        with redirect_stdout(io.StringIO()):
+            copy_static(self.static, out)
+            generate_pages(pages, self.content, self.template, out, "/")
+        with open(os.path.join(out, "images", "logo.png")) as f:
+            self.assertEqual(f.read(), "png")
+        with open(os.path.join(out, "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Home</title><div><p>Some text</p></div>")
+        with open(os.path.join(out, "blog", "a.html")) as f:
+            self.assertIn('<img src="/images/logo.png" alt="logo"', f.read())
+
+        # unmounted paths are read from the filesystem again
+        unmount_source(self.content)
+        with self.assertRaises(FileNotFoundError):
+            open_input(os.path.join(self.content, "index.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from helpers import copy_static, generate_pages, set_output_stager, write_output
+from staging import OutputStager
+
+
+class TestStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.out = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for name, data in [("content/index.md", "# Home"), ("content/a.md", "# A"),
+                           ("static/index.css", "body {}")]:
+            self.write(name, data)
+
+    def tearDown(self):
+        set_output_stager(None)
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+    def build(self, pages, keep=False):
+        stager = OutputStager()
+        set_output_stager(stager)
+        with redirect_stdout(io.StringIO()):
+            dest = stager.stage(self.out, keep)
+            if not keep:
+                copy_static(os.path.join(self.root, "static"), dest)
+            generate_pages(pages, os.path.join(self.root, "content"), self.template, dest, "/")
+        return stager
+
+    def inode(self, name):
+        return os.stat(os.path.join(self.out, name)).st_ino
+
+    def test_rebuild_links_unchanged_files(self):
+        with redirect_stdout(io.StringIO()):
+            self.build(["index.md", "a.md"]).commit()
+        inodes = {name: self.inode(name) for name in ("index.html", "a.html", "index.css")}
+
+        self.write("content/a.md", "# Changed")
+        stager = self.build(["index.md", "a.md"])
+        # the live site is untouched until the commit
+        with open(os.path.join(self.out, "a.html")) as f:
+            self.assertEqual(f.read(), "<title>A</title><div><h1>A</h1></div>")
+        with redirect_stdout(io.StringIO()):
+            stager.commit()
+        self.assertEqual(self.inode("index.html"), inodes["index.html"])
+        self.assertEqual(self.inode("index.css"), inodes["index.css"])
+        self.assertNotEqual(self.inode("a.html"), inodes["a.html"])
+        with open(os.path.join(self.out, "a.html")) as f:
+            self.assertEqual(f.read(), "<title>Changed</title><div><h1>Changed</h1></div>")
+        self.assertEqual(sorted(os.listdir(self.root)), ["content", "docs", "static", "template.html"])
+
+    def test_partial_build_never_writes_through_links(self):
+        with redirect_stdout(io.StringIO()):
+            self.build(["index.md", "a.md"]).commit()
+        with open(os.path.join(self.out, "a.html")) as f:
+            before = f.read()
+
+        self.write("content/a.md", "# Changed")
+        stager = self.build(["a.md"], keep=True)
+        with open(os.path.join(self.out, "a.html")) as f:
+            self.assertEqual(f.read(), before)
+        stager.abort()
+        self.assertFalse(os.path.exists(self.out + ".staging"))
+        self.assertTrue(os.path.exists(os.path.join(self.out, "index.css")))
+
+    def test_symlink_flip(self):
+        os.makedirs(os.path.join(self.root, "docs.1"))
+        os.symlink("docs.1", self.out)
+        with redirect_stdout(io.StringIO()):
+            self.build(["index.md"]).commit()
+        self.assertTrue(os.path.islink(self.out))
+        release = os.readlink(self.out)
+        self.assertRegex(release, r"^docs\.\d+$")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "docs.1")))
+        self.assertEqual(sorted(os.listdir(self.out)), ["index.css", "index.html"])
+
+    def test_write_output_outside_staging(self):
+        set_output_stager(OutputStager())
+        path = os.path.join(self.root, "page.html")
+        self.assertTrue(write_output(path, "a"))
+        with open(path) as f:
+            self.assertEqual(f.read(), "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
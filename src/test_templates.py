@@ -0,0 +1,131 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from helpers import generate_pages, select_template
+from templates import TemplateError, TemplateLoader, compile_template
+
+
+class TestTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return path
+
+    def test_variables(self):
+        template = compile_template("<title>{{ Title }}</title>{{Content}}{{ tags }}{{ missing }}{{ Title }}")
+        self.assertEqual(
+            template({"Title": "T", "Content": "<p>{{ Title }}</p>", "tags": ["a", "b"]}),
+            "<title>T</title><p>{{ Title }}</p>a, bT",
+        )
+        self.assertEqual(template.tags, {"title"})
+
+    def test_include_and_extends(self):
+        self.write("partials/header.html", "<header>{{ Title }}</header>")
+        self.write("base.html",
+                   '<html>{% include "partials/header.html" %}'
+                   "{% block main %}<main>default</main>{% endblock %}"
+                   "{% block footer %}<footer>base</footer>{% endblock %}</html>")
+        self.write("layouts/post.html",
+                   '{% extends "../base.html" %}'
+                   "{% block main %}<article>{% block body %}{{ Content }}{% endblock %}</article>{% endblock %}")
+        path = self.write("layouts/note.html",
+                          '{% extends "post.html" %}{% block body %}<aside>{{ Content }}</aside>{% endblock %}')
+
+        template = TemplateLoader().load(path)
+        self.assertEqual(
+            template({"Title": "T", "Content": "c"}),
+            "<html><header>T</header><article><aside>c</aside></article><footer>base</footer></html>",
+        )
+        self.assertEqual(set(template.dependencies), {
+            os.path.normpath(os.path.join(self.tmp.name, name))
+            for name in ("layouts/note.html", "layouts/post.html", "base.html", "partials/header.html")})
+
+    def test_include_in_overriding_block(self):
+        self.write("partials/p.html", "<p>base partial</p>")
+        self.write("layouts/partials/p.html", "<p>layout partial</p>")
+        self.write("base.html", '{% block main %}{% include "partials/p.html" %}{% endblock %}')
+        path = self.write("layouts/blog.html",
+                          '{% extends "../base.html" %}{% block main %}<main>{% include "partials/p.html" %}</main>{% endblock %}')
+        self.assertEqual(TemplateLoader().load(path)({}), "<main><p>layout partial</p></main>")
+        self.assertEqual(TemplateLoader().load(os.path.join(self.tmp.name, "base.html"))({}),
+                         "<p>base partial</p>")
+
+    def test_variables_are_escaped(self):
+        template = compile_template(
+            '<meta content="{{ description }}">{{ Title }}{{ Content }}{{ html|raw }}{{ html }}')
+        self.assertEqual(
+            template({"description": 'Say "hi" & <go>', "Title": "A & B", "Content": "<p>c</p>", "html": "<b>b</b>"}),
+            '<meta content="Say &quot;hi&quot; &amp; &lt;go&gt;">A &amp; B<p>c</p><b>b</b>&lt;b&gt;b&lt;/b&gt;',
+        )
+
+    def test_errors(self):
+        with self.assertRaisesRegex(TemplateError, "unclosed block"):
+            compile_template("{% block a %}")
+        with self.assertRaisesRegex(TemplateError, "unknown tag for"):
+            compile_template("{% for x in y %}")
+        with self.assertRaisesRegex(TemplateError, "needs a template file"):
+            compile_template('{% include "a.html" %}')
+        a = self.write("a.html", '{% include "b.html" %}')
+        self.write("b.html", '{% include "a.html" %}')
+        with self.assertRaisesRegex(TemplateError, "Template cycle"):
+            TemplateLoader().load(a)
+        with self.assertRaisesRegex(TemplateError, "Cannot read template"):
+            TemplateLoader().load(os.path.join(self.tmp.name, "missing.html"))
+
+    def test_disk_cache(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        self.write("partial.html", "<p>{{ Title }}</p>")
+        path = self.write("page.html", '<div>{% include "partial.html" %}</div>')
+        loader = TemplateLoader(cache_dir)
+        self.assertEqual(loader.load(path)({"Title": "a"}), "<div><p>a</p></div>")
+        self.assertIs(loader.load(path), loader.load(path))
+
+        cached = TemplateLoader(cache_dir)
+        self.assertEqual(cached.load(path)({"Title": "b"}), "<div><p>b</p></div>")
+        self.assertEqual(cached.load(path).tags, {"div", "p"})
+        self.assertEqual(cached.compiled, 0)
+
+        # changing an included template recompiles
+        self.write("partial.html", "<span>{{ Title }}</span>")
+        changed = TemplateLoader(cache_dir)
+        self.assertEqual(changed.load(path)({"Title": "c"}), "<div><span>c</span></div>")
+        self.assertEqual(changed.compiled, 1)
+
+    def test_select_template(self):
+        default = self.write("template.html", "")
+        post = self.write("layouts/post.html", "")
+        blog = self.write("layouts/blog.html", "")
+        self.assertEqual(select_template(default, {}, "index.md"), default)
+        self.assertEqual(select_template(default, {}, "blog/a/index.md"), blog)
+        self.assertEqual(select_template(default, {"layout": "post"}, "index.md"), post)
+        self.assertEqual(select_template(default, {"template": "other.html"}, "blog/a.md"),
+                         os.path.join(self.tmp.name, "other.html"))
+
+    def test_pages_use_layouts(self):
+        template = self.write("template.html", "<main>{{ Content }}</main>")
+        self.write("layouts/blog.html", "<article>{{ Title }} {{ date }}{{ Content }}</article>")
+        self.write("content/index.md", "# Home\n")
+        self.write("content/blog/a.md", "---\ndate: 2024-01-02\n---\n# Post\n")
+        dest = os.path.join(self.tmp.name, "out")
+        with redirect_stdout(io.StringIO()):
+            generate_pages(["index.md", "blog/a.md"], os.path.join(self.tmp.name, "content"), template, dest, "/")
+        with open(os.path.join(dest, "index.html")) as f:
+            self.assertEqual(f.read(), "<main><div><h1>Home</h1></div></main>")
+        with open(os.path.join(dest, "blog", "a.html")) as f:
+            self.assertEqual(f.read(), "<article>Post 2024-01-02<div><h1>Post</h1></div></article>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import TextNode, TextType, text_node_to_html_node, text_nodes_to_html
 
 
 class TestTextNode(unittest.TestCase):
@@ -79,6 +79,23 @@ class TestTextNode(unittest.TestCase):
                          "https://www.google.com/image.png")
         self.assertEqual(html_node.props["alt"], "This is an image node")
 
+    def test_text_nodes_to_html(self):
+        nodes = [
+            TextNode("plain ", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode("link", TextType.LINK, "/about"),
+            TextNode("alt", TextType.IMAGE, "/a.png"),
+        ]
+        self.assertEqual(
+            text_nodes_to_html(nodes),
+            'plain <b>bold</b><a href="/about">link</a><img src="/a.png" alt="alt">')
+        self.assertEqual(text_nodes_to_html(nodes), "".join(
+            text_node_to_html_node(node).to_html() for node in nodes))
+
+    def test_text_nodes_to_html_invalid_type(self):
+        with self.assertRaises(Exception):
+            text_nodes_to_html([TextNode("x", "invalid_type")])
+
     def test_text_node_to_html_node_invalid_type(self):
         node = TextNode("This is an invalid node", "invalid_type")
 
@@ -1,6 +1,6 @@
 from enum import Enum
 
-from leafnode import LeafNode
+from leafnode import LeafNode, VOID_ELEMENTS
 
 
 class TextType(Enum):
@@ -34,21 +34,85 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type})"
 
 
-def text_node_to_html_node(text_node: TextNode):
-
-    match text_node.text_type:
-
-        case TextType.TEXT:
-            return LeafNode(tag=None, value=text_node.text)
-        case TextType.BOLD:
-            return LeafNode(tag="b", value=text_node.text)
-        case TextType.ITALIC:
-            return LeafNode(tag="i", value=text_node.text)
-        case TextType.CODE:
-            return LeafNode(tag="code", value=text_node.text)
-        case TextType.LINK:
-            return LeafNode(tag="a", value=text_node.text, props={"href": text_node.url})
-        case TextType.IMAGE:
-            return LeafNode(tag="img", value=None, props={"src": text_node.url, "alt": text_node.text})
-        case _:
-            raise Exception("Invalid text type")
+def _link_props(text_node: TextNode) -> dict:
+    return {"href": text_node.url}
+
+
+# extra props of images, see `set_image_props_provider`
+_image_props_provider = None
+
+
+def set_image_props_provider(provider) -> None:
+    """
+    Installs a callable returning extra props for an image URL, such as
+    its dimensions, merged after `src` and `alt`. `None` removes it.
+    """
+    global _image_props_provider
+    _image_props_provider = provider
+
+
+def _image_props(text_node: TextNode) -> dict:
+    props = {"src": text_node.url, "alt": text_node.text}
+    if _image_props_provider is not None:
+        props.update(_image_props_provider(text_node.url))
+    return props
+
+
+# TextType -> (tag, builder of the props of a node or None for no props)
+INLINE_TAGS = {
+    TextType.TEXT: (None, None),
+    TextType.BOLD: ("b", None),
+    TextType.ITALIC: ("i", None),
+    TextType.CODE: ("code", None),
+    TextType.LINK: ("a", _link_props),
+    TextType.IMAGE: ("img", _image_props),
+}
+
+
+def _inline_tag(text_node: TextNode) -> tuple:
+    try:
+        return INLINE_TAGS[text_node.text_type]
+    except (KeyError, TypeError):
+        raise Exception("Invalid text type")
+
+
+def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+    """
+    Converts a `TextNode` into the `LeafNode` of its inline element. Void
+    elements such as images get no value.
+
+    Raises:
+        Exception: If the text type of the node is unknown.
+    """
+    tag, props = _inline_tag(text_node)
+    return LeafNode(
+        tag,
+        None if tag in VOID_ELEMENTS else text_node.text,
+        None if props is None else props(text_node),
+    )
+
+
+def text_nodes_to_html(text_nodes: list[TextNode]) -> str:
+    """
+    Renders `TextNode`s straight to an HTML fragment, identical to the
+    `to_html` of their `LeafNode`s but without creating them.
+
+    Raises:
+        Exception: If the text type of a node is unknown.
+    """
+    parts = []
+    append = parts.append
+    for text_node in text_nodes:
+        tag, props = _inline_tag(text_node)
+        if tag is None:
+            append(text_node.text)
+        elif props is None:
+            append(f"<{tag}>{text_node.text}</{tag}>")
+        else:
+            attributes = " ".join(
+                f'{key}="{value}"' for key, value in props(text_node).items())
+            if tag in VOID_ELEMENTS:
+                append(f"<{tag} {attributes}>")
+            else:
+                append(f"<{tag} {attributes}>{text_node.text}</{tag}>")
+    return "".join(parts)